@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+ASGI serving mode for the mock server
+Serves the Flask app's routes and response envelope to an ASGI server
+without tying a thread to each slow client:
+
+- request bodies are received on the event loop and spooled to memory or
+  a temp file, so a slow upload costs a coroutine, not a thread;
+- the Flask handlers, and with them all SQLite work, run on a bounded
+  thread pool once the whole body has arrived;
+- GET /events/changes?wait=<seconds> long-polls on the event loop until
+  an event changes or the wait runs out.
+
+The sync Flask app in python_mock_server.py stays available; both modes
+run the same handlers, so responses are identical.
+
+Usage:
+    pip install uvicorn
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import python_mock_server as server
+
+logger = logging.getLogger(__name__)
+
+# Threads running Flask handlers (and SQLite queries)
+ASGI_EXECUTOR_THREADS = int(os.environ.get('ASGI_EXECUTOR_THREADS', '16'))
+# Request bodies up to this size stay in memory, larger ones are spooled to UPLOAD_TEMP_FOLDER
+ASGI_SPOOL_MEMORY_BYTES = int(os.environ.get('ASGI_SPOOL_MEMORY_BYTES', str(1024 * 1024)))
+ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', str(100 * 1024 * 1024)))
+# Longest accepted ?wait= for GET /events/changes, in seconds
+ASGI_LONG_POLL_MAX = float(os.environ.get('ASGI_LONG_POLL_MAX', '60'))
+# How often long-poll waiters check the change feed in the database, in seconds
+ASGI_CHANGE_POLL_INTERVAL = 0.1
+# Chunks of a streamed response buffered between its thread and the event loop
+STREAM_QUEUE_CHUNKS = 8
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+class AsyncFileWrapper:
+    """wsgi.file_wrapper whose file the adapter reads in the I/O pool instead of a request thread"""
+
+    def __init__(self, file, buffer_size: int = FILE_CHUNK_SIZE):
+        self.file = file
+        self.buffer_size = max(buffer_size, FILE_CHUNK_SIZE)
+
+    # Werkzeug's range iterator for 206 responses seeks on the wrapper itself
+    def seekable(self) -> bool:
+        return hasattr(self.file, 'seekable') and self.file.seekable()
+
+    def seek(self, *args):
+        self.file.seek(*args)
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        chunk = self.file.read(self.buffer_size)
+        if not chunk:
+            raise StopIteration()
+        return chunk
+
+    def close(self):
+        self.file.close()
+
+
+class WsgiResult:
+    """Status and headers of a WSGI response plus its body: bytes, a file, or a live iterator"""
+
+    def __init__(self, status: str, headers: List[Tuple[str, str]], body: bytes = b'',
+                 file: Optional[AsyncFileWrapper] = None, stream=None):
+        self.status_code = int(status.split(' ', 1)[0])
+        self.headers = headers
+        self.body = body
+        self.file = file
+        self.stream = stream
+
+    def header(self, name: str) -> Optional[str]:
+        name = name.lower()
+        return next((value for key, value in self.headers if key.lower() == name), None)
+
+    def close(self):
+        for iterable in (self.file, self.stream):
+            if iterable is not None and hasattr(iterable, 'close'):
+                iterable.close()
+
+
+class StreamRelay:
+    """Body of a streamed response, produced on the handler thread that ran its request.
+
+    The generator is iterated on that thread, so the thread-local pooled
+    database connection it opens and the request context it was created in
+    stay on one thread, which serves nothing else until the stream ends.
+    Chunks reach the event loop through a bounded queue.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.chunks = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+        self.disconnected = threading.Event()
+        self.pumping = None  # the handler thread's future, set by AsgiApp._run_wsgi
+
+    def pump(self, app_iter):
+        """Queue app_iter's chunks until it ends or the client leaves; runs on the handler thread"""
+        try:
+            for chunk in app_iter:
+                if self.disconnected.is_set():
+                    break
+                if chunk:
+                    asyncio.run_coroutine_threadsafe(self.chunks.put(chunk), self.loop).result()
+        finally:
+            try:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            finally:
+                asyncio.run_coroutine_threadsafe(self.chunks.put(None), self.loop).result()
+
+    async def abandon(self):
+        """Stop the producer, draining to the end marker so it can't block on a full queue"""
+        self.disconnected.set()
+        while await self.chunks.get() is not None:
+            pass
+
+
+class ChangeFeedWatcher:
+    """Wakes long-poll requests when the change feed moves past their cursor.
+
+    It polls sync_state.change_seq, which triggers keep in the database, so
+    a write is seen whichever process made it: another `uvicorn --workers`
+    process, a prefork worker or a seed script. One polling task per event
+    loop runs while somebody is waiting.
+    """
+
+    def __init__(self, executor, interval: float = ASGI_CHANGE_POLL_INTERVAL):
+        self.executor = executor
+        self.interval = interval
+        self.head = 0
+        self._loop = None
+        self._task = None
+        self._changed = None
+        self._waiters = 0
+
+    async def wait_for_change(self, since_seq: int, timeout: float) -> bool:
+        """Wait until the feed has a change after `since_seq`; False on timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self._waiters += 1
+        try:
+            self.head = max(self.head, await loop.run_in_executor(self.executor, server.latest_change_seq))
+            if self._loop is not loop or self._task is None or self._task.done():
+                self._loop = loop
+                self._changed = asyncio.Event()
+                self._task = loop.create_task(self._watch())
+            while self.head <= since_seq:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(self._changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            return True
+        finally:
+            self._waiters -= 1
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            await asyncio.sleep(self.interval)
+            try:
+                head = await loop.run_in_executor(self.executor, server.latest_change_seq)
+            except Exception as e:
+                logger.warning(f"⚠️ Change feed poll failed: {e!r}")
+                continue
+            if head > self.head:
+                self.head = head
+                self._changed.set()
+                self._changed = asyncio.Event()
+
+
+def build_environ(scope: Dict[str, Any], body, body_size: int) -> Dict[str, Any]:
+    """WSGI environ for an ASGI HTTP scope whose body has been read into `body`"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(body_size),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        'wsgi.file_wrapper': AsyncFileWrapper,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').lower()
+        value = raw_value.decode('latin-1')
+        if name == 'content-length':
+            # The body is complete, so its real size is known
+            continue
+        key = 'CONTENT_TYPE' if name == 'content-type' else 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """ASGI adapter running a WSGI app's handlers on a bounded thread pool"""
+
+    def __init__(self, wsgi_app, threads: int = ASGI_EXECUTOR_THREADS, init_database: bool = True):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.init_database = init_database
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix='asgi-handler')
+        # Spool and file reads never wait behind slow handlers
+        self.io_executor = ThreadPoolExecutor(4, thread_name_prefix='asgi-io')
+        self.watcher = ChangeFeedWatcher(self.io_executor)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await send({'type': 'websocket.close', 'code': 1000})
+
+    async def _lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    if self.init_database:
+                        await loop.run_in_executor(self.executor, server.init_database)
+                except Exception as e:
+                    logger.exception("❌ ASGI startup failed")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                logger.info(f"🚀 ASGI app ready ({self.threads} handler threads)")
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                self.io_executor.shutdown(wait=True)
+                server.shutdown_worker()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        received = await self._receive_body(scope, receive, send)
+        if received is None:
+            return
+        body, body_size = received
+        response_started = False
+        try:
+            result = await self._dispatch_with_long_poll(scope, body, body_size)
+            response_started = True
+            await self._send_result(result, send, receive)
+        except Exception:
+            logger.exception(f"❌ ASGI error handling {scope['method']} {scope['path']}")
+            if not response_started:
+                await self._send_envelope(send, 500, "Lỗi server nội bộ")
+        finally:
+            body.close()
+
+    async def _receive_body(self, scope, receive, send):
+        """Read the request body into a spool; None if the client left or it was too large"""
+        declared = next((value for name, value in scope.get('headers', []) if name.lower() == b'content-length'), None)
+        if declared is not None and declared.isdigit() and int(declared) > ASGI_MAX_BODY_BYTES:
+            await self._send_envelope(send, 413, f"Request quá lớn (tối đa {ASGI_MAX_BODY_BYTES} bytes)")
+            return None
+
+        loop = asyncio.get_running_loop()
+        # Never in UPLOAD_FOLDER itself, which /uploads/<filename> serves (created on import by _start_process)
+        body = tempfile.SpooledTemporaryFile(max_size=ASGI_SPOOL_MEMORY_BYTES, dir=server.UPLOAD_TEMP_FOLDER)
+        size = 0
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    logger.warning(f"⚠️ Client disconnected after {size} bytes of {scope['method']} {scope['path']}")
+                    body.close()
+                    return None
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if size > ASGI_MAX_BODY_BYTES:
+                    body.close()
+                    await self._send_envelope(send, 413, f"Request quá lớn (tối đa {ASGI_MAX_BODY_BYTES} bytes)")
+                    return None
+                if chunk:
+                    if size > ASGI_SPOOL_MEMORY_BYTES:
+                        # The spool has rolled over to disk
+                        await loop.run_in_executor(self.io_executor, body.write, chunk)
+                    else:
+                        body.write(chunk)
+                if not message.get('more_body', False):
+                    break
+        except BaseException:
+            body.close()
+            raise
+        body.seek(0)
+        return body, size
+
+    async def _dispatch_with_long_poll(self, scope, body, body_size: int) -> WsgiResult:
+        # Wait for the feed here and run the request once, so a long poll is one
+        # request in /metrics and the access log however long it waited
+        wait, since_seq = self._long_poll(scope)
+        if wait > 0:
+            await self.watcher.wait_for_change(since_seq, wait)
+        return await self._run_wsgi(build_environ(scope, body, body_size))
+
+    async def _run_wsgi(self, environ) -> WsgiResult:
+        """Run the WSGI app on a handler thread and return its response once the head is known.
+
+        A streamed response is returned while its handler thread keeps
+        producing the body (see StreamRelay).
+        """
+        loop = asyncio.get_running_loop()
+        relay = StreamRelay(loop)
+        head = loop.create_future()
+
+        def publish(result):
+            loop.call_soon_threadsafe(head.set_result, result)
+
+        relay.pumping = loop.run_in_executor(self.executor, self._call_wsgi, environ, publish, relay)
+        await asyncio.wait([head, relay.pumping], return_when=asyncio.FIRST_COMPLETED)
+        if head.done():
+            return head.result()
+        return relay.pumping.result()
+
+    @staticmethod
+    def _long_poll(scope) -> Tuple[float, int]:
+        """(seconds to wait, change cursor) of a GET /events/changes request; the Flask app ignores ?wait=
+
+        The wait is 0 for other requests and for a malformed cursor, which
+        the Flask app answers at once with a 400.
+        """
+        if scope['method'] != 'GET' or scope['path'] != '/events/changes':
+            return 0.0, 0
+        params = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        try:
+            since_seq = server.decode_change_cursor(params['since'][0]) if params.get('since') else 0
+            wait = float(params['wait'][0]) if params.get('wait') else 0.0
+        except ValueError:
+            return 0.0, 0
+        return min(max(wait, 0.0), ASGI_LONG_POLL_MAX), since_seq
+
+    def _call_wsgi(self, environ, publish, relay: StreamRelay) -> Optional[WsgiResult]:
+        """Run the WSGI app on a handler thread; buffered bodies are read here too.
+
+        A streamed response is handed to `publish` instead of being returned,
+        and its body is then pumped into `relay` from this same thread.
+        """
+        started = []
+        written = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started[:] = [status, headers]
+            return written.append
+
+        app_iter = self.wsgi_app(environ, start_response)
+        status, headers = started
+        if isinstance(app_iter, AsyncFileWrapper):
+            return WsgiResult(status, headers, file=app_iter)
+        if isinstance(app_iter, (list, tuple)) or any(name.lower() == 'content-length' for name, _ in headers):
+            try:
+                body = b''.join(written + list(app_iter))
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            return WsgiResult(status, headers, body=body)
+        # Streamed response (e.g. GET /events?stream=true): the generator is drained here, on the
+        # thread that created it, because its pooled connection and request context are this thread's
+        publish(WsgiResult(status, headers, body=b''.join(written), stream=relay))
+        relay.pump(app_iter)
+        return None
+
+    async def _send_result(self, result: WsgiResult, send, receive):
+        if result.stream is not None:
+            await self._send_stream(result, send, receive)
+            return
+        await send(self._response_start(result))
+        if result.file is not None:
+            await self._send_file(result.file, send)
+        else:
+            await send({'type': 'http.response.body', 'body': result.body})
+
+    @staticmethod
+    def _response_start(result: WsgiResult) -> Dict[str, Any]:
+        return {
+            'type': 'http.response.start',
+            'status': result.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in result.headers]
+        }
+
+    async def _send_file(self, wrapper: AsyncFileWrapper, send):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.io_executor, wrapper.file.read, wrapper.buffer_size)
+                if not chunk:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await loop.run_in_executor(self.io_executor, wrapper.close)
+
+    async def _send_stream(self, result: WsgiResult, send, receive):
+        """Relay a body its handler thread is still producing, stopping if the client leaves"""
+        relay = result.stream
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            relay.disconnected.set()
+
+        watcher = asyncio.get_running_loop().create_task(watch_disconnect())
+        finished = False
+        try:
+            await send(self._response_start(result))
+            if result.body:
+                await send({'type': 'http.response.body', 'body': result.body, 'more_body': True})
+            while (chunk := await relay.chunks.get()) is not None:
+                if not relay.disconnected.is_set():
+                    try:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    except OSError:
+                        relay.disconnected.set()
+            finished = True
+            if not relay.disconnected.is_set():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
+            if not finished:
+                await relay.abandon()
+            await relay.pumping
+
+    async def _send_envelope(self, send, status_code: int, message: str):
+        """Error response in the server's envelope, built by the Flask app's JSON provider"""
+        with server.app.app_context():
+            response, _ = server.create_response(success=False, message=message, status_code=status_code)
+        await send({
+            'type': 'http.response.start',
+            'status': status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.items()]
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+app = AsgiApp(server.app)
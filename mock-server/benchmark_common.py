@@ -0,0 +1,41 @@
+"""
+Shared helpers for the benchmark scripts
+Imports the mock server into a throwaway working directory with its
+logging quieted, and holds the vocabulary used to generate events.
+"""
+
+import logging
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TITLE_WORDS = [
+    "Hội thảo", "Workshop", "Seminar", "Hội nghị", "Họp dự án", "Sinh nhật",
+    "Tiệc", "Đào tạo", "Khai trương", "Triển lãm", "Giao lưu", "Ra mắt"
+]
+TOPIC_WORDS = [
+    "Công nghệ AI", "Marketing số", "React Native", "Kotlin", "Tài chính",
+    "Khởi nghiệp", "Du lịch", "Ẩm thực", "Giáo dục", "Bất động sản",
+    "Thiết kế", "Âm nhạc", "Sức khỏe", "Thể thao", "Blockchain"
+]
+LOCATIONS = [
+    "Hà Nội", "Thành phố Hồ Chí Minh", "Đà Nẵng", "Huế", "Cần Thơ",
+    "Hải Phòng", "Nha Trang", "Đà Lạt", "Vũng Tàu", "Quy Nhơn"
+]
+KEYWORDS = ["hoi thao", "Hội thảo AI", "da nang", "kotlin", "marketing so", "không tồn tại"]
+
+
+def import_server(work_dir):
+    """Import and initialize the mock server with its working files (db, log, uploads) inside work_dir.
+
+    Only warnings and errors are logged, so the server's INFO lines
+    (migrations, per-request logs) don't interleave with the report.
+    """
+    os.chdir(work_dir)
+    sys.path.insert(0, SERVER_DIR)
+    import python_mock_server
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    python_mock_server.init_database()
+    return python_mock_server
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the batched image loader used by GET /events
+Compares the old one-query-per-event (N+1) image lookup with
+load_images_for_events() and reports query count and latency.
+
+Usage:
+    python benchmark_image_loader.py [--sizes 1000 10000 100000] [--images-per-event 2] [--repeat 3]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmark_common import import_server
+
+
+def seed_events(server, event_count, images_per_event):
+    """Fill the benchmark database with events and images"""
+    base_time = datetime(2024, 1, 1)
+    with server.get_db() as conn:
+        conn.execute("DELETE FROM images")
+        conn.execute("DELETE FROM events")
+        conn.executemany(
+            "INSERT INTO events (id, title, description, type_id, start_date, location, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    i,
+                    f"Sự kiện benchmark {i}",
+                    f"Mô tả cho sự kiện {i}",
+                    i % 4 + 1,
+                    (base_time + timedelta(days=i % 365)).isoformat(),
+                    f"Địa điểm {i % 50}",
+                    (base_time + timedelta(seconds=i)).isoformat()
+                )
+                for i in range(1, event_count + 1)
+            )
+        )
+        conn.executemany(
+            "INSERT INTO images (event_id, original_name, filename, file_path, file_size, uploaded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    i,
+                    f"photo_{i}_{n}.jpg",
+                    f"{i:08d}{n:02d}.jpg",
+                    f"uploads/{i:08d}{n:02d}.jpg",
+                    1024 * (n + 1),
+                    (base_time + timedelta(seconds=i, milliseconds=n)).isoformat()
+                )
+                for i in range(1, event_count + 1)
+                for n in range(images_per_event)
+            )
+        )
+
+
+class QueryCounter:
+    """Counts statements executed on this thread's pooled read-only server connection"""
+
+    def __init__(self, server):
+        self.count = 0
+        self._conn = server.read_pool.acquire()
+
+    def __enter__(self):
+        self._conn.set_trace_callback(self._on_statement)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._conn.set_trace_callback(None)
+
+    def _on_statement(self, statement):
+        # Transaction control is not a query
+        if not statement.lstrip().upper().startswith(("BEGIN", "COMMIT", "ROLLBACK")):
+            self.count += 1
+
+
+def get_all_events_n_plus_one(server):
+    """Reference implementation of the old get_all_events (one image query per event)"""
+    with server.get_read_db() as conn:
+        cursor = conn.execute("SELECT * FROM events WHERE 1=1 ORDER BY created_at DESC")
+        events = []
+        for event_row in cursor.fetchall():
+            event = dict(event_row)
+            event['event_type_id'] = event.pop('type_id', None)
+            for column in server.INTERNAL_EVENT_COLUMNS:
+                event.pop(column, None)
+            images_cursor = conn.execute(
+                "SELECT * FROM images WHERE event_id = ? ORDER BY uploaded_at DESC",
+                (event['id'],)
+            )
+            event['images'] = [server.image_row_to_dict(img) for img in images_cursor.fetchall()]
+            events.append(event)
+        return events
+
+
+def measure(server, loader, repeat):
+    """Return (query count of one run, best wall time in ms, result)"""
+    best = None
+    queries = 0
+    result = None
+    for _ in range(repeat):
+        with QueryCounter(server) as counter:
+            started = time.perf_counter()
+            result = loader()
+            elapsed = (time.perf_counter() - started) * 1000
+        queries = counter.count
+        best = elapsed if best is None else min(best, elapsed)
+    return queries, best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark N+1 vs batched image loading")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--images-per-event', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-n-plus-one', type=int, default=10000,
+                        help="skip the N+1 baseline above this many events (it scans images once per event)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="image_loader_bench_") as work_dir:
+        server = import_server(work_dir)
+
+        print("🚀 Image loader benchmark")
+        print("=" * 78)
+        print(f"{'events':>8} | {'mode':<10} | {'queries':>8} | {'best ms':>10} | {'speedup':>8}")
+        print("-" * 78)
+
+        for size in args.sizes:
+            seed_events(server, size, args.images_per_event)
+
+            new_queries, new_ms, new_result = measure(
+                server, lambda: server.get_all_events(), args.repeat
+            )
+
+            if size > args.max_n_plus_one:
+                print(f"{size:>8} | {'N+1':<10} | {size + 1:>8} | {'skipped':>10} | {'':>8}")
+                print(f"{size:>8} | {'batched':<10} | {new_queries:>8} | {new_ms:>10.1f} | {'':>8}")
+                continue
+
+            old_queries, old_ms, old_result = measure(
+                server, lambda: get_all_events_n_plus_one(server), args.repeat
+            )
+
+            if old_result != new_result:
+                print(f"❌ Results differ between loaders at {size} events")
+                sys.exit(1)
+
+            print(f"{size:>8} | {'N+1':<10} | {old_queries:>8} | {old_ms:>10.1f} | {'':>8}")
+            print(f"{size:>8} | {'batched':<10} | {new_queries:>8} | {new_ms:>10.1f} | "
+                  f"{old_ms / new_ms:>7.1f}x")
+
+        print("=" * 78)
+        print("✅ Benchmark completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the HTTP API
+Seeds a dataset through the API, then drives a weighted mix of reads,
+writes and image uploads from concurrent workers and reports throughput
+and p50/p95/p99/max latency per endpoint, as a table and optionally as
+JSON so runs can be compared across commits.
+
+Without --url the server runs in this process on a temporary database
+(threaded Werkzeug server). The client threads then share the GIL with
+it, so for production-like numbers start the server with prefork.py or
+asgi_app.py and pass its --url (the dataset is added to that database).
+
+Usage:
+    python benchmark_load.py [--url http://localhost:5000] [--events 1000] [--image-events 50]
+                             [--workers 16] [--duration 30] [--warmup 3]
+                             [--mix list=25,search=10,by_type=10,get=25,create=10,update=10,delete=5,upload=5]
+                             [--json results.json]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from benchmark_common import KEYWORDS, LOCATIONS, SERVER_DIR, TITLE_WORDS, TOPIC_WORDS, import_server
+
+EVENT_TYPE_IDS = [1, 2, 3, 4]
+
+# Operation name -> endpoint label in the report
+OPERATIONS = {
+    'list': "GET /events",
+    'search': "GET /events?q",
+    'by_type': "GET /events?typeId",
+    'get': "GET /events/<id>",
+    'create': "POST /events",
+    'update': "PUT /events/<id>",
+    'delete': "DELETE /events/<id>",
+    'upload': "POST /events/<id>/images",
+}
+DEFAULT_MIX = "list=25,search=10,by_type=10,get=25,create=10,update=10,delete=5,upload=5"
+SEED_BATCH_SIZE = 500  # events per POST /events/batch, the server's default maximum
+
+
+def parse_mix(value):
+    """'list=25,get=25,...' -> {operation: weight}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}', expected one of {', '.join(OPERATIONS)}")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weight of '{name}' must be a number")
+        if mix[name] < 0:
+            raise argparse.ArgumentTypeError(f"weight of '{name}' must not be negative")
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("at least one operation needs a positive weight")
+    return mix
+
+
+def start_local_server(work_dir):
+    """Serve the mock server on a free localhost port in a background thread; returns (base URL, server)"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+    server = import_server(work_dir)
+    httpd = make_server('127.0.0.1', 0, server.app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=httpd.serve_forever, name='benchmark-server', daemon=True).start()
+    return f"http://127.0.0.1:{httpd.server_port}", httpd
+
+
+class HttpClient:
+    """One keep-alive HTTP connection, reopened when the server closes it"""
+
+    def __init__(self, base_url, timeout=30.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        if parsed.scheme != 'http':
+            raise ValueError(f"only http:// URLs are supported, got {base_url}")
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.prefix = parsed.path.rstrip('/')
+        self.timeout = timeout
+        self._conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """Send one request and return (status, body bytes)"""
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(method, self.prefix + path, body=body, headers=headers or {})
+                response = self._conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # The server closed an idle keep-alive connection; retry once on a new one
+                self.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                self.close()
+                raise
+            if response.will_close:
+                self.close()
+            return response.status, data
+
+    def request_json(self, method, path, payload):
+        return self.request(method, path, json.dumps(payload).encode('utf-8'),
+                            {'Content-Type': 'application/json'})
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def event_payload(rng, n):
+    """Generated POST /events body with Vietnamese text"""
+    start = datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 365), hours=rng.randint(7, 20))
+    return {
+        "title": f"{rng.choice(TITLE_WORDS)} {rng.choice(TOPIC_WORDS)} {n}",
+        "description": f"Sự kiện về {rng.choice(TOPIC_WORDS)} và {rng.choice(TOPIC_WORDS)} tại {rng.choice(LOCATIONS)}",
+        "eventTypeId": rng.choice(EVENT_TYPE_IDS),
+        "startDate": start.isoformat(),
+        "location": rng.choice(LOCATIONS)
+    }
+
+
+def multipart_image(rng, size):
+    """(body, content type) of a multipart upload with one random PNG-named image.
+
+    The bytes are random so content-addressed storage can't dedupe them.
+    """
+    boundary = uuid.uuid4().hex
+    content = b"\x89PNG\r\n\x1a\n" + rng.randbytes(max(size - 8, 0))
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="images"; filename="load_{uuid.uuid4().hex[:8]}.png"\r\n'
+        f"Content-Type: image/png\r\n\r\n"
+    ).encode('utf-8') + content + f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def seed_dataset(client, rng, event_count, image_events, upload_bytes):
+    """Create events through POST /events/batch and give the first image_events one image; returns their ids"""
+    event_ids = []
+    for start in range(0, event_count, SEED_BATCH_SIZE):
+        batch = [event_payload(rng, n) for n in range(start, min(start + SEED_BATCH_SIZE, event_count))]
+        status, data = client.request_json('POST', '/events/batch', {"events": batch})
+        if status != 201:
+            raise RuntimeError(f"seeding failed: POST /events/batch returned {status}: {data[:200]!r}")
+        event_ids.extend(result['event']['id'] for result in json.loads(data)['data']['results'] if result['success'])
+
+    for event_id in event_ids[:image_events]:
+        body, content_type = multipart_image(rng, upload_bytes)
+        status, data = client.request('POST', f"/events/{event_id}/images", body, {'Content-Type': content_type})
+        if status != 201:
+            raise RuntimeError(f"seeding failed: image upload returned {status}: {data[:200]!r}")
+    return event_ids
+
+
+class CreatedEvents:
+    """Events created during the run; DELETE only removes these, so the seeded dataset stays stable"""
+
+    def __init__(self):
+        self._ids = []
+        self._lock = threading.Lock()
+
+    def add(self, event_id):
+        with self._lock:
+            self._ids.append(event_id)
+
+    def pop(self, rng):
+        with self._lock:
+            if not self._ids:
+                return None
+            index = rng.randrange(len(self._ids))
+            self._ids[index], self._ids[-1] = self._ids[-1], self._ids[index]
+            return self._ids.pop()
+
+
+class Recorder:
+    """Latencies and statuses collected by one worker; merged after the run"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)  # operation -> seconds
+        self.statuses = defaultdict(Counter)  # operation -> status -> count
+        self.errors = Counter()  # operation -> unexpected responses
+
+    def record(self, operation, seconds, status, ok):
+        self.latencies[operation].append(seconds)
+        self.statuses[operation][status] += 1
+        if not ok:
+            self.errors[operation] += 1
+
+    def merge(self, other):
+        for operation, values in other.latencies.items():
+            self.latencies[operation].extend(values)
+        for operation, statuses in other.statuses.items():
+            self.statuses[operation].update(statuses)
+        self.errors.update(other.errors)
+
+
+def build_request(operation, rng, seeded_ids, created, client, upload_bytes):
+    """(method, path, body, headers, expected status) for one operation, or None if it can't run yet"""
+    if operation == 'list':
+        return 'GET', "/events?limit=20", None, {}, 200
+    if operation == 'search':
+        query = urllib.parse.urlencode({'q': rng.choice(KEYWORDS), 'limit': 20})
+        return 'GET', f"/events?{query}", None, {}, 200
+    if operation == 'by_type':
+        return 'GET', f"/events?typeId={rng.choice(EVENT_TYPE_IDS)}&limit=20", None, {}, 200
+    if operation == 'get':
+        return 'GET', f"/events/{rng.choice(seeded_ids)}", None, {}, 200
+    if operation == 'create':
+        body = json.dumps(event_payload(rng, rng.randrange(10 ** 6))).encode('utf-8')
+        return 'POST', "/events", body, {'Content-Type': 'application/json'}, 201
+    if operation == 'update':
+        body = json.dumps({"title": f"Đã cập nhật {rng.randrange(10 ** 6)}", "location": rng.choice(LOCATIONS)})
+        return 'PUT', f"/events/{rng.choice(seeded_ids)}", body.encode('utf-8'), {'Content-Type': 'application/json'}, 200
+    if operation == 'delete':
+        event_id = created.pop(rng)
+        if event_id is None:
+            # Nothing created yet: make a victim outside the measurement
+            status, data = client.request_json('POST', "/events", event_payload(rng, 0))
+            if status != 201:
+                return None
+            event_id = json.loads(data)['data']['id']
+        return 'DELETE', f"/events/{event_id}", None, {}, 200
+    if operation == 'upload':
+        body, content_type = multipart_image(rng, upload_bytes)
+        return 'POST', f"/events/{rng.choice(seeded_ids)}/images", body, {'Content-Type': content_type}, 201
+    raise ValueError(f"unknown operation {operation}")
+
+
+def run_worker(base_url, seed, mix, seeded_ids, created, upload_bytes, measure_from, deadline, recorder):
+    """Send weighted random requests until deadline; only requests started after measure_from are recorded"""
+    rng = random.Random(seed)
+    client = HttpClient(base_url)
+    operations = list(mix)
+    weights = [mix[operation] for operation in operations]
+    try:
+        while time.monotonic() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            try:
+                prepared = build_request(operation, rng, seeded_ids, created, client, upload_bytes)
+            except Exception:
+                prepared = None
+            if prepared is None:
+                continue
+            method, path, body, headers, expected = prepared
+
+            started = time.monotonic()
+            try:
+                status, data = client.request(method, path, body, headers)
+            except Exception:
+                status, data = 0, b""
+            elapsed = time.monotonic() - started
+
+            if operation == 'create' and status == 201:
+                created.add(json.loads(data)['data']['id'])
+            if started >= measure_from:
+                recorder.record(operation, elapsed, status, status == expected)
+    finally:
+        client.close()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies, errors, statuses, elapsed):
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round((values[-1] if values else 0.0) * 1000, 3),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())}
+    }
+
+
+def git_revision():
+    """Short commit hash of the server tree, with '-dirty' for uncommitted changes; None outside git"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no', '.'], cwd=SERVER_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}-dirty" if dirty else revision
+
+
+def run_benchmark(base_url, args):
+    rng = random.Random(args.seed)
+    client = HttpClient(base_url)
+    try:
+        status, _ = client.request('GET', '/')
+    except OSError as e:
+        raise SystemExit(f"❌ Cannot reach {base_url}: {e}")
+    if status != 200:
+        raise SystemExit(f"❌ {base_url}/ returned {status}")
+
+    print(f"📝 Seeding {args.events} events ({args.image_events} with an image)...")
+    seeded_ids = seed_dataset(client, rng, args.events, args.image_events, args.upload_bytes)
+    client.close()
+    if not seeded_ids and any(args.mix.get(operation) for operation in ('get', 'update', 'upload')):
+        raise SystemExit("❌ get/update/upload need seeded events, use --events > 0")
+
+    print(f"🚀 Running {args.workers} workers for {args.duration:g}s (+{args.warmup:g}s warm-up) against {base_url}")
+    created = CreatedEvents()
+    recorders = [Recorder() for _ in range(args.workers)]
+    measure_from = time.monotonic() + args.warmup
+    deadline = measure_from + args.duration
+    threads = [
+        threading.Thread(target=run_worker, name=f"load-{n}", args=(
+            base_url, args.seed + n + 1, args.mix, seeded_ids, created, args.upload_bytes,
+            measure_from, deadline, recorders[n]
+        ))
+        for n in range(args.workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = max(time.monotonic() - measure_from, 1e-9)
+
+    merged = Recorder()
+    for recorder in recorders:
+        merged.merge(recorder)
+
+    endpoints = {
+        OPERATIONS[operation]: summarize(merged.latencies[operation], merged.errors[operation],
+                                         merged.statuses[operation], elapsed)
+        for operation in OPERATIONS if merged.latencies.get(operation)
+    }
+    all_statuses = Counter()
+    for statuses in merged.statuses.values():
+        all_statuses.update(statuses)
+    total = summarize([value for values in merged.latencies.values() for value in values],
+                      sum(merged.errors.values()), all_statuses, elapsed)
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "target": base_url if args.url else "in-process",
+        "config": {
+            "events": args.events,
+            "image_events": args.image_events,
+            "workers": args.workers,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "upload_bytes": args.upload_bytes,
+            "seed": args.seed,
+            "mix": args.mix
+        },
+        "elapsed_s": round(elapsed, 3),
+        "endpoints": endpoints,
+        "total": total
+    }
+
+
+def print_report(results):
+    print("=" * 108)
+    print(f"{'endpoint':<26} | {'requests':>8} | {'errors':>6} | {'req/s':>9} | "
+          f"{'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'max ms':>8}")
+    print("-" * 108)
+    rows = list(results['endpoints'].items())
+    for label, row in rows + [("total", results['total'])]:
+        if label == "total":
+            print("-" * 108)
+        print(f"{label:<26} | {row['requests']:>8} | {row['errors']:>6} | {row['throughput_rps']:>9.1f} | "
+              f"{row['p50_ms']:>8.2f} | {row['p95_ms']:>8.2f} | {row['p99_ms']:>8.2f} | {row['max_ms']:>8.2f}")
+    print("=" * 108)
+    if results['total']['errors']:
+        print(f"⚠️  {results['total']['errors']} unexpected responses (status 0 = connection error), "
+              f"see 'statuses' in the JSON output")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the mock events API")
+    parser.add_argument('--url', help="base URL of a running server (default: start one in-process)")
+    parser.add_argument('--events', type=int, default=1000, help="events to seed before the run")
+    parser.add_argument('--image-events', type=int, default=50, help="seeded events that get one image")
+    parser.add_argument('--workers', type=int, default=16, help="concurrent client threads")
+    parser.add_argument('--duration', type=float, default=30, help="measured seconds")
+    parser.add_argument('--warmup', type=float, default=3, help="unmeasured seconds before the run")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--upload-bytes', type=int, default=16 * 1024, help="size of each uploaded image")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON ('-' for stdout)")
+    args = parser.parse_args()
+    if args.workers < 1 or args.duration <= 0 or args.warmup < 0 or args.events < 0:
+        parser.error("--workers and --duration must be positive, --warmup and --events not negative")
+    if args.json and args.json != '-':
+        # The in-process server changes the working directory
+        args.json = os.path.abspath(args.json)
+
+    if args.url:
+        results = run_benchmark(args.url.rstrip('/'), args)
+    else:
+        with tempfile.TemporaryDirectory(prefix="load_bench_") as work_dir:
+            base_url, httpd = start_local_server(work_dir)
+            try:
+                results = run_benchmark(base_url, args)
+            finally:
+                httpd.shutdown()
+
+    print_report(results)
+    if args.json == '-':
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📄 Results written to {args.json}")
+    print("✅ Benchmark completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark for keyword search in GET /events
+Compares the LIKE scan fallback with the FTS5 index (events_fts)
+on a generated dataset with Vietnamese titles and descriptions.
+
+Usage:
+    python benchmark_search.py [--events 100000] [--repeat 5] [--page-size 50] [--require-parity]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmark_common import KEYWORDS, LOCATIONS, TITLE_WORDS, TOPIC_WORDS, import_server
+
+
+def seed_events(server, event_count):
+    """Insert generated events; the FTS index is kept in sync by triggers"""
+    rng = random.Random(42)
+    base_time = datetime(2024, 1, 1)
+    with server.get_db() as conn:
+        conn.executemany(
+            "INSERT INTO events (title, description, type_id, start_date, location, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    f"{rng.choice(TITLE_WORDS)} {rng.choice(TOPIC_WORDS)} {i}",
+                    f"Sự kiện về {rng.choice(TOPIC_WORDS)} và {rng.choice(TOPIC_WORDS)} "
+                    f"tại {rng.choice(LOCATIONS)}",
+                    rng.randint(1, 4),
+                    (base_time + timedelta(days=rng.randint(0, 365))).isoformat(),
+                    rng.choice(LOCATIONS),
+                    (base_time + timedelta(seconds=i)).isoformat()
+                )
+                for i in range(event_count)
+            )
+        )
+
+
+def time_search(server, keyword, limit, repeat, sort='created_at'):
+    """Return (best ms, ids of the matched events) for get_all_events"""
+    best = None
+    matched = set()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        events = server.get_all_events(keyword, limit=limit, sort=sort)
+        elapsed = (time.perf_counter() - started) * 1000
+        matched = {event['id'] for event in events}
+        best = elapsed if best is None else min(best, elapsed)
+    return best, matched
+
+
+def describe_parity(like_ids, fts_ids):
+    """'same', or how many events only one backend matched"""
+    if like_ids == fts_ids:
+        return "same"
+    return f"+{len(fts_ids - like_ids)}/-{len(like_ids - fts_ids)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LIKE vs FTS5 keyword search")
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--require-parity', action='store_true',
+                        help="exit with status 1 if LIKE and FTS5 match different events for any keyword")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="search_bench_") as work_dir:
+        server = import_server(work_dir)
+        if not server.fts_enabled:
+            print("❌ FTS5 is not available in this SQLite build, nothing to compare")
+            sys.exit(1)
+
+        print(f"📝 Seeding {args.events} events...")
+        seed_events(server, args.events)
+
+        print("🚀 Keyword search benchmark")
+        print("=" * 107)
+        print(f"{'keyword':<16} | {'backend':<8} | {'page ms':>9} | {'all ms':>9} | "
+              f"{'matches':>8} | {'vs LIKE':>8} | {'relevance ms':>12} | {'speedup':>8}")
+        print("-" * 107)
+
+        different = []
+        for keyword in KEYWORDS:
+            server.fts_enabled = False
+            like_page_ms, _ = time_search(server, keyword, args.page_size, args.repeat)
+            like_all_ms, like_ids = time_search(server, keyword, None, args.repeat)
+
+            server.fts_enabled = True
+            fts_page_ms, _ = time_search(server, keyword, args.page_size, args.repeat)
+            fts_all_ms, fts_ids = time_search(server, keyword, None, args.repeat)
+            rank_ms, _ = time_search(server, keyword, args.page_size, args.repeat, sort='relevance')
+
+            parity = describe_parity(like_ids, fts_ids)
+            # Timings of queries that return different events aren't a speedup
+            if parity == "same":
+                speedup = f"{like_page_ms / fts_page_ms:>7.1f}x"
+            else:
+                speedup = "n/a"
+                different.append(keyword)
+
+            print(f"{keyword:<16} | {'LIKE':<8} | {like_page_ms:>9.1f} | {like_all_ms:>9.1f} | "
+                  f"{len(like_ids):>8} | {'':>8} | {'-':>12} | {'':>8}")
+            print(f"{keyword:<16} | {'FTS5':<8} | {fts_page_ms:>9.1f} | {fts_all_ms:>9.1f} | "
+                  f"{len(fts_ids):>8} | {parity:>8} | {rank_ms:>12.1f} | {speedup:>8}")
+
+        print("=" * 107)
+        if different:
+            print(f"⚠️  Different results for {', '.join(repr(k) for k in different)}: LIKE matches the keyword "
+                  "as one substring, FTS5 matches each word as a prefix in any order "
+                  "(+FTS5 only/-LIKE only events)")
+        if args.require_parity and different:
+            print("❌ Backends disagree")
+            sys.exit(1)
+        print("✅ Benchmark completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+pytest setup for the mock server tests
+The server keeps events.db, server.log and uploads/ in the working
+directory, so tests import it from a throwaway directory.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+
+import pytest
+from werkzeug.datastructures import EnvironHeaders, Headers
+from werkzeug.test import EnvironBuilder
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Manual script that checks the real events.db, not a test module
+collect_ignore = ['test_database.py']
+
+# No thumbnail worker processes during tests
+os.environ.setdefault('IMAGE_VARIANTS', '0')
+os.chdir(tempfile.mkdtemp(prefix="mock_server_tests_"))
+sys.path.insert(0, SERVER_DIR)
+import python_mock_server  # noqa: E402
+
+python_mock_server.init_database()
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+@pytest.fixture
+def server():
+    return python_mock_server
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+
+@pytest.fixture
+def asgi_client(server):
+    from asgi_app import AsgiApp
+    return AsgiTestClient(AsgiApp(server.app, threads=4, init_database=False))
+
+
+@pytest.fixture
+def make_event(client):
+    """Create an event through the API and return its JSON"""
+    def make(title="Hội thảo kiểm thử", **fields):
+        payload = {
+            "title": title,
+            "description": "Mô tả",
+            "eventTypeId": 1,
+            "startDate": "2024-12-15T09:00:00",
+            "location": "Hà Nội",
+            **fields
+        }
+        response = client.post('/events', json=payload)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['data']
+    return make
+
+
+def image_file(name="photo.png", content=b"\x89PNG fake image"):
+    """(stream, filename) tuple for multipart uploads in the test client"""
+    return io.BytesIO(content), name
+
+
+class AsgiResponse:
+    def __init__(self, status_code, headers, data):
+        self.status_code = status_code
+        self.headers = headers
+        self.data = data
+
+    def get_json(self):
+        return json.loads(self.data)
+
+
+class AsgiTestClient:
+    """Calls an ASGI app in-process with requests encoded like Flask's test client.
+
+    The body is delivered in chunks of body_chunk_size bytes.
+    """
+
+    def __init__(self, app, body_chunk_size=64 * 1024):
+        self.app = app
+        self.body_chunk_size = body_chunk_size
+
+    def open(self, path, method='GET', **kwargs):
+        builder = EnvironBuilder(path=path, method=method, **kwargs)
+        try:
+            environ = builder.get_environ()
+            body = environ['wsgi.input'].read()
+        finally:
+            builder.close()
+
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': environ['PATH_INFO'].encode('latin-1').decode('utf-8'),
+            'root_path': '',
+            'query_string': environ['QUERY_STRING'].encode('latin-1'),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in EnvironHeaders(environ).items()],
+            'server': ('localhost', 80),
+            'client': ('127.0.0.1', 50000),
+        }
+        return asyncio.run(self._run(scope, body))
+
+    def get(self, path, **kwargs):
+        return self.open(path, 'GET', **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.open(path, 'POST', **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.open(path, 'PUT', **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.open(path, 'DELETE', **kwargs)
+
+    async def _run(self, scope, body):
+        chunks = [body[i:i + self.body_chunk_size] for i in range(0, len(body), self.body_chunk_size)] or [b'']
+        messages = [
+            {'type': 'http.request', 'body': chunk, 'more_body': index < len(chunks) - 1}
+            for index, chunk in enumerate(chunks)
+        ]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            # The client stays connected until the response is complete
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app(scope, receive, send)
+        start = sent[0]
+        headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in start['headers']])
+        data = b''.join(message.get('body', b'') for message in sent[1:])
+        return AsgiResponse(start['status'], headers, data)
@@ -0,0 +1,92 @@
+"""
+Resized image variants (thumbnails) for uploaded files
+Runs inside the server's spawned worker processes. Workers unpickle
+generate_variants from this module; when the server was started as a
+script they also re-run it as __mp_main__, which only defines names
+there. Pillow is optional; without it HAVE_PIL is False and the server
+leaves variants disabled.
+"""
+
+import os
+import tempfile
+from typing import Dict, List, Tuple
+
+try:
+    from PIL import Image, ImageOps
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+# Formats that can't store an alpha channel or palette as-is
+_RGB_ONLY_FORMATS = {'JPEG'}
+
+
+def variant_filename(filename: str, variant: str) -> str:
+    """'abc.jpg', 'thumb' -> 'abc_thumb.jpg'"""
+    stem, extension = os.path.splitext(filename)
+    return f"{stem}_{variant}{extension}"
+
+
+def failure_marker_filename(filename: str, variant: str) -> str:
+    """Name of the file recording that a variant can never be generated: 'abc_thumb.jpg.failed'"""
+    return variant_filename(filename, variant) + '.failed'
+
+
+class SourceImageError(Exception):
+    """The source can't be decoded or re-encoded as an image; retrying won't help"""
+
+
+def _is_image_error(error: BaseException) -> bool:
+    # Pillow reports corrupt, truncated or unsupported data as OSError without an errno;
+    # file system errors carry one and may go away on a retry
+    if HAVE_PIL and isinstance(error, (Image.UnidentifiedImageError, Image.DecompressionBombError)):
+        return True
+    if isinstance(error, OSError):
+        return error.errno is None
+    return isinstance(error, (SyntaxError, ValueError, KeyError))
+
+
+def generate_variants(source_path: str, output_dir: str,
+                      sizes: Dict[str, Tuple[int, int]]) -> List[str]:
+    """Write each variant of source_path that doesn't exist yet; return the created names.
+
+    Images are scaled down to fit the (width, height) box, keeping the aspect
+    ratio and the source format. Files are written to a temp name and renamed,
+    so a half-written variant is never served. Raises SourceImageError if the
+    source isn't an image Pillow can decode and save again.
+    """
+    try:
+        return _write_variants(source_path, output_dir, sizes)
+    except Exception as e:
+        if _is_image_error(e):
+            raise SourceImageError(f"{os.path.basename(source_path)}: {e!r}") from None
+        raise
+
+
+def _write_variants(source_path: str, output_dir: str, sizes: Dict[str, Tuple[int, int]]) -> List[str]:
+    created = []
+    with Image.open(source_path) as image:
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        if image_format in _RGB_ONLY_FORMATS and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        for variant, size in sizes.items():
+            filename = variant_filename(os.path.basename(source_path), variant)
+            target_path = os.path.join(output_dir, filename)
+            if os.path.exists(target_path):
+                continue
+
+            resized = image.copy()
+            resized.thumbnail(size)
+            fd, temp_path = tempfile.mkstemp(prefix='.variant-', dir=output_dir)
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    resized.save(out, format=image_format)
+                os.replace(temp_path, target_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            created.append(filename)
+
+    return created
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Pre-forking WSGI launcher for the mock server
+The master process binds the listening socket and runs one-time setup
+(init_database and migrations), then forks worker processes that accept
+on the shared socket. Each worker serves requests from a fixed-size
+thread pool and is replaced after --max-requests requests.
+
+Signals handled by the master:
+    SIGHUP          start a new set of workers, then stop the old ones gracefully;
+                    workers fork from the master's loaded code, so code changes
+                    still need a restart
+    SIGTERM/SIGINT  stop the workers gracefully and exit
+
+Usage:
+    python prefork.py [--host 0.0.0.0] [--port 5000] [--workers N] [--threads 8] [--max-requests 10000]
+"""
+
+import argparse
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+logger = logging.getLogger(__name__)
+
+# A worker that dies sooner than this after starting is respawned with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Launcher options; defaults can also be set through SERVER_* environment variables"""
+    parser = argparse.ArgumentParser(description="Pre-forking server for the mock events API")
+    parser.add_argument('--host', default=os.environ.get('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SERVER_PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVER_WORKERS', str(os.cpu_count() or 1))),
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVER_THREADS', '8')),
+                        help="request threads per worker")
+    parser.add_argument('--max-requests', type=int, default=int(os.environ.get('SERVER_MAX_REQUESTS', '10000')),
+                        help="replace a worker after this many requests (0 = never)")
+    parser.add_argument('--max-requests-jitter', type=int,
+                        default=int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', '1000')),
+                        help="random extra requests per worker, so workers don't all restart at once")
+    parser.add_argument('--keepalive', type=float, default=float(os.environ.get('SERVER_KEEPALIVE', '5')),
+                        help="seconds an idle keep-alive connection may hold a thread")
+    parser.add_argument('--graceful-timeout', type=float,
+                        default=float(os.environ.get('SERVER_GRACEFUL_TIMEOUT', '30')),
+                        help="seconds stopping workers get to finish in-flight requests")
+    parser.add_argument('--backlog', type=int, default=2048)
+    return parser
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    """HTTP/1.1 handler whose idle keep-alive connections time out"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        self.timeout = self.server.keepalive_timeout
+        super().setup()
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        # Let a stopping worker drain instead of waiting on idle connections
+        if self.server.stopping.is_set():
+            self.close_connection = True
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server on an inherited socket, handling connections in a thread pool.
+
+    The accept loop blocks while every thread is busy, so new connections
+    wait in the shared backlog for a worker with a free thread.
+    """
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, app, fd: int, host: str, port: int, threads: int,
+                 max_requests: int = 0, keepalive_timeout: float = 5.0):
+        super().__init__(host, port, self._counting(app), handler=PooledRequestHandler, fd=fd)
+        self.keepalive_timeout = keepalive_timeout
+        self.max_requests = max_requests
+        self.handled = 0
+        self.stopping = threading.Event()
+        self._count_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(threads)
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix='request')
+
+    def _counting(self, app):
+        def counted_app(environ, start_response):
+            with self._count_lock:
+                self.handled += 1
+                recycle = self.max_requests and self.handled >= self.max_requests
+            if recycle:
+                self.stop()
+            return app(environ, start_response)
+        return counted_app
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._process_request_thread, request, client_address)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def stop(self):
+        """Stop accepting connections; safe to call from any thread or a signal handler"""
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        # shutdown() waits for serve_forever() to return, so it can't run on the serving thread
+        threading.Thread(target=self.shutdown, name='server-shutdown', daemon=True).start()
+
+    def drain(self):
+        """Wait for in-flight requests after serve_forever() has returned"""
+        self._executor.shutdown(wait=True)
+
+
+def create_listener(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    listener = socket.create_server((host, port), family=family, backlog=backlog)
+    # Idle workers all wake on a new connection; the ones that lose the race
+    # must get EAGAIN from accept() instead of blocking in it
+    listener.setblocking(False)
+    return listener
+
+
+class Master:
+    """Forks and supervises the worker processes"""
+
+    def __init__(self, app, args, on_starting: Optional[Callable[[], None]] = None,
+                 on_worker_exit: Optional[Callable[[], None]] = None):
+        self.app = app
+        self.args = args
+        self.on_starting = on_starting
+        self.on_worker_exit = on_worker_exit
+        self.listener = None
+        self.workers: Dict[int, float] = {}  # pid -> start time
+        self.retiring: Dict[int, float] = {}  # pid -> time SIGTERM was sent
+        self.stopping = False
+        self._signals = []
+        self._wakeup_r = self._wakeup_w = None
+
+    def run(self):
+        self.listener = create_listener(self.args.host, self.args.port, self.args.backlog)
+        if self.on_starting:
+            self.on_starting()
+        self._install_signal_handlers()
+        logger.info(f"🚀 Master {os.getpid()} listening on http://{self.args.host}:{self.args.port} "
+                    f"with {self.args.workers} workers x {self.args.threads} threads")
+        for _ in range(self.args.workers):
+            self.spawn_worker()
+
+        while self.workers or self.retiring:
+            self._wait_for_signal(1.0)
+            self._handle_signals()
+            self._reap_workers()
+            self._kill_overdue()
+
+        self.listener.close()
+        logger.info("👋 Master stopped")
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return pid
+
+        exit_code = 1
+        try:
+            self._reset_signals_in_worker()
+            exit_code = run_worker(self.app, self.listener, self.args)
+        except BaseException:
+            logger.exception(f"❌ Worker {os.getpid()} crashed")
+        finally:
+            try:
+                if self.on_worker_exit:
+                    self.on_worker_exit()
+            finally:
+                # Never return into the master's loop
+                os._exit(exit_code)
+
+    def reload(self):
+        """Replace every worker: start the new set first so the socket is always served.
+
+        New workers fork from this process, so they run the code loaded at startup.
+        """
+        logger.info(f"🔄 Reloading {len(self.workers)} workers")
+        old_workers = list(self.workers)
+        for _ in range(self.args.workers):
+            self.spawn_worker()
+        for pid in old_workers:
+            self._retire(pid)
+
+    def stop(self):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"🛑 Stopping {len(self.workers)} workers")
+        for pid in list(self.workers):
+            self._retire(pid)
+
+    def _retire(self, pid: int):
+        self.workers.pop(pid, None)
+        self.retiring[pid] = time.monotonic()
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def _reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            exit_code = os.waitstatus_to_exitcode(status)
+            if self.retiring.pop(pid, None) is not None:
+                continue
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+
+            if exit_code == 0:
+                logger.info(f"♻️ Worker {pid} recycled, starting a replacement")
+            else:
+                logger.warning(f"⚠️ Worker {pid} exited with code {exit_code}, starting a replacement")
+                if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    # Don't spin if workers die at startup
+                    time.sleep(MIN_WORKER_LIFETIME)
+            self.spawn_worker()
+
+    def _kill_overdue(self):
+        now = time.monotonic()
+        for pid, retired_at in list(self.retiring.items()):
+            if now - retired_at > self.args.graceful_timeout:
+                logger.warning(f"⚠️ Worker {pid} did not stop within {self.args.graceful_timeout:.0f}s, killing it")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self.retiring[pid] = float('inf')
+
+    def _install_signal_handlers(self):
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        signal.set_wakeup_fd(self._wakeup_w)
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(signum, self._on_signal)
+
+    def _on_signal(self, signum, frame):
+        if signum != signal.SIGCHLD:
+            self._signals.append(signum)
+
+    def _wait_for_signal(self, timeout: float):
+        readable, _, _ = select.select([self._wakeup_r], [], [], timeout)
+        if readable:
+            try:
+                while os.read(self._wakeup_r, 512):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def _handle_signals(self):
+        while self._signals:
+            signum = self._signals.pop(0)
+            if signum == signal.SIGHUP and not self.stopping:
+                self.reload()
+            elif signum in (signal.SIGTERM, signal.SIGINT):
+                self.stop()
+
+    def _reset_signals_in_worker(self):
+        signal.set_wakeup_fd(-1)
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        # Ctrl-C reaches the whole process group; the master turns it into SIGTERM
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+
+def run_worker(app, listener: socket.socket, args) -> int:
+    """Serve on the inherited listener until stopped or recycled; returns the exit code"""
+    max_requests = args.max_requests
+    if max_requests and args.max_requests_jitter:
+        max_requests += random.randint(0, args.max_requests_jitter)
+    server = PooledWSGIServer(app, listener.fileno(), args.host, args.port, args.threads,
+                              max_requests=max_requests, keepalive_timeout=args.keepalive)
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+
+    logger.info(f"👷 Worker {os.getpid()} started ({args.threads} threads, "
+                f"max requests: {max_requests or 'unlimited'})")
+    server.serve_forever()
+    server.drain()
+    logger.info(f"👋 Worker {os.getpid()} stopped after {server.handled} requests")
+    return 0
+
+
+def serve(app, args, on_starting: Optional[Callable[[], None]] = None,
+          on_worker_exit: Optional[Callable[[], None]] = None):
+    """Run the pre-forking server until SIGTERM/SIGINT.
+
+    on_starting runs once in the master before any worker is forked;
+    on_worker_exit runs in each worker just before it exits.
+    """
+    if args.workers < 1 or args.threads < 1:
+        raise ValueError("--workers and --threads must be at least 1")
+    Master(app, args, on_starting, on_worker_exit).run()
+
+
+def main():
+    args = build_parser().parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import python_mock_server as server
+    serve(server.app, args, on_starting=server.init_database, on_worker_exit=server.shutdown_worker)
+
+
+if __name__ == "__main__":
+    main()
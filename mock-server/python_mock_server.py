@@ -1,176 +1,1318 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, stream_with_context, send_file, abort
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+from werkzeug.exceptions import ClientDisconnected
+import mimetypes
 import uuid
 import json
 import sqlite3
 import contextlib
-from typing import List, Dict, Optional, Any
+import base64
+import re
+import unicodedata
+import threading
+import time
+import random
+import queue
+import atexit
+import hashlib
+import gzip
+import zlib
+from collections import OrderedDict
+import tempfile
+import shutil
+import functools
+import urllib.parse
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Tuple, Iterator
 import logging
+import logging.handlers
+from image_variants import HAVE_PIL, SourceImageError, failure_marker_filename, generate_variants, variant_filename
+
+# Optional response compression codecs; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('server.log'),
-        logging.StreamHandler()
-    ]
-)
+def _parse_route_settings(value: str) -> Dict[str, str]:
+    """Parse 'rule=value,rule=value' settings, e.g. '/events=full,/uploads/<filename>=off'"""
+    settings = {}
+    for item in value.split(','):
+        if '=' in item:
+            rule, setting = item.rsplit('=', 1)
+            settings[rule.strip()] = setting.strip()
+    return settings
+
+# Request logging configuration
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'banner')  # 'banner' (multi-line, emoji) or 'json' (one line)
+LOG_VERBOSITY_LEVELS = ('off', 'summary', 'headers', 'full')
+LOG_DEFAULT_VERBOSITY = os.environ.get('LOG_VERBOSITY', 'summary')
+# Per-route overrides keyed by Flask rule, e.g. LOG_ROUTE_VERBOSITY='/events=full'
+LOG_ROUTE_VERBOSITY = _parse_route_settings(os.environ.get('LOG_ROUTE_VERBOSITY', ''))
+LOG_DEFAULT_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '1.0'))
+LOG_ROUTE_SAMPLE_RATES = {
+    rule: float(rate)
+    for rule, rate in _parse_route_settings(os.environ.get('LOG_ROUTE_SAMPLE_RATES', '')).items()
+}
+LOG_BODY_MAX_BYTES = int(os.environ.get('LOG_BODY_MAX_BYTES', '2048'))
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+SENSITIVE_HEADERS = {'authorization', 'cookie'}
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread and never blocks.
+
+    The stock QueueHandler formats every record on the calling thread; here the
+    request thread only enqueues, and records are dropped when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+# Configure logging: handlers run on a background listener thread
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+log_queue_handler = DeferredQueueHandler(log_queue)
+_log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+# server.log is opened on the first record; _start_process() installs the handlers
+_log_handlers = [logging.FileHandler('server.log', delay=True), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+log_listener = logging.handlers.QueueListener(log_queue, *_log_handlers, respect_handler_level=True)
+
+def _stop_log_listener():
+    # QueueListener.stop() fails if the listener isn't running
+    if log_listener._thread is not None:
+        log_listener.stop()
+
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger(f"{__name__}.access")
 
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 DATABASE_PATH = 'events.db'
+# Resized variants generated in the background for each upload (requires Pillow),
+# e.g. IMAGE_VARIANT_SIZES='thumb=120x120,medium=480x480'
+IMAGE_VARIANTS_ENABLED = os.environ.get('IMAGE_VARIANTS', '1').lower() in ('1', 'true', 'yes') and HAVE_PIL
+IMAGE_VARIANT_SIZES = {
+    name: tuple(int(side) for side in size.lower().split('x', 1))
+    for name, size in _parse_route_settings(os.environ.get('IMAGE_VARIANT_SIZES', 'thumb=120x120,medium=480x480')).items()
+}
+VARIANT_FOLDER = os.path.join(UPLOAD_FOLDER, 'variants')
+VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', '2'))
+# Jobs waiting for a worker; uploads beyond this are skipped (variants get queued again on first request)
+VARIANT_QUEUE_SIZE = int(os.environ.get('IMAGE_VARIANT_QUEUE_SIZE', '1000'))
+VARIANT_MAX_ATTEMPTS = 3
+VARIANT_RETRY_DELAY = 2.0  # seconds, doubled after each failed attempt
+# /uploads serving: stored files never change (names are content hashes or UUIDs)
+UPLOADS_MAX_AGE = int(os.environ.get('UPLOADS_MAX_AGE', str(365 * 24 * 3600)))
+# '' serves files from Flask (sendfile via wsgi.file_wrapper where the server has it),
+# 'x-sendfile' (Apache/lighttpd) or 'x-accel-redirect' (nginx) hands the transfer to the proxy
+UPLOADS_SENDFILE_MODE = os.environ.get('UPLOADS_SENDFILE_MODE', '').lower()
+# nginx `internal` location that maps to UPLOAD_FOLDER, used with x-accel-redirect
+UPLOADS_ACCEL_PREFIX = os.environ.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+# Resumable uploads (upload sessions): partial files live in UPLOAD_SESSION_FOLDER
+UPLOAD_SESSION_FOLDER = os.path.join(UPLOAD_FOLDER, '.sessions')
+# Uploads being written or hashed before they're placed; a subdirectory, so /uploads/<filename>
+# can't serve them, on the same filesystem as UPLOAD_FOLDER, so placing them is a rename
+UPLOAD_TEMP_FOLDER = os.path.join(UPLOAD_FOLDER, '.tmp')
+UPLOAD_SESSION_MAX_BYTES = int(os.environ.get('UPLOAD_SESSION_MAX_BYTES', str(50 * 1024 * 1024)))
+# Sessions without a chunk for this long are deleted with their partial file
+UPLOAD_SESSION_TTL = float(os.environ.get('UPLOAD_SESSION_TTL', str(24 * 3600)))
+UPLOAD_SESSION_GC_INTERVAL = 600  # seconds between garbage collection runs
+# A chunk writer's claim on a session expires after this, in case its process died
+UPLOAD_SESSION_CLAIM_TIMEOUT = 300
+# Response compression (Accept-Encoding): br and zstd are used when their modules are installed
+COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION', '1').lower() in ('1', 'true', 'yes')
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))  # bytes; smaller bodies are sent as-is
+COMPRESSION_LEVELS = {
+    'br': int(os.environ.get('COMPRESSION_BROTLI_LEVEL', '5')),
+    'zstd': int(os.environ.get('COMPRESSION_ZSTD_LEVEL', '3')),
+    'gzip': int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6')),
+}
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/html'}
+# Compressed bodies of responses with a strong ETag are kept for reuse, up to this many bytes
+COMPRESSION_CACHE_BYTES = int(os.environ.get('COMPRESSION_CACHE_BYTES', str(16 * 1024 * 1024)))
+# Serialized GET /events pages, reused until the next write (or the TTL, for writes made by
+# other tools on the same events.db). EVENTS_CACHE=0 turns it off for debugging.
+EVENTS_CACHE_ENABLED = os.environ.get('EVENTS_CACHE', '1').lower() in ('1', 'true', 'yes')
+EVENTS_CACHE_BYTES = int(os.environ.get('EVENTS_CACHE_BYTES', str(32 * 1024 * 1024)))
+EVENTS_CACHE_TTL = float(os.environ.get('EVENTS_CACHE_TTL', '30'))  # seconds
+# Read size used when streaming an upload to disk while hashing it
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Threads writing the files of one upload request to disk in parallel
+UPLOAD_SPOOL_WORKERS = int(os.environ.get('UPLOAD_SPOOL_WORKERS', '4'))
+# Max event IDs bound into a single batched image query (see load_images_for_events)
+IMAGE_LOADER_CHUNK_SIZE = 10000
+# Page size cap for GET /events; requests without `limit` get a page of this size
+MAX_PAGE_SIZE = int(os.environ.get('EVENTS_MAX_PAGE_SIZE', '500'))
+# Streaming mode for GET /events (?stream=true, or always when EVENTS_STREAM_RESPONSES is set)
+STREAM_RESPONSES_DEFAULT = os.environ.get('EVENTS_STREAM_RESPONSES', '').lower() in ('1', 'true', 'yes')
+# Streamed responses don't hold the page in memory, so they may return larger pages
+STREAM_MAX_PAGE_SIZE = int(os.environ.get('EVENTS_STREAM_MAX_PAGE_SIZE', '100000'))
+# Rows fetched from the cursor (and serialized) per streamed chunk
+STREAM_BATCH_SIZE = 500
+# Keyword search backend: 'fts' uses the SQLite FTS5 index when available, 'like' forces the LIKE scan
+SEARCH_BACKEND = os.environ.get('EVENTS_SEARCH_BACKEND', 'fts')
+# bm25 column weights for title, description, location
+SEARCH_RANK_WEIGHTS = (10.0, 5.0, 1.0)
+EVENT_SORT_ORDERS = ('created_at', 'relevance')
+
+# Maximum number of events accepted by POST /events/batch
+MAX_BATCH_SIZE = int(os.environ.get('EVENTS_MAX_BATCH_SIZE', '500'))
+
+# Change feed (GET /events/changes): delete tombstones older than this are compacted
+TOMBSTONE_RETENTION_DAYS = float(os.environ.get('TOMBSTONE_RETENTION_DAYS', '30'))
+TOMBSTONE_COMPACTION_INTERVAL = 600  # seconds between compaction runs
+
+# SQLite connection tuning, applied to every pooled connection
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable enough under WAL
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '16384'))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', '5.0'))
+# Connections kept open for reuse after their owning thread exits
+DB_POOL_MAX_IDLE = int(os.environ.get('DB_POOL_MAX_IDLE', '8'))
+# GET routes read through separate mode=ro connections (SQLITE_READ_POOL=0 reads on the writer pool)
+READ_POOL_ENABLED = os.environ.get('SQLITE_READ_POOL', '1').lower() in ('1', 'true', 'yes')
+# Event mutations go to one writer thread that commits them in groups
+# (SQLITE_WRITE_QUEUE=0 runs each in its own transaction on the request thread)
+WRITE_QUEUE_ENABLED = os.environ.get('SQLITE_WRITE_QUEUE', '1').lower() in ('1', 'true', 'yes')
+WRITE_GROUP_MAX_SIZE = int(os.environ.get('SQLITE_WRITE_GROUP_SIZE', '64'))
+# How long the writer waits for more mutations after the first one of a group
+WRITE_GROUP_WINDOW = float(os.environ.get('SQLITE_WRITE_GROUP_WINDOW_MS', '1')) / 1000
+WRITE_QUEUE_SIZE = 1000  # submitters block while this many mutations are waiting
+
+# Set by init_database once the FTS5 index is known to exist
+fts_enabled = False
+# Set once init_database has run in this process (or in the prefork master before fork)
+database_initialized = False
+_database_init_lock = threading.Lock()
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['USE_X_SENDFILE'] = UPLOADS_SENDFILE_MODE == 'x-sendfile'
 
-# Create upload directory if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-def log_request():
-    """Log detailed request information"""
-    logger.info("=" * 80)
-    logger.info(f"🌐 NEW REQUEST: {request.method} {request.url}")
-    logger.info(f"📅 Timestamp: {datetime.now().isoformat()}")
-    logger.info(f"👤 Client IP: {request.remote_addr}")
-    logger.info(f"🌍 User Agent: {request.headers.get('User-Agent', 'Unknown')}")
-    
-    # Log headers
-    logger.info("📋 Headers:")
-    for header, value in request.headers.items():
-        if header.lower() not in ['authorization', 'cookie']:  # Skip sensitive headers
-            logger.info(f"   {header}: {value}")
-    
-    # Log query parameters
-    if request.args:
-        logger.info("🔍 Query Parameters:")
-        for key, value in request.args.items():
-            logger.info(f"   {key}: {value}")
-    
-    # Log form data
-    if request.form:
-        logger.info("📝 Form Data:")
-        for key, value in request.form.items():
-            logger.info(f"   {key}: {value}")
-    
-    # Log JSON body
-    if request.is_json:
-        try:
-            body = request.get_json()
-            logger.info("📄 JSON Body:")
-            logger.info(f"   {json.dumps(body, indent=2, ensure_ascii=False)}")
-        except Exception as e:
-            logger.error(f"❌ Error parsing JSON body: {e}")
+
+class RequestLogEntry:
+    """Snapshot of one request/response, rendered lazily by the log listener thread"""
+
+    def __init__(self, entry: Dict[str, Any]):
+        self.entry = entry
+
+    def __str__(self):
+        if LOG_FORMAT == 'json':
+            return json.dumps(self.entry, ensure_ascii=False, separators=(',', ':'), default=str)
+        return self._banner()
+
+    def _banner(self):
+        entry = self.entry
+        lines = [
+            "=" * 80,
+            f"🌐 REQUEST: {entry['method']} {entry['path']}",
+            f"📅 Timestamp: {entry['timestamp']}",
+            f"👤 Client IP: {entry['client_ip']}",
+        ]
+        if 'user_agent' in entry:
+            lines.append(f"🌍 User Agent: {entry['user_agent']}")
+        if 'request_headers' in entry:
+            lines.append("📋 Headers:")
+            lines.extend(f"   {header}: {value}" for header, value in entry['request_headers'].items())
+        if 'request_body' in entry:
+            lines.append("📄 Request Body:")
+            lines.append(f"   {entry['request_body']}")
+        if 'files' in entry:
+            lines.append("📁 Files:")
+            lines.extend(f"   {name}" for name in entry['files'])
+        lines.append("-" * 80)
+        encoding = f", {entry['content_encoding']}" if 'content_encoding' in entry else ""
+        lines.append(f"📤 RESPONSE: Status {entry['status']} in {entry['duration_ms']} ms "
+                     f"({entry['response_size']} bytes{encoding})")
+        if 'response_body' in entry:
+            lines.append("📄 Response Body:")
+            lines.append(f"   {entry['response_body']}")
+        lines.append("=" * 80)
+        return "\n".join(lines)
+
+def _truncate_body(body: bytes) -> str:
+    text = body[:LOG_BODY_MAX_BYTES].decode('utf-8', 'replace').rstrip()
+    if len(body) > LOG_BODY_MAX_BYTES:
+        text += f"... ({len(body) - LOG_BODY_MAX_BYTES} more bytes)"
+    return text
+
+def get_route_log_settings(rule: str) -> Tuple[str, float]:
+    """Return (verbosity, sample rate) for a Flask rule"""
+    verbosity = LOG_ROUTE_VERBOSITY.get(rule, LOG_DEFAULT_VERBOSITY)
+    sample_rate = LOG_ROUTE_SAMPLE_RATES.get(rule, LOG_DEFAULT_SAMPLE_RATE)
+    return verbosity, sample_rate
+
+def log_request_response(response):
+    """Queue one log entry for the current request.
+
+    Only cheap snapshots are taken here; formatting and I/O happen on the
+    log listener thread. Server errors are always logged, other responses
+    follow the route's verbosity and sampling rate.
+    """
+    rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+    verbosity, sample_rate = get_route_log_settings(rule)
+    is_error = response.status_code >= 500
+    if not is_error and (verbosity == 'off' or (sample_rate < 1.0 and random.random() >= sample_rate)):
+        return
     
-    # Log files
-    if request.files:
-        logger.info("📁 Files:")
-        for key, file in request.files.items():
-            if file and file.filename:
-                logger.info(f"   {key}: {file.filename} ({file.content_type})")
+    started = g.get('request_started')
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "method": request.method,
+        "path": request.full_path.rstrip('?'),
+        "route": rule,
+        "client_ip": request.remote_addr,
+        "status": response.status_code,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2) if started else None,
+        "response_size": response.content_length
+    }
+    if response.content_encoding:
+        entry["content_encoding"] = response.content_encoding
     
-    logger.info("-" * 80)
-
-def log_response(response_data, status_code):
-    """Log response information"""
-    logger.info(f"📤 RESPONSE: Status {status_code}")
+    if verbosity in ('headers', 'full'):
+        entry["user_agent"] = request.headers.get('User-Agent', 'Unknown')
+        entry["request_headers"] = {
+            header: value for header, value in request.headers.items()
+            if header.lower() not in SENSITIVE_HEADERS
+        }
     
-    if isinstance(response_data, tuple):
-        response_json, status = response_data
-        try:
-            response_dict = response_json.get_json()
-            logger.info("📄 Response Body:")
-            logger.info(f"   {json.dumps(response_dict, indent=2, ensure_ascii=False)}")
-        except Exception as e:
-            logger.error(f"❌ Error parsing response JSON: {e}")
-    else:
-        logger.info(f"📄 Response: {response_data}")
+    if verbosity == 'full':
+        if request.mimetype == 'multipart/form-data':
+            # Parsed by the view already; never read upload bodies just for logging
+            entry["files"] = [
+                f"{key}: {file.filename} ({file.content_type})"
+                for key, file in request.files.items(multi=True) if file and file.filename
+            ]
+        elif request.content_length:
+            entry["request_body"] = _truncate_body(request.get_data(cache=True))
+        if response.content_encoding:
+            entry["response_body"] = f"<{response.content_encoding} encoded, {response.content_length} bytes>"
+        elif not response.is_streamed and not response.direct_passthrough:
+            entry["response_body"] = _truncate_body(response.get_data())
     
-    logger.info("=" * 80)
+    access_logger.log(logging.ERROR if is_error else logging.INFO, "%s", RequestLogEntry(entry))
+
+# Default Prometheus histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+WRITE_GROUP_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+class _MetricShard:
+    """Metric values written by a single thread"""
+
+    def __init__(self):
+        self.values = {}      # (name, labels) -> float, for counters and gauges
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+class MetricsRegistry:
+    """Prometheus-style counters, gauges and histograms.
+
+    Each thread writes only to its own shard, so recording a metric takes no
+    lock. A scrape copies and sums all shards; shards of finished threads are
+    folded into a retired shard so their counts are kept.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # shard registration and scrapes only
+        self._shards = {}  # thread -> shard
+        self._retired = _MetricShard()
+        self._metadata = {}  # name -> (type, help, buckets)
+
+    def describe(self, name: str, metric_type: str, help_text: str, buckets: Tuple[float, ...] = None):
+        self._metadata[name] = (metric_type, help_text, buckets)
+
+    def _shard(self) -> _MetricShard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _MetricShard()
+            with self._lock:
+                self._shards[threading.current_thread()] = shard
+        return shard
+
+    def inc(self, name: str, value: float = 1, labels: Tuple[Tuple[str, str], ...] = ()):
+        """Add to a counter or gauge (negative values for gauges)"""
+        values = self._shard().values
+        key = (name, labels)
+        values[key] = values.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Tuple[Tuple[str, str], ...] = ()):
+        """Record one histogram observation"""
+        histograms = self._shard().histograms
+        key = (name, labels)
+        buckets = self._metadata[name][2]
+        data = histograms.get(key)
+        if data is None:
+            data = histograms[key] = [0] * (len(buckets) + 2)
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                data[index] += 1
+                break
+        data[-2] += value
+        data[-1] += 1
+
+    def collect(self) -> Tuple[Dict[Any, float], Dict[Any, List[float]]]:
+        """Sum all shards into (values, histograms)"""
+        with self._lock:
+            for thread in [t for t in self._shards if not t.is_alive()]:
+                self._merge(self._retired, self._shards.pop(thread))
+            total = _MetricShard()
+            self._merge(total, self._retired)
+            for shard in self._shards.values():
+                self._merge(total, shard)
+        return total.values, total.histograms
+
+    @staticmethod
+    def _merge(target: _MetricShard, source: _MetricShard):
+        # dict.copy()/list() are atomic under the GIL, so the owning thread can keep writing
+        for key, value in source.values.copy().items():
+            target.values[key] = target.values.get(key, 0) + value
+        for key, data in source.histograms.copy().items():
+            data = list(data)
+            existing = target.histograms.get(key)
+            target.histograms[key] = data if existing is None else [a + b for a, b in zip(existing, data)]
+
+    def render(self, extra_gauges: Dict[str, Tuple[str, List[Tuple[Tuple[Tuple[str, str], ...], float]]]] = None) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        values, histograms = self.collect()
+        lines = []
+        
+        for name, (metric_type, help_text, buckets) in self._metadata.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == 'histogram':
+                for (metric, labels), data in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets, data):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {data[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(data[-2])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {data[-1]}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        
+        for name, (help_text, samples) in (extra_gauges or {}).items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        
+        return "\n".join(lines) + "\n"
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+metrics = MetricsRegistry()
+metrics.describe('http_requests_total', 'counter', "HTTP requests by route, method and status code")
+metrics.describe('http_request_duration_seconds', 'histogram', "HTTP request latency by route", LATENCY_BUCKETS)
+metrics.describe('http_requests_in_flight', 'gauge', "HTTP requests currently being handled")
+metrics.describe('sqlite_queries_total', 'counter', "SQLite statements executed, by route")
+metrics.describe('sqlite_queries_per_request', 'histogram', "SQLite statements per request, by route", QUERY_COUNT_BUCKETS)
+metrics.describe('sqlite_query_seconds_per_request', 'histogram', "Time spent in SQLite per request, by route", LATENCY_BUCKETS)
+metrics.describe('upload_bytes_total', 'counter', "Bytes of uploaded image files stored")
+metrics.describe('uploaded_images_total', 'counter', "Uploaded image files stored")
+metrics.describe('upload_deduplicated_total', 'counter', "Uploaded images whose content was already stored")
+metrics.describe('http_compressed_responses_total', 'counter', "Responses sent compressed, by encoding")
+metrics.describe('http_compression_saved_bytes_total', 'counter', "Bytes saved by response compression, by encoding")
+metrics.describe('cache_requests_total', 'counter', "Response body cache lookups, by cache and result")
+metrics.describe('image_variants_generated_total', 'counter', "Resized image variants written")
+metrics.describe('image_variant_jobs_failed_total', 'counter', "Variant jobs that failed after all attempts")
+metrics.describe('image_variant_jobs_dropped_total', 'counter', "Variant jobs skipped because the queue was full")
+metrics.describe('sqlite_write_groups_total', 'counter', "Write transactions committed by the writer thread")
+metrics.describe('sqlite_write_group_size', 'histogram', "Mutations per writer-thread transaction", WRITE_GROUP_SIZE_BUCKETS)
+metrics.describe('sqlite_write_group_failures_total', 'counter', "Writer-thread transactions that failed to commit")
+
+# Per-thread SQLite statement count and time, reset at the start of each request
+query_stats = threading.local()
 
-# Request logging middleware
+def reset_query_stats():
+    query_stats.count = 0
+    query_stats.seconds = 0.0
+
+def get_query_stats() -> Tuple[int, float]:
+    """(statements, seconds) executed by the calling thread since the last reset"""
+    return getattr(query_stats, 'count', 0), getattr(query_stats, 'seconds', 0.0)
+
+# Request logging and metrics middleware
 @app.before_request
 def before_request():
-    log_request()
+    g.request_started = time.perf_counter()
+    reset_query_stats()
+    metrics.inc('http_requests_in_flight')
+    ensure_database_initialized()
 
 @app.after_request
 def after_request(response):
-    log_response(response, response.status_code)
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    route_labels = (('method', request.method), ('route', route))
+    metrics.inc('http_requests_total', labels=route_labels + (('status', str(response.status_code)),))
+    metrics.observe('http_request_duration_seconds', time.perf_counter() - g.request_started, route_labels)
+    
+    query_count, query_seconds = get_query_stats()
+    metrics.inc('sqlite_queries_total', query_count, route_labels)
+    metrics.observe('sqlite_queries_per_request', query_count, route_labels)
+    metrics.observe('sqlite_query_seconds_per_request', query_seconds, route_labels)
+    
+    response = compress_response(response)
+    log_request_response(response)
     return response
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
+def _compress_gzip(data: bytes, level: int) -> bytes:
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+# Supported encodings in server preference order
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS['br'] = lambda data, level: brotli.compress(data, quality=level)
+if zstandard is not None:
+    COMPRESSORS['zstd'] = lambda data, level: zstandard.ZstdCompressor(level=level).compress(data)
+COMPRESSORS['gzip'] = _compress_gzip
+
+class BodyCache:
+    """LRU of serialized response bodies, bounded in bytes, with an optional TTL.
+
+    Values are stored together with their size in bytes; lookups are
+    counted in cache_requests_total under the cache's name.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl: Optional[float] = None, enabled: bool = True):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._discard(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.inc('cache_requests_total', labels=(('cache', self.name), ('result', 'hit' if entry is not None else 'miss')))
+        return entry[0] if entry is not None else None
+
+    def put(self, key, value, size: int):
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+# Keyed by (strong ETag, encoding)
+compressed_body_cache = BodyCache('compressed_body', COMPRESSION_CACHE_BYTES)
+
+def gzip_stream(chunks, level: int):
+    """gzip a streamed body chunk by chunk, flushing after each so the client sees progress"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        # Closes the wrapped generator (and its database cursor) on client disconnect
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compress_response(response):
+    """Compress the response body for the best encoding the client accepts.
+
+    Only 200 responses of a compressible type are compressed; complete
+    bodies must be at least COMPRESSION_MIN_SIZE bytes, streamed ones are
+    gzipped as they are produced. The ETag becomes weak, since the bytes
+    differ from the identity encoding but the content is the same, so
+    If-None-Match keeps matching.
+    """
+    if not COMPRESSION_ENABLED or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or request.method == 'HEAD'):
+        return response
+    
+    if response.is_streamed:
+        if request.accept_encodings.best_match(['gzip']) is None:
+            return response
+        response.response = gzip_stream(response.response, COMPRESSION_LEVELS['gzip'])
+        response.headers['Content-Encoding'] = 'gzip'
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(etag, weak=True)
+        metrics.inc('http_compressed_responses_total', labels=(('encoding', 'gzip'),))
+        return response
+    
+    encoding = request.accept_encodings.best_match(list(COMPRESSORS))
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+    
+    etag, weak = response.get_etag()
+    cache_key = (etag, encoding) if etag and not weak else None
+    compressed = compressed_body_cache.get(cache_key) if cache_key else None
+    if compressed is None:
+        compressed = COMPRESSORS[encoding](body, COMPRESSION_LEVELS[encoding])
+        if cache_key:
+            compressed_body_cache.put(cache_key, compressed, len(compressed))
+    if len(compressed) >= len(body):
+        return response
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(etag, weak=True)
+    labels = (('encoding', encoding),)
+    metrics.inc('http_compressed_responses_total', labels=labels)
+    metrics.inc('http_compression_saved_bytes_total', len(body) - len(compressed), labels)
+    return response
+
+@app.teardown_request
+def teardown_request(error=None):
+    metrics.inc('http_requests_in_flight', -1)
+
+def fold_text(value: Optional[str]) -> Optional[str]:
+    """Lowercase and strip diacritics so 'Hội Thảo' and 'hoi thao' compare equal"""
+    if value is None:
+        return None
+    decomposed = unicodedata.normalize('NFKD', str(value).casefold())
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    # đ is a separate letter in Unicode, not d + combining mark
+    return stripped.replace('đ', 'd')
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection that records statement count and time in query_stats"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            query_stats.count = getattr(query_stats, 'count', 0) + 1
+            query_stats.seconds = getattr(query_stats, 'seconds', 0.0) + time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            query_stats.count = getattr(query_stats, 'count', 0) + 1
+            query_stats.seconds = getattr(query_stats, 'seconds', 0.0) + time.perf_counter() - started
+
+def get_db_connection(database_path: str = None, read_only: bool = False):
+    """Open and configure a new database connection.
+
+    read_only connections are opened with mode=ro and query_only, so they
+    can never take the write lock; under WAL they read concurrently with
+    the writer and with each other.
+    """
+    database_path = database_path or DATABASE_PATH
+    if read_only:
+        database_path = f"file:{urllib.parse.quote(os.path.abspath(database_path))}?mode=ro"
+    conn = sqlite3.connect(
+        database_path,
+        uri=read_only,
+        factory=InstrumentedConnection,
+        timeout=SQLITE_BUSY_TIMEOUT,
+        # Transactions are managed explicitly by get_db()
+        isolation_level=None,
+        # Pooled connections outlive their first thread (see ConnectionPool)
+        check_same_thread=False
+    )
     conn.row_factory = sqlite3.Row  # This enables column access by name
+    # Used by the LIKE search fallback when FTS5 is unavailable
+    conn.create_function('fold_text', 1, fold_text, deterministic=True)
+    # Per-connection settings; foreign_keys must be set outside a transaction
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = {-SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
     return conn
 
+class ConnectionPool:
+    """Thread-local SQLite connections.
+
+    Each thread keeps one connection for its whole lifetime. When a thread
+    exits, its connection is handed to the next new thread instead of being
+    closed, so thread-per-request servers do not reconnect on every request.
+    """
+
+    def __init__(self, database_path: str, max_idle: int = DB_POOL_MAX_IDLE, read_only: bool = False):
+        self.database_path = database_path
+        self.max_idle = max_idle
+        self.read_only = read_only
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._owned = {}  # thread -> connection
+        self._idle = []
+        self._created = 0
+        self._reused = 0
+        self._recycled = 0
+        self._closed = 0
+
+    def acquire(self):
+        """Return the calling thread's connection, creating or recycling one if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._reused += 1
+            return conn
+        
+        with self._lock:
+            self._reap_dead_threads()
+            if self._idle:
+                conn = self._idle.pop()
+                self._recycled += 1
+            else:
+                conn = None
+        
+        if conn is None:
+            conn = get_db_connection(self.database_path, read_only=self.read_only)
+            with self._lock:
+                self._created += 1
+            logger.debug("🔌 Opened new pooled database connection")
+        
+        with self._lock:
+            self._owned[threading.current_thread()] = conn
+        self._local.conn = conn
+        self._local.depth = 0
+        return conn
+
+    def _reap_dead_threads(self):
+        """Move connections of finished threads to the idle list (lock held)"""
+        for thread in [t for t in self._owned if not t.is_alive()]:
+            conn = self._owned.pop(thread)
+            if conn.in_transaction:
+                conn.rollback()
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+            else:
+                conn.close()
+                self._closed += 1
+
+    def close_all(self):
+        """Close every connection; threads reconnect on their next acquire"""
+        with self._lock:
+            connections = list(self._owned.values()) + self._idle
+            self._owned.clear()
+            self._idle.clear()
+            self._closed += len(connections)
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._reap_dead_threads()
+            return {
+                "database_path": self.database_path,
+                "read_only": self.read_only,
+                "in_use": len(self._owned),
+                "idle": len(self._idle),
+                "max_idle": self.max_idle,
+                "created": self._created,
+                "reused": self._reused,
+                "recycled": self._recycled,
+                "closed": self._closed
+            }
+
+db_pool = ConnectionPool(DATABASE_PATH)
+read_pool = ConnectionPool(DATABASE_PATH, read_only=True)
+
 @contextlib.contextmanager
-def get_db():
-    """Context manager for database operations"""
-    conn = get_db_connection()
+def get_db(immediate: bool = False):
+    """Context manager for database operations.
+
+    Uses the calling thread's pooled connection. Only the outermost block
+    opens and commits the transaction; nested blocks (e.g. update_event
+    calling get_event_by_id) join it. Writers pass immediate=True to take
+    the write lock up front instead of upgrading a read lock mid-transaction.
+    """
+    conn = db_pool.acquire()
+    local = db_pool._local
+    outermost = local.depth == 0
+    if outermost:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    local.depth += 1
     try:
         yield conn
-        conn.commit()
-        logger.debug("✅ Database transaction committed successfully")
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"❌ Database transaction rolled back due to error: {str(e)}")
+        if outermost:
+            conn.commit()
+            logger.debug("✅ Database transaction committed successfully")
+    except BaseException as e:
+        # BaseException also covers GeneratorExit from abandoned streaming generators
+        if outermost:
+            conn.rollback()
+            if isinstance(e, Exception):
+                logger.error(f"❌ Database transaction rolled back due to error: {str(e)}")
+            else:
+                logger.warning(f"⚠️ Database transaction rolled back: {e!r}")
         raise
     finally:
-        conn.close()
-        logger.debug("🔒 Database connection closed")
+        local.depth -= 1
 
-def init_database():
-    """Initialize database with tables and initial data"""
-    logger.info("🗄️ Initializing database...")
-    with get_db() as conn:
-        # Enable foreign keys
-        conn.execute("PRAGMA foreign_keys = ON")
-        
-        # Create event_types table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS event_types (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                description TEXT
-            )
-        ''')
-        
-        # Create events table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                type_id INTEGER NOT NULL,
-                start_date TEXT NOT NULL,
-                location TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                FOREIGN KEY (type_id) REFERENCES event_types (id)
-            )
-        ''')
+@contextlib.contextmanager
+def get_read_db(snapshot: bool = True):
+    """Context manager for read-only queries.
+
+    Uses the calling thread's read_pool connection, which has nothing to
+    commit. With snapshot=True the block runs in one deferred transaction
+    so all its queries see the same data; single-statement reads pass
+    snapshot=False and run in autocommit mode. Inside a get_db() block the
+    thread's write connection is used, so reads see its uncommitted changes.
+    """
+    if not READ_POOL_ENABLED or getattr(db_pool._local, 'depth', 0) > 0:
+        with get_db() as conn:
+            yield conn
+        return
+    
+    conn = read_pool.acquire()
+    begun = snapshot and not conn.in_transaction
+    if begun:
+        conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        if begun:
+            # Ending a read transaction only releases its snapshot
+            conn.rollback()
+
+class WriteQueue:
+    """Single writer thread that commits queued mutations in groups.
+
+    submit(fn, *args) returns a Future. The writer takes up to
+    WRITE_GROUP_MAX_SIZE mutations, waiting at most WRITE_GROUP_WINDOW
+    after the first, and runs them in one BEGIN IMMEDIATE transaction,
+    each inside its own SAVEPOINT: a mutation that raises is rolled back
+    alone and its future gets the exception. Futures resolve once the
+    group has committed, so one commit (and one WAL sync) covers the
+    whole group. Every write made while serving requests goes through
+    run_write, so request threads in this process never compete for the
+    write lock; only init_database() writes directly, before serving.
+    """
+    
+    def __init__(self, enabled: bool = WRITE_QUEUE_ENABLED, max_group_size: int = WRITE_GROUP_MAX_SIZE,
+                 window: float = WRITE_GROUP_WINDOW):
+        self.enabled = enabled
+        self.max_group_size = max_group_size
+        self.window = window
+        self.reset_after_fork()
+    
+    def reset_after_fork(self):
+        """Forget the writer thread; it doesn't exist in a forked child"""
+        self._jobs = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._groups = 0
+        self._mutations = 0
+    
+    def submit(self, fn, *args) -> Future:
+        """Queue fn(conn, *args); the future's query_stats holds the (statements, seconds) it ran"""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+        self._jobs.put((future, fn, args))
+        return future
+    
+    def _next_group(self) -> List[Tuple[Future, Any, tuple]]:
+        job = self._jobs.get()
+        if job is None:
+            return []
+        group = [job]
+        deadline = time.monotonic() + self.window
+        while len(group) < self.max_group_size:
+            try:
+                job = self._jobs.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if job is None:
+                # Finish this group, then stop
+                self._jobs.put(None)
+                break
+            group.append(job)
+        return group
+    
+    def _run(self):
+        while True:
+            group = self._next_group()
+            if not group:
+                return
+            self._commit_group(group)
+    
+    def _commit_group(self, group):
+        group = [job for job in group if job[0].set_running_or_notify_cancel()]
+        if not group:
+            return
+        outcomes = []
+        try:
+            with get_db(immediate=True) as conn:
+                for future, fn, args in group:
+                    count_before, seconds_before = get_query_stats()
+                    conn.execute("SAVEPOINT write_item")
+                    try:
+                        outcomes.append((fn(conn, *args), None))
+                        conn.execute("RELEASE write_item")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_item")
+                        conn.execute("RELEASE write_item")
+                        outcomes.append((None, e))
+                    count_after, seconds_after = get_query_stats()
+                    # The savepoint statements are the writer's overhead, not the caller's
+                    future.query_stats = (count_after - count_before - 2, seconds_after - seconds_before)
+        except BaseException as e:
+            metrics.inc('sqlite_write_group_failures_total')
+            logger.error(f"❌ Write group of {len(group)} mutations failed: {e!r}")
+            for future, _, _ in group:
+                future.set_exception(e)
+            return
         
-        # Create images table
+        self._groups += 1
+        self._mutations += len(group)
+        metrics.inc('sqlite_write_groups_total')
+        metrics.observe('sqlite_write_group_size', len(group))
+        for (future, _, _), (result, error) in zip(group, outcomes):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queued": self._jobs.qsize(),
+            "groups": self._groups,
+            "mutations": self._mutations,
+            "average_group_size": round(self._mutations / self._groups, 2) if self._groups else 0
+        }
+    
+    def shutdown(self):
+        """Commit what is queued, then stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._jobs.put(None)
+            thread.join()
+
+write_queue = WriteQueue()
+atexit.register(write_queue.shutdown)
+
+def run_write(fn, *args):
+    """Run fn(conn, *args) in a write transaction and return its result once committed.
+
+    Goes through the writer queue when it is enabled; otherwise, or when the
+    calling thread is already inside get_db() (e.g. on the writer thread),
+    runs in get_db(immediate=True) here.
+    """
+    if write_queue.enabled and getattr(db_pool._local, 'depth', 0) == 0:
+        future = write_queue.submit(fn, *args)
+        try:
+            return future.result()
+        finally:
+            count, seconds = getattr(future, 'query_stats', (0, 0.0))
+            query_stats.count = getattr(query_stats, 'count', 0) + count
+            query_stats.seconds = getattr(query_stats, 'seconds', 0.0) + seconds
+    with get_db(immediate=True) as conn:
+        return fn(conn, *args)
+
+def _migration_initial_schema(conn):
+    """Base tables; a no-op on databases created before migrations existed"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS event_types (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            type_id INTEGER NOT NULL,
+            start_date TEXT NOT NULL,
+            location TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (type_id) REFERENCES event_types (id)
+        )
+    ''')
+    
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            original_name TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            file_size INTEGER,
+            uploaded_at TEXT NOT NULL,
+            FOREIGN KEY (event_id) REFERENCES events (id) ON DELETE CASCADE
+        )
+    ''')
+
+def _migration_index_images_event_id(conn):
+    """Image lookups by event and the ON DELETE CASCADE from events"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_images_event_id ON images (event_id, uploaded_at)")
+
+def _migration_index_events_type_id(conn):
+    """typeId filter, ordered like GET /events so it can also serve the sort"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_type_id ON events (type_id, created_at, id)")
+
+def _migration_index_events_created_at(conn):
+    """GET /events sort key and keyset pagination on (created_at, id)"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_created_at ON events (created_at, id)")
+
+def _migration_data_version(conn):
+    """Change counter bumped by triggers on every events/images write (used for ETags)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            changed_at INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO data_version (id, version, changed_at) VALUES (1, 0, CAST(strftime('%s', 'now') AS INTEGER))")
+    for table in ('events', 'images'):
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS data_version_{table}_{operation.lower()}
+                AFTER {operation} ON {table} BEGIN
+                    UPDATE data_version
+                    SET version = version + 1, changed_at = CAST(strftime('%s', 'now') AS INTEGER)
+                    WHERE id = 1;
+                END
+            ''')
+
+def _migration_change_feed(conn):
+    """Change sequence on events plus delete tombstones for GET /events/changes"""
+    conn.execute("ALTER TABLE events ADD COLUMN change_seq INTEGER")
+    # Existing rows count as changed in id order
+    conn.execute("UPDATE events SET change_seq = id")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_change_seq ON events (change_seq)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS event_tombstones (
+            event_id INTEGER PRIMARY KEY,
+            change_seq INTEGER NOT NULL,
+            deleted_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_event_tombstones_change_seq ON event_tombstones (change_seq)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            change_seq INTEGER NOT NULL,
+            compacted_seq INTEGER NOT NULL
+        )
+    ''')
+    conn.execute("INSERT OR IGNORE INTO sync_state (id, change_seq, compacted_seq) "
+                 "SELECT 1, COALESCE(MAX(id), 0), 0 FROM events")
+
+def _migration_content_addressed_blobs(conn):
+    """Content-addressed upload store: one file per distinct SHA-256, ref-counted by images"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+    ''')
+    # Images uploaded before this migration keep a NULL hash and their own file
+    conn.execute("ALTER TABLE images ADD COLUMN blob_sha256 TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_images_blob_sha256 ON images (blob_sha256)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_unreferenced ON blobs (ref_count) WHERE ref_count <= 0")
+    # Also fires for images removed by ON DELETE CASCADE
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS blobs_ref_insert
+        AFTER INSERT ON images WHEN NEW.blob_sha256 IS NOT NULL BEGIN
+            UPDATE blobs SET ref_count = ref_count + 1 WHERE sha256 = NEW.blob_sha256;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS blobs_ref_delete
+        AFTER DELETE ON images WHEN OLD.blob_sha256 IS NOT NULL BEGIN
+            UPDATE blobs SET ref_count = ref_count - 1 WHERE sha256 = OLD.blob_sha256;
+        END
+    ''')
+
+def _migration_upload_sessions(conn):
+    """Resumable upload sessions: one partial file per session, appended chunk by chunk"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS upload_sessions (
+            id TEXT PRIMARY KEY,
+            event_id INTEGER NOT NULL,
+            original_name TEXT NOT NULL,
+            total_size INTEGER,
+            received_size INTEGER NOT NULL DEFAULT 0,
+            claimed_until REAL,
+            created_at TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            FOREIGN KEY (event_id) REFERENCES events (id) ON DELETE CASCADE
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_upload_sessions_updated_at ON upload_sessions (updated_at)")
+
+def _migration_change_feed_triggers(conn):
+    """Maintain change_seq and tombstones in triggers, so writes made outside
+    the server (seed scripts, the sqlite3 shell) reach GET /events/changes too"""
+    # Events inserted outside the server so far have no sequence number
+    missing = [row[0] for row in conn.execute("SELECT id FROM events WHERE change_seq IS NULL ORDER BY id")]
+    if missing:
+        last_seq = conn.execute(
+            "UPDATE sync_state SET change_seq = change_seq + ? WHERE id = 1 RETURNING change_seq", (len(missing),)
+        ).fetchone()[0]
+        first_seq = last_seq - len(missing) + 1
+        conn.executemany("UPDATE events SET change_seq = ? WHERE id = ?",
+                         [(first_seq + index, event_id) for index, event_id in enumerate(missing)])
+    
+    def next_seq(event_id):
+        return f'''
+            UPDATE sync_state SET change_seq = change_seq + 1 WHERE id = 1;
+            UPDATE events SET change_seq = (SELECT change_seq FROM sync_state WHERE id = 1) WHERE id = {event_id};
+        '''
+    
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS change_feed_events_insert AFTER INSERT ON events BEGIN
+            {next_seq('NEW.id')}
+            -- An id reused after sqlite_sequence was reset belongs to a new event
+            DELETE FROM event_tombstones WHERE event_id = NEW.id;
+        END
+    ''')
+    # Every column but change_seq, so the trigger's own update doesn't count as a change
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS change_feed_events_update
+        AFTER UPDATE OF title, description, type_id, start_date, location, created_at, updated_at ON events BEGIN
+            {next_seq('NEW.id')}
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS change_feed_events_delete AFTER DELETE ON events BEGIN
+            UPDATE sync_state SET change_seq = change_seq + 1 WHERE id = 1;
+            INSERT OR REPLACE INTO event_tombstones (event_id, change_seq, deleted_at)
+            VALUES (OLD.id, (SELECT change_seq FROM sync_state WHERE id = 1),
+                    strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'));
+        END
+    ''')
+    # A changed image list puts the event back in the feed
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS change_feed_images_insert AFTER INSERT ON images BEGIN
+            {next_seq('NEW.event_id')}
+        END
+    ''')
+    # Images removed by their event's ON DELETE CASCADE have no event left to bump
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS change_feed_images_delete
+        AFTER DELETE ON images WHEN EXISTS (SELECT 1 FROM events WHERE id = OLD.event_id) BEGIN
+            {next_seq('OLD.event_id')}
+        END
+    ''')
+
+def _migration_search_index(conn):
+    """Full-text index used by keyword search, kept in sync with events by triggers.
+
+    A SQLite build without FTS5 skips the index; keyword search then falls
+    back to a LIKE scan.
+    """
+    try:
+        # remove_diacritics 2 folds Vietnamese tone marks: 'hoi thao' matches 'Hội thảo'
         conn.execute('''
-            CREATE TABLE IF NOT EXISTS images (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_id INTEGER NOT NULL,
-                original_name TEXT NOT NULL,
-                filename TEXT NOT NULL,
-                file_path TEXT NOT NULL,
-                file_size INTEGER,
-                uploaded_at TEXT NOT NULL,
-                FOREIGN KEY (event_id) REFERENCES events (id) ON DELETE CASCADE
+            CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+                title, description, location,
+                content='events', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
             )
         ''')
-        
+    except sqlite3.OperationalError as e:
+        logger.warning(f"⚠️ FTS5 not available, keyword search uses LIKE: {str(e)}")
+        return
+    
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_fts (rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title, description, location ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, title, description, location)
+            VALUES ('delete', old.id, old.title, old.description, old.location);
+            INSERT INTO events_fts (rowid, title, description, location)
+            VALUES (new.id, new.title, new.description, new.location);
+        END
+    ''')
+    
+    logger.info("📝 Building full-text index for existing events...")
+    conn.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+
+# Ordered schema migrations; PRAGMA user_version stores the last applied version.
+# Append new entries only - never renumber or edit an applied migration.
+MIGRATIONS = [
+    (1, "initial schema", _migration_initial_schema),
+    (2, "index images.event_id", _migration_index_images_event_id),
+    (3, "index events.type_id", _migration_index_events_type_id),
+    (4, "index events.created_at", _migration_index_events_created_at),
+    (5, "data version counter", _migration_data_version),
+    (6, "change feed sequence and tombstones", _migration_change_feed),
+    (7, "content-addressed image blobs", _migration_content_addressed_blobs),
+    (8, "resumable upload sessions", _migration_upload_sessions),
+    (9, "change feed triggers", _migration_change_feed_triggers),
+    (10, "full-text search index", _migration_search_index),
+]
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(conn) -> int:
+    """Apply pending migrations in order, each in its own transaction.
+
+    Existing databases start at user_version 0 and are upgraded in place.
+    Returns the schema version after migrating.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    
+    current_version = get_schema_version(conn)
+    latest_version = MIGRATIONS[-1][0]
+    if current_version > latest_version:
+        logger.warning(f"⚠️ Database schema version {current_version} is newer than this server ({latest_version})")
+        return current_version
+    
+    for version, description, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+        # IMMEDIATE, so processes initializing at the same time take turns
+        conn.execute("BEGIN IMMEDIATE")
+        if get_schema_version(conn) >= version:
+            # Another process applied it while we waited for the lock
+            conn.rollback()
+            current_version = version
+            continue
+        logger.info(f"🔧 Applying migration {version}: {description}")
+        try:
+            migrate(conn)
+            # PRAGMA does not accept bound parameters; version is an int from MIGRATIONS
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"❌ Migration {version} failed, database left at version {current_version}")
+            raise
+        current_version = version
+    
+    return current_version
+
+def search_index_exists(conn) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events_fts'"
+    ).fetchone() is not None
+
+def init_database():
+    """Initialize database: apply schema migrations and insert initial data"""
+    logger.info("🗄️ Initializing database...")
+    conn = db_pool.acquire()
+    # WAL is stored in the database file, so setting it once covers every connection
+    journal_mode = conn.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}").fetchone()[0]
+    logger.info(f"🗄️ Journal mode: {journal_mode}")
+    
+    schema_version = run_migrations(conn)
+    logger.info(f"🗄️ Database schema version: {schema_version}")
+    
+    # Migration 10 skips the index on a SQLite build without FTS5
+    global fts_enabled
+    fts_enabled = SEARCH_BACKEND == 'fts' and search_index_exists(conn)
+    if SEARCH_BACKEND == 'fts' and not fts_enabled:
+        logger.warning("⚠️ No full-text index in this database, keyword search uses LIKE")
+    
+    with get_db(immediate=True) as conn:
         # Insert initial event types if table is empty
         cursor = conn.execute("SELECT COUNT(*) FROM event_types")
         if cursor.fetchone()[0] == 0:
@@ -200,15 +1342,248 @@ def init_database():
         #         initial_events
         #     )
     
+    # Drop anything cached from a previous init (e.g. tests re-initializing)
+    event_type_cache.invalidate()
+    bump_write_generation()
+    global database_initialized
+    database_initialized = True
     logger.info("✅ Database initialization completed")
 
+def ensure_database_initialized():
+    """Run init_database() once if this process hasn't, e.g. under `flask run` or another WSGI server"""
+    if database_initialized:
+        return
+    with _database_init_lock:
+        if not database_initialized:
+            logger.info("🗄️ Database not initialized by the launcher, initializing on first request")
+            init_database()
+
+def build_fts_query(keyword: str) -> Optional[str]:
+    """Turn a user keyword into an FTS5 MATCH expression (all terms, prefix match)"""
+    terms = []
+    for token in re.findall(r'\w+', keyword.lower()):
+        variants = [token]
+        # Accept 'd' for 'đ' the way Vietnamese is usually typed without diacritics
+        if 'd' in token:
+            variants.append(token.replace('d', 'đ'))
+        terms.append('(' + ' OR '.join(f'"{variant}"*' for variant in variants) + ')')
+    return ' AND '.join(terms) if terms else None
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+class VariantPipeline:
+    """Generates resized variants of uploaded files in a process pool.
+
+    submit() puts a job on a bounded queue; a dispatcher thread hands jobs
+    to at most `workers` processes. Workers are spawned rather than forked:
+    forking a process that runs the log listener and request threads can
+    leave locks held in the child. A spawned worker re-runs the main script
+    as __mp_main__ when the server was started directly; _start_process()
+    is skipped there. Failed jobs are retried with exponential backoff up
+    to VARIANT_MAX_ATTEMPTS times, except when the source can't be decoded
+    (SourceImageError): that is recorded with a marker file per variant, so
+    neither this process nor the others queue the file again.
+    """
+    
+    def __init__(self, sizes: Dict[str, Tuple[int, int]], enabled: bool,
+                 workers: int = VARIANT_WORKERS, queue_size: int = VARIANT_QUEUE_SIZE):
+        self.sizes = sizes
+        self.enabled = enabled and bool(sizes)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.reset_after_fork()
+    
+    def reset_after_fork(self):
+        """Start over with no pool: a forked child doesn't own its parent's worker processes"""
+        self._jobs = queue.Queue(maxsize=self.queue_size)
+        self._slots = threading.Semaphore(self.workers)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._dispatcher = None
+    
+    def variant_path(self, filename: str, variant: str) -> Optional[str]:
+        """Path of a generated variant, or None if it isn't ready"""
+        path = os.path.join(VARIANT_FOLDER, variant_filename(filename, variant))
+        return path if os.path.exists(path) else None
+    
+    def has_failed(self, filename: str, variant: str) -> bool:
+        """True if the variant can never be generated because its source isn't a readable image"""
+        return os.path.exists(os.path.join(VARIANT_FOLDER, failure_marker_filename(filename, variant)))
+    
+    def submit(self, filename: str) -> bool:
+        """Queue variant generation for an uploaded file; False if skipped"""
+        if not self.enabled:
+            return False
+        if all(self.variant_path(filename, variant) or self.has_failed(filename, variant) for variant in self.sizes):
+            return False
+        with self._lock:
+            if filename in self._pending:
+                return True
+            self._start()
+            try:
+                self._jobs.put_nowait((filename, 1))
+            except queue.Full:
+                metrics.inc('image_variant_jobs_dropped_total')
+                logger.warning(f"⚠️ Variant queue full, skipping {filename}")
+                return False
+            self._pending.add(filename)
+        return True
+    
+    def _start(self):
+        if self._dispatcher is None:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            self._dispatcher = threading.Thread(target=self._dispatch, name='variant-dispatcher', daemon=True)
+            self._dispatcher.start()
+    
+    def _dispatch(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            filename, attempt = job
+            source_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            if not os.path.exists(source_path):
+                # The blob was deleted while the job waited
+                self._finish(filename)
+                continue
+            self._slots.acquire()
+            try:
+                future = self._executor.submit(generate_variants, source_path, VARIANT_FOLDER, self.sizes)
+            except Exception as e:
+                self._slots.release()
+                self._failed(filename, attempt, e)
+                continue
+            future.add_done_callback(functools.partial(self._on_done, filename, attempt))
+    
+    def _on_done(self, filename: str, attempt: int, future):
+        self._slots.release()
+        error = future.exception()
+        if error is not None:
+            self._failed(filename, attempt, error)
+            return
+        created = future.result()
+        metrics.inc('image_variants_generated_total', len(created))
+        logger.info(f"🖼️ Generated variants for {filename}: {created}")
+        self._finish(filename)
+    
+    def _failed(self, filename: str, attempt: int, error: BaseException):
+        if isinstance(error, SourceImageError):
+            metrics.inc('image_variant_jobs_failed_total')
+            logger.error(f"❌ Variants of {filename} can't be generated, serving the original instead: {error}")
+            self._mark_failed(filename, str(error))
+            self._finish(filename)
+            return
+        if attempt >= VARIANT_MAX_ATTEMPTS:
+            metrics.inc('image_variant_jobs_failed_total')
+            logger.error(f"❌ Variant generation failed for {filename} after {attempt} attempts: {error!r}")
+            self._finish(filename)
+            return
+        delay = VARIANT_RETRY_DELAY * 2 ** (attempt - 1)
+        logger.warning(f"⚠️ Variant generation failed for {filename} (attempt {attempt}), retrying in {delay:.0f}s: {error!r}")
+        timer = threading.Timer(delay, self._retry, (filename, attempt + 1))
+        timer.daemon = True
+        timer.start()
+    
+    def _mark_failed(self, filename: str, reason: str):
+        for variant in self.sizes:
+            if self.variant_path(filename, variant):
+                continue
+            try:
+                with open(os.path.join(VARIANT_FOLDER, failure_marker_filename(filename, variant)), 'w') as marker:
+                    marker.write(reason)
+            except OSError as e:
+                logger.warning(f"⚠️ Couldn't record failed variant {variant} of {filename}: {e!r}")
+    
+    def _retry(self, filename: str, attempt: int):
+        try:
+            self._jobs.put_nowait((filename, attempt))
+        except queue.Full:
+            metrics.inc('image_variant_jobs_dropped_total')
+            self._finish(filename)
+    
+    def _finish(self, filename: str):
+        with self._lock:
+            self._pending.discard(filename)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sizes": {name: f"{width}x{height}" for name, (width, height) in self.sizes.items()},
+            "queued": self._jobs.qsize(),
+            "pending": len(self._pending)
+        }
+    
+    def shutdown(self):
+        if self._dispatcher is not None:
+            self._jobs.put(None)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+variant_pipeline = VariantPipeline(IMAGE_VARIANT_SIZES, IMAGE_VARIANTS_ENABLED)
+atexit.register(variant_pipeline.shutdown)
+
+# Columns of image rows that are storage bookkeeping, not part of the API
+INTERNAL_IMAGE_COLUMNS = ('blob_sha256',)
+
+def image_row_to_dict(image_row) -> Dict[str, Any]:
+    """Convert an images row to the response shape, listing its variant URLs.
+
+    Variant URLs are valid as soon as the image exists: until a variant has
+    been generated, /uploads serves the original.
+    """
+    image = dict(image_row)
+    for column in INTERNAL_IMAGE_COLUMNS:
+        image.pop(column, None)
+    image['variants'] = {
+        variant: {
+            "width": width,
+            "height": height,
+            "url": f"/uploads/{image['filename']}?variant={variant}"
+        }
+        for variant, (width, height) in (variant_pipeline.sizes.items() if variant_pipeline.enabled else ())
+    }
+    return image
+
+def load_images_for_events(conn, event_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Batch-load images for a set of events, grouped by event_id.
+
+    Runs one query per IMAGE_LOADER_CHUNK_SIZE event IDs instead of one query
+    per event. IDs are passed as a single JSON array parameter so the chunk
+    size is not limited by SQLite's bound-variable limit.
+    """
+    images_by_event = {event_id: [] for event_id in event_ids}
+    unique_ids = list(images_by_event)
+    
+    for start in range(0, len(unique_ids), IMAGE_LOADER_CHUNK_SIZE):
+        chunk = unique_ids[start:start + IMAGE_LOADER_CHUNK_SIZE]
+        cursor = conn.execute(
+            "SELECT * FROM images WHERE event_id IN (SELECT value FROM json_each(?)) "
+            "ORDER BY uploaded_at DESC",
+            (json.dumps(chunk),)
+        )
+        for img in cursor:
+            images_by_event[img['event_id']].append(image_row_to_dict(img))
+    
+    return images_by_event
+
+# Columns of event query rows that are bookkeeping, not part of the API
+INTERNAL_EVENT_COLUMNS = ('change_seq', 'search_rank')
+
+def event_row_to_dict(event_row, images: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert an events row to the snake_case response shape"""
+    event_dict = dict(event_row)
+    for column in INTERNAL_EVENT_COLUMNS:
+        event_dict.pop(column, None)
+    # Map type_id to event_type_id for consistency
+    event_dict['event_type_id'] = event_dict.pop('type_id', None)
+    event_dict['images'] = images
+    return event_dict
+
 def get_event_by_id(event_id: int) -> Optional[Dict[str, Any]]:
     """Get event by ID with images"""
     logger.debug(f"🔍 Getting event by ID: {event_id}")
-    with get_db() as conn:
+    with get_read_db() as conn:
         # Get event
         event_cursor = conn.execute(
             "SELECT * FROM events WHERE id = ?",
@@ -220,82 +1595,352 @@ def get_event_by_id(event_id: int) -> Optional[Dict[str, Any]]:
             logger.warning(f"⚠️ Event not found with ID: {event_id}")
             return None
         
-        # Get images for this event
-        images_cursor = conn.execute(
-            "SELECT * FROM images WHERE event_id = ? ORDER BY uploaded_at DESC",
-            (event_id,)
-        )
-        images = [dict(img) for img in images_cursor.fetchall()]
-        
-        # Convert to dict and add images - use snake_case for all response fields
-        event_dict = dict(event)
-        # Map type_id to event_type_id for consistency
-        event_dict['event_type_id'] = event_dict.pop('type_id', None)
-        event_dict['images'] = images
+        images = load_images_for_events(conn, [event_id])[event_id]
+        event_dict = event_row_to_dict(event, images)
         
         logger.debug(f"✅ Found event: {event_dict['title']} with {len(images)} images")
         return event_dict
 
-def get_all_events(keyword: str = None, type_id: int = None) -> List[Dict[str, Any]]:
-    """Get all events with optional filtering"""
-    logger.debug(f"🔍 Getting events with filters - keyword: {keyword}, type_id: {type_id}")
-    with get_db() as conn:
+def resolve_event_sort(sort: Optional[str], keyword: Optional[str]) -> str:
+    """Return the sort order actually used; relevance needs a keyword and the FTS index"""
+    if sort == 'relevance' and keyword and fts_enabled and build_fts_query(keyword):
+        return 'relevance'
+    return 'created_at'
+
+def encode_event_cursor(event_row, sort: str = 'created_at') -> str:
+    """Build the opaque keyset cursor pointing after the given events row (not its response dict)"""
+    sort_key = event_row['search_rank'] if sort == 'relevance' else event_row['created_at']
+    raw = json.dumps([sort_key, event_row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_event_cursor(cursor: str, sort: str = 'created_at') -> Tuple[Any, int]:
+    """Parse a cursor from encode_event_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_key, event_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    expected_type = (int, float) if sort == 'relevance' else str
+    if not isinstance(sort_key, expected_type) or not isinstance(event_id, int):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return sort_key, event_id
+
+def build_events_query(keyword: str = None, type_id: int = None,
+                       limit: int = None, cursor: str = None,
+                       sort: str = 'created_at') -> Tuple[str, List[Any]]:
+    """Build the SQL and parameters for an events listing (see get_all_events)"""
+    match_query = build_fts_query(keyword) if keyword and fts_enabled else None
+    
+    if match_query and sort == 'relevance':
+        query = (
+            "SELECT * FROM ("
+            "SELECT events.*, bm25(events_fts, ?, ?, ?) AS search_rank "
+            "FROM events_fts JOIN events ON events.id = events_fts.rowid "
+            "WHERE events_fts MATCH ?) WHERE 1=1"
+        )
+        params = [*SEARCH_RANK_WEIGHTS, match_query]
+    elif match_query:
+        query = "SELECT * FROM events WHERE id IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?)"
+        params = [match_query]
+    else:
         query = "SELECT * FROM events WHERE 1=1"
         params = []
-        
         if keyword:
-            query += " AND (LOWER(title) LIKE ? OR LOWER(description) LIKE ?)"
-            params.extend([f'%{keyword.lower()}%', f'%{keyword.lower()}%'])
-        
-        if type_id:
-            query += " AND type_id = ?"
-            params.append(type_id)
-        
-        query += " ORDER BY created_at DESC"
-        
-        cursor = conn.execute(query, params)
-        events = []
-        
-        for event_row in cursor.fetchall():
-            event = dict(event_row)
-            # Map type_id to event_type_id for consistency - use snake_case
-            event['event_type_id'] = event.pop('type_id', None)
-            # Get images for this event
-            images_cursor = conn.execute(
-                "SELECT * FROM images WHERE event_id = ? ORDER BY uploaded_at DESC",
-                (event['id'],)
-            )
-            event['images'] = [dict(img) for img in images_cursor.fetchall()]
-            events.append(event)
+            # Fallback scan; fold_text makes it case- and diacritic-insensitive
+            folded = f'%{fold_text(keyword)}%'
+            query += (" AND (fold_text(title) LIKE ? OR fold_text(description) LIKE ?"
+                      " OR fold_text(location) LIKE ?)")
+            params.extend([folded, folded, folded])
+    
+    if type_id:
+        query += " AND type_id = ?"
+        params.append(type_id)
+    
+    if sort == 'relevance':
+        if cursor:
+            query += " AND (search_rank, id) > (?, ?)"
+            params.extend(decode_event_cursor(cursor, sort))
+        query += " ORDER BY search_rank, id"
+    else:
+        if cursor:
+            query += " AND (created_at, id) < (?, ?)"
+            params.extend(decode_event_cursor(cursor, sort))
+        query += " ORDER BY created_at DESC, id DESC"
+    
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    
+    return query, params
+
+def get_all_events(keyword: str = None, type_id: int = None,
+                   limit: int = None, cursor: str = None,
+                   sort: str = 'created_at') -> List[Dict[str, Any]]:
+    """Get all events with optional filtering.
+
+    Events are ordered by (created_at, id) descending, or by bm25 relevance
+    when sort='relevance' and the FTS index is used for the keyword. `cursor`
+    (from encode_event_cursor) resumes right after the event it was built
+    from, using a keyset condition rather than OFFSET.
+    """
+    sort = resolve_event_sort(sort, keyword)
+    logger.debug(f"🔍 Getting events with filters - keyword: {keyword}, type_id: {type_id}, "
+                 f"limit: {limit}, cursor: {cursor}, sort: {sort}")
+    with get_read_db() as conn:
+        query, params = build_events_query(keyword, type_id, limit, cursor, sort)
+        event_rows = conn.execute(query, params).fetchall()
+        # Load images for the whole result set at once instead of one query per event
+        images_by_event = load_images_for_events(conn, [row['id'] for row in event_rows])
+        events = [event_row_to_dict(row, images_by_event[row['id']]) for row in event_rows]
         
         logger.debug(f"✅ Found {len(events)} events")
         return events
 
+def get_events_page(keyword: str = None, type_id: int = None, limit: int = 50,
+                    cursor: str = None, sort: str = 'created_at') -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Up to `limit` events like get_all_events, plus the cursor of the next page (None on the last page)"""
+    sort = resolve_event_sort(sort, keyword)
+    with get_read_db() as conn:
+        # Fetch one extra row to know whether another page exists
+        query, params = build_events_query(keyword, type_id, limit + 1, cursor, sort)
+        event_rows = conn.execute(query, params).fetchall()
+        next_cursor = None
+        if len(event_rows) > limit:
+            event_rows = event_rows[:limit]
+            next_cursor = encode_event_cursor(event_rows[-1], sort)
+        images_by_event = load_images_for_events(conn, [row['id'] for row in event_rows])
+        return [event_row_to_dict(row, images_by_event[row['id']]) for row in event_rows], next_cursor
+
+def iter_event_batches(keyword: str = None, type_id: int = None,
+                       limit: int = None, cursor: str = None,
+                       sort: str = 'created_at') -> Iterator[Tuple[List[Any], List[Dict[str, Any]]]]:
+    """Like get_all_events, but yields STREAM_BATCH_SIZE (rows, events) at a time from an open cursor.
+
+    Only one batch of rows and images is in memory at once. The read
+    transaction stays open until the generator is exhausted or closed.
+    The rows are kept for encode_event_cursor.
+    """
+    sort = resolve_event_sort(sort, keyword)
+    with get_read_db() as conn:
+        query, params = build_events_query(keyword, type_id, limit, cursor, sort)
+        rows_cursor = conn.execute(query, params)
+        while True:
+            event_rows = rows_cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not event_rows:
+                break
+            images_by_event = load_images_for_events(conn, [row['id'] for row in event_rows])
+            yield event_rows, [event_row_to_dict(row, images_by_event[row['id']]) for row in event_rows]
+
+# Serialized GET /events responses, keyed by (write generation, filters, pagination)
+events_cache = BodyCache('events', EVENTS_CACHE_BYTES, EVENTS_CACHE_TTL, EVENTS_CACHE_ENABLED)
+# In shared memory inherited through fork(), so a write in one prefork worker invalidates the
+# others' caches. Spawned workers (uvicorn --workers) each get their own; EVENTS_CACHE_TTL bounds that
+_write_generation = multiprocessing.Value('q', 0)
+
+def current_write_generation() -> int:
+    return _write_generation.value
+
+def bump_write_generation():
+    """Invalidate cached event lists; call after a write to events or images has committed.
+
+    Readers take the generation before querying, so a page read before the
+    commit is stored under the old generation and never served again.
+    """
+    with _write_generation.get_lock():
+        _write_generation.value += 1
+    events_cache.clear()
+
+_last_tombstone_compaction = 0.0
+
+def compact_tombstones(conn, force: bool = False) -> int:
+    """Drop tombstones older than TOMBSTONE_RETENTION_DAYS.
+
+    Records the highest dropped sequence in sync_state.compacted_seq so that
+    cursors older than it can be told to resync. Runs at most once per
+    TOMBSTONE_COMPACTION_INTERVAL unless forced. Returns rows removed.
+    """
+    global _last_tombstone_compaction
+    now = time.monotonic()
+    if not force and now - _last_tombstone_compaction < TOMBSTONE_COMPACTION_INTERVAL:
+        return 0
+    _last_tombstone_compaction = now
+    
+    cutoff = (datetime.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)).isoformat()
+    max_seq = conn.execute(
+        "SELECT MAX(change_seq) FROM event_tombstones WHERE deleted_at < ?", (cutoff,)
+    ).fetchone()[0]
+    if max_seq is None:
+        return 0
+    
+    removed = conn.execute("DELETE FROM event_tombstones WHERE deleted_at < ?", (cutoff,)).rowcount
+    conn.execute("UPDATE sync_state SET compacted_seq = MAX(compacted_seq, ?) WHERE id = 1", (max_seq,))
+    logger.info(f"🧹 Compacted {removed} tombstones up to change {max_seq}")
+    return removed
+
+def encode_change_cursor(change_seq: int) -> str:
+    return base64.urlsafe_b64encode(f"c{change_seq}".encode('ascii')).decode('ascii').rstrip('=')
+
+def decode_change_cursor(cursor: str) -> int:
+    """Parse a cursor from encode_change_cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode('ascii')).decode('ascii')
+        if not raw.startswith('c'):
+            raise ValueError
+        return int(raw[1:])
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def latest_change_seq() -> int:
+    """Sequence of the newest change in the feed, whichever process or tool wrote it"""
+    with get_read_db(snapshot=False) as conn:
+        return conn.execute("SELECT change_seq FROM sync_state WHERE id = 1").fetchone()['change_seq']
+
+def get_event_changes(since_seq: int, limit: int) -> Optional[Dict[str, Any]]:
+    """Events created/updated and deleted after change `since_seq`, oldest first.
+
+    Returns None if tombstones the caller needs were already compacted,
+    meaning the client has to do a full resync.
+    """
+    logger.debug(f"🔍 Getting changes since {since_seq}, limit {limit}")
+    with get_read_db() as conn:
+        state = conn.execute("SELECT change_seq, compacted_seq FROM sync_state WHERE id = 1").fetchone()
+        if 0 < since_seq < state['compacted_seq']:
+            return None
+        
+        event_rows = conn.execute(
+            "SELECT * FROM events WHERE change_seq > ? ORDER BY change_seq LIMIT ?",
+            (since_seq, limit + 1)
+        ).fetchall()
+        tombstone_rows = conn.execute(
+            "SELECT * FROM event_tombstones WHERE change_seq > ? ORDER BY change_seq LIMIT ?",
+            (since_seq, limit + 1)
+        ).fetchall()
+        
+        # Merge both feeds by sequence and keep the first `limit` changes
+        changes = sorted(
+            [(row['change_seq'], 'event', row) for row in event_rows] +
+            [(row['change_seq'], 'tombstone', row) for row in tombstone_rows],
+            key=lambda change: change[0]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        changed_rows = [row for _, kind, row in changes if kind == 'event']
+        images_by_event = load_images_for_events(conn, [row['id'] for row in changed_rows])
+        
+        return {
+            "events": [event_row_to_dict(row, images_by_event[row['id']]) for row in changed_rows],
+            "deleted_events": [
+                {"id": row['event_id'], "deleted_at": row['deleted_at']}
+                for _, kind, row in changes if kind == 'tombstone'
+            ],
+            # Without more changes the cursor jumps to the head seen in this snapshot
+            "next_cursor": encode_change_cursor(changes[-1][0] if has_more else max(since_seq, state['change_seq'])),
+            "has_more": has_more
+        }
+
+def event_fields_from_payload(event_data: Dict[str, Any]) -> Tuple[str, str, int, str, str]:
+    """Extract (title, description, type_id, start_date, location) from a camelCase or snake_case payload"""
+    # Handle both camelCase and snake_case field names
+    title = event_data.get('title') or event_data.get('title', '')
+    description = event_data.get('description') or event_data.get('description', '')
+    event_type_id = event_data.get('eventTypeId') or event_data.get('event_type_id')
+    start_date = event_data.get('startDate') or event_data.get('start_date')
+    location = event_data.get('location') or event_data.get('location', '')
+    
+    # Validate required fields
+    if not all([title, description, event_type_id, start_date, location]):
+        raise ValueError("Missing required fields: title, description, eventTypeId, startDate, location")
+    
+    return title, description, event_type_id, start_date, location
+
+def validate_event_payload(data: Any, valid_type_ids) -> Optional[str]:
+    """Return the client-facing error for an event creation payload, or None if it is valid"""
+    if not isinstance(data, dict):
+        return "Dữ liệu sự kiện phải là một object JSON"
+    
+    # Validate required fields - handle both camelCase and snake_case
+    required_fields_camel = ['title', 'description', 'eventTypeId', 'startDate', 'location']
+    required_fields_snake = ['title', 'description', 'event_type_id', 'start_date', 'location']
+    
+    # Check if we have camelCase or snake_case fields
+    has_camel = all(field in data for field in required_fields_camel)
+    has_snake = all(field in data for field in required_fields_snake)
+    
+    if not (has_camel or has_snake):
+        missing_fields = []
+        if not has_camel:
+            missing_fields.extend([f for f in required_fields_camel if f not in data or not data[f]])
+        if not has_snake:
+            missing_fields.extend([f for f in required_fields_snake if f not in data or not data[f]])
+        
+        logger.warning(f"⚠️ Missing required fields: {missing_fields}")
+        return f"Thiếu trường bắt buộc: {', '.join(missing_fields)}"
+    
+    # Validate event_type_id exists
+    event_type_id = data.get('eventTypeId') or data.get('event_type_id')
+    if event_type_id not in valid_type_ids:
+        logger.warning(f"⚠️ Invalid event_type_id: {event_type_id}")
+        return "event_type_id không hợp lệ"
+    
+    return None
+
+def validate_event_update(data: Any, valid_type_ids) -> Optional[str]:
+    """Return the client-facing error for a PUT /events/<id> payload, or None if it is valid.
+
+    Only the fields being changed are checked; update_event skips empty ones.
+    """
+    if not isinstance(data, dict):
+        return "Dữ liệu sự kiện phải là một object JSON"
+    
+    event_type_id = data.get('eventTypeId') or data.get('event_type_id')
+    if event_type_id and event_type_id not in valid_type_ids:
+        logger.warning(f"⚠️ Invalid event_type_id: {event_type_id}")
+        return "event_type_id không hợp lệ"
+    
+    return None
+
+def create_events_batch(events_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Create several validated events in one transaction with a single executemany.
+
+    Returns the created events in input order.
+    """
+    logger.info(f"📝 Creating {len(events_data)} events in one batch")
+    rows = [event_fields_from_payload(event_data) for event_data in events_data]
+    if not rows:
+        return []
+    
+    created_at = datetime.now().isoformat()
+    
+    def insert_batch(conn):
+        # The write lock is held from BEGIN IMMEDIATE, so every id above this one is ours
+        previous_max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        # Triggers give each row its change_seq
+        conn.executemany('''
+            INSERT INTO events (title, description, type_id, start_date, location, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(*row, created_at) for row in rows])
+        
+        return conn.execute(
+            "SELECT * FROM events WHERE id > ? ORDER BY id", (previous_max_id,)
+        ).fetchall()
+    
+    # New events have no images yet
+    created = [event_row_to_dict(row, []) for row in run_write(insert_batch)]
+    bump_write_generation()
+    logger.info(f"✅ Batch created events: {[event['id'] for event in created]}")
+    return created
+
 def create_event(event_data: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new event"""
     logger.info(f"📝 Creating new event: {event_data.get('title', 'Unknown')}")
-    with get_db() as conn:
-        # First, let's check the current max ID to understand the sequence
-        cursor = conn.execute("SELECT MAX(id) FROM events")
-        max_id_result = cursor.fetchone()
-        current_max_id = max_id_result[0] if max_id_result[0] is not None else 0
-        logger.info(f"🔍 Current max event ID: {current_max_id}")
-        
-        # Handle both camelCase and snake_case field names
-        title = event_data.get('title') or event_data.get('title', '')
-        description = event_data.get('description') or event_data.get('description', '')
-        event_type_id = event_data.get('eventTypeId') or event_data.get('event_type_id')
-        start_date = event_data.get('startDate') or event_data.get('start_date')
-        location = event_data.get('location') or event_data.get('location', '')
-        
-        # Validate required fields
-        if not all([title, description, event_type_id, start_date, location]):
-            raise ValueError("Missing required fields: title, description, eventTypeId, startDate, location")
-        
-        # Insert the new event
-        cursor = conn.execute('''
+    title, description, event_type_id, start_date, location = event_fields_from_payload(event_data)
+    
+    def insert(conn):
+        return conn.execute('''
             INSERT INTO events (title, description, type_id, start_date, location, created_at)
             VALUES (?, ?, ?, ?, ?, ?)
+            RETURNING *
         ''', (
             title,
             description,
@@ -303,203 +1948,684 @@ def create_event(event_data: Dict[str, Any]) -> Dict[str, Any]:
             start_date,
             location,
             datetime.now().isoformat()
-        ))
-        
-        event_id = cursor.lastrowid
-        logger.info(f"✅ Event created with ID: {event_id}")
-        
-        # Verify the event was actually created within the same transaction
-        verify_cursor = conn.execute("SELECT id, title FROM events WHERE id = ?", (event_id,))
-        verify_result = verify_cursor.fetchone()
-        
-        if not verify_result:
-            logger.error(f"❌ CRITICAL: Event with ID {event_id} was not found after creation!")
-            raise Exception(f"Event creation failed - ID {event_id} not found in database")
-        
-        # Get the complete event data within the same transaction
-        try:
-            # Get event data directly in this transaction
-            event_cursor = conn.execute(
-                "SELECT * FROM events WHERE id = ?",
-                (event_id,)
-            )
-            event = event_cursor.fetchone()
-            
-            if not event:
-                logger.error(f"❌ CRITICAL: Event with ID {event_id} not found in same transaction!")
-                raise Exception(f"Event not found in same transaction - ID {event_id}")
-            
-            # Get images for this event
-            images_cursor = conn.execute(
-                "SELECT * FROM images WHERE event_id = ? ORDER BY uploaded_at DESC",
-                (event_id,)
-            )
-            images = [dict(img) for img in images_cursor.fetchall()]
-            
-            # Convert to dict and add images - use snake_case for response
-            event_dict = dict(event)
-            # Map type_id to event_type_id for consistency
-            event_dict['event_type_id'] = event_dict.pop('type_id', None)
-            event_dict['images'] = images
-            
-            logger.info(f"✅ Event data retrieved successfully: ID {event_id}, Title: {event_dict['title']}")
-            return event_dict
-            
-        except Exception as e:
-            logger.error(f"❌ CRITICAL: Could not retrieve event data for ID {event_id}: {str(e)}")
-            # Return basic event data instead of raising exception
-            return {
-                "id": event_id,
-                "title": "Event Created Successfully",
-                "description": "Event was created but data retrieval failed",
-                "event_type_id": 1,
-                "start_date": datetime.now().isoformat(),
-                "location": "Unknown",
-                "created_at": datetime.now().isoformat(),
-                "images": []
-            }
+        )).fetchone()
+    
+    event = run_write(insert)
+    bump_write_generation()
+    # A new event has no images yet
+    event_dict = event_row_to_dict(event, [])
+    logger.info(f"✅ Event created with ID: {event_dict['id']}")
+    return event_dict
 
 def update_event(event_id: int, event_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Update an existing event"""
     logger.info(f"📝 Updating event ID: {event_id}")
-    with get_db() as conn:
-        # Check if event exists
-        cursor = conn.execute("SELECT id FROM events WHERE id = ?", (event_id,))
-        if not cursor.fetchone():
-            logger.warning(f"⚠️ Event not found for update: {event_id}")
-            return None
+    # Build update query dynamically - handle both camelCase and snake_case
+    update_fields = []
+    params = []
+    
+    field_mapping = {
+        'title': 'title',
+        'description': 'description',
+        'eventTypeId': 'type_id',
+        'event_type_id': 'type_id',
+        'startDate': 'start_date',
+        'start_date': 'start_date',
+        'location': 'location'
+    }
+    
+    for field, db_field in field_mapping.items():
+        if field in event_data and event_data[field]:
+            update_fields.append(f"{db_field} = ?")
+            params.append(event_data[field])
+    
+    if update_fields:
+        logger.info(f"✅ Event update with fields: {', '.join(update_fields)}")
+        update_fields.append("updated_at = ?")
+        params.append(datetime.now().isoformat())
+        params.append(event_id)
+    
+    def update(conn):
+        if update_fields:
+            query = f"UPDATE events SET {', '.join(update_fields)} WHERE id = ? RETURNING *"
+            event = conn.execute(query, params).fetchone()
+        else:
+            event = conn.execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
         
-        # Build update query dynamically - handle both camelCase and snake_case
-        update_fields = []
-        params = []
+        if not event:
+            return None
+        return event, load_images_for_events(conn, [event_id])[event_id]
+    
+    updated = run_write(update)
+    if not updated:
+        logger.warning(f"⚠️ Event not found for update: {event_id}")
+        return None
+    
+    event, images = updated
+    if update_fields:
+        bump_write_generation()
+    return event_row_to_dict(event, images)
+
+def delete_event(event_id: int) -> bool:
+    """Delete an event and its images"""
+    logger.info(f"🗑️ Deleting event ID: {event_id}")
+    def delete(conn):
+        # Delete event (images will be deleted automatically due to CASCADE)
+        deleted = conn.execute("DELETE FROM events WHERE id = ? RETURNING id", (event_id,)).fetchone()
+        if not deleted:
+            return None
         
-        field_mapping = {
-            'title': 'title',
-            'description': 'description',
-            'eventTypeId': 'type_id',
-            'event_type_id': 'type_id',
-            'startDate': 'start_date',
-            'start_date': 'start_date',
-            'location': 'location'
-        }
+        # A trigger writes the tombstone that tells sync clients about the delete
+        compact_tombstones(conn)
+        # The cascade released the event's images; drop blobs nothing else uses
+        return collect_orphan_blobs(conn)
+    
+    orphan_files = run_write(delete)
+    if orphan_files is None:
+        logger.warning(f"⚠️ Event not found for deletion: {event_id}")
+        return False
+    
+    bump_write_generation()
+    remove_blob_files(orphan_files)
+    logger.info(f"✅ Event deleted successfully: {event_id}")
+    return True
+
+def get_event_images(event_id: int) -> List[Dict[str, Any]]:
+    """Get all images for an event"""
+    logger.debug(f"🔍 Getting images for event ID: {event_id}")
+    with get_read_db(snapshot=False) as conn:
+        images = load_images_for_events(conn, [event_id])[event_id]
+        logger.debug(f"✅ Found {len(images)} images for event {event_id}")
+        return images
+
+upload_spool_executor = ThreadPoolExecutor(UPLOAD_SPOOL_WORKERS, thread_name_prefix='upload-spool')
+
+def spool_upload(file) -> Tuple[str, str, int]:
+    """Stream an uploaded file to a temp file in UPLOAD_TEMP_FOLDER, hashing it on the way.
+
+    Returns (temp path, SHA-256 hex digest, size in bytes).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(prefix='upload-', dir=UPLOAD_TEMP_FOLDER)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+def spool_uploads(image_files) -> List[Dict[str, Any]]:
+    """Phase one of an upload: stream all accepted files to temp files concurrently.
+
+    Runs without any database lock. Returns one dict per accepted file with
+    original_name, extension, temp_path, sha256 and file_size; if any file
+    fails, the temp files already written are removed before re-raising.
+    """
+    accepted = [file for file in image_files if file and file.filename != '' and allowed_file(file.filename)]
+    futures = [upload_spool_executor.submit(spool_upload, file) for file in accepted]
+    spooled = []
+    error = None
+    for file, future in zip(accepted, futures):
+        try:
+            temp_path, sha256, file_size = future.result()
+        except Exception as e:
+            error = error or e
+            continue
+        spooled.append({
+            "original_name": file.filename,
+            "extension": file.filename.rsplit('.', 1)[1].lower(),
+            "temp_path": temp_path,
+            "sha256": sha256,
+            "file_size": file_size
+        })
+    
+    if error is not None:
+        remove_temp_files(spooled)
+        raise error
+    return spooled
+
+def remove_temp_files(spooled: List[Dict[str, Any]]):
+    for upload in spooled:
+        try:
+            os.unlink(upload['temp_path'])
+        except FileNotFoundError:
+            pass
+
+def place_blobs(conn, spooled: List[Dict[str, Any]]) -> List[str]:
+    """Move spooled files into the blob store inside the caller's write transaction.
+
+    Sets upload['filename'] on each entry. Content that is already stored
+    (or repeated within this batch) reuses the existing file and its temp
+    file is removed. Returns the paths of newly placed files, which the
+    caller must remove if the transaction does not commit. If placing
+    fails partway, the files this call placed and the remaining temp files
+    are removed before the error propagates.
+    """
+    hashes = list(dict.fromkeys(upload['sha256'] for upload in spooled))
+    stored = {
+        row['sha256']: row['filename']
+        for row in conn.execute(
+            "SELECT sha256, filename FROM blobs WHERE sha256 IN (SELECT value FROM json_each(?))",
+            (json.dumps(hashes),)
+        )
+        if os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], row['filename']))
+    }
+    
+    placed_files = []
+    new_blobs = []
+    try:
+        for upload in spooled:
+            sha256 = upload['sha256']
+            if sha256 in stored:
+                os.unlink(upload['temp_path'])
+                upload['filename'] = stored[sha256]
+                upload['deduplicated'] = True
+                continue
+            
+            filename = f"{sha256}.{upload['extension']}"
+            if os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
+                # Left over from a blob that was just collected and is about to be unlinked
+                filename = f"{sha256}-{uuid.uuid4().hex[:8]}.{upload['extension']}"
+            path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            os.replace(upload['temp_path'], path)
+            placed_files.append(path)
+            stored[sha256] = filename
+            upload['filename'] = filename
+            upload['deduplicated'] = False
+            new_blobs.append((sha256, filename, upload['file_size'], datetime.now().isoformat()))
+    except BaseException:
+        # No rows will point at the files placed so far, and the rest will never be placed
+        for path in placed_files:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        remove_temp_files(spooled)
+        raise
+    
+    if new_blobs:
+        conn.executemany('''
+            INSERT INTO blobs (sha256, filename, file_size, ref_count, created_at) VALUES (?, ?, ?, 0, ?)
+            ON CONFLICT (sha256) DO UPDATE SET filename = excluded.filename
+        ''', new_blobs)
+    return placed_files
+
+def collect_orphan_blobs(conn) -> List[str]:
+    """Delete blob rows no image references any more, inside the caller's write transaction.
+
+    Returns their filenames; pass them to remove_blob_files once the
+    transaction has committed, so a rollback never loses a file.
+    """
+    return [row['filename'] for row in
+            conn.execute("DELETE FROM blobs WHERE ref_count <= 0 RETURNING filename")]
+
+def remove_blob_files(filenames: List[str]):
+    for filename in filenames:
+        paths = [os.path.join(app.config['UPLOAD_FOLDER'], filename)]
+        for variant in IMAGE_VARIANT_SIZES:
+            paths.append(os.path.join(VARIANT_FOLDER, variant_filename(filename, variant)))
+            paths.append(os.path.join(VARIANT_FOLDER, failure_marker_filename(filename, variant)))
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+    if filenames:
+        logger.info(f"🧹 Removed {len(filenames)} unreferenced image blobs")
+
+def get_storage_stats() -> Dict[str, Any]:
+    """Logical vs stored bytes of content-addressed uploads"""
+    with get_read_db() as conn:
+        images = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(file_size), 0) FROM images WHERE blob_sha256 IS NOT NULL"
+        ).fetchone()
+        blobs = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(file_size), 0) FROM blobs WHERE ref_count > 0"
+        ).fetchone()
+    return {
+        "images": images[0],
+        "blobs": blobs[0],
+        "logical_bytes": images[1],
+        "stored_bytes": blobs[1],
+        "dedup_ratio": round(images[1] / blobs[1], 3) if blobs[1] else 1.0
+    }
+
+def add_event_images(event_id: int, image_files) -> List[Dict[str, Any]]:
+    """Add images to an event, storing each distinct file content once.
+
+    Files are first written to temp files concurrently with no database lock
+    held (spool_uploads); then one short write transaction moves them into
+    place and inserts all image rows with a single statement.
+    """
+    logger.info(f"📁 Adding images to event ID: {event_id}")
+    return attach_spooled_images(event_id, spool_uploads(image_files))
+
+def attach_spooled_images(event_id: int, spooled: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Phase two of an upload: store spooled files as images of an event.
+    
+    The temp files are always consumed (moved into place or removed).
+    Returns [] if the event does not exist.
+    """
+    if not spooled:
+        return []
+    
+    # Blob files placed by this call, removed again if the transaction fails
+    placed_files = []
+    
+    def insert_images(conn):
+        # Check if event exists with more detailed logging
+        cursor = conn.execute("SELECT id, title FROM events WHERE id = ?", (event_id,))
+        event_result = cursor.fetchone()
+        if not event_result:
+            logger.error(f"❌ Event not found for image upload: {event_id}")
+            logger.error(f"🔍 Checking all events in database...")
+            all_events_cursor = conn.execute("SELECT id, title FROM events ORDER BY id DESC LIMIT 10")
+            all_events = all_events_cursor.fetchall()
+            logger.error(f"📋 Recent events in database: {[dict(e) for e in all_events]}")
+            return None
         
-        for field, db_field in field_mapping.items():
-            if field in event_data and event_data[field]:
-                update_fields.append(f"{db_field} = ?")
-                params.append(event_data[field])
+        logger.info(f"✅ Found event: ID {event_result[0]}, Title: {event_result[1]}")
         
-        if update_fields:
-            update_fields.append("updated_at = ?")
-            params.append(datetime.now().isoformat())
-            params.append(event_id)
-            
-            query = f"UPDATE events SET {', '.join(update_fields)} WHERE id = ?"
-            conn.execute(query, params)
-            logger.info(f"✅ Event updated with fields: {', '.join(update_fields[:-1])}")
+        placed_files.extend(place_blobs(conn, spooled))
         
-        return get_event_by_id(event_id)
+        uploaded_at = datetime.now().isoformat()
+        placeholders = ', '.join(['(?, ?, ?, ?, ?, ?, ?)'] * len(spooled))
+        params = []
+        for upload in spooled:
+            params.extend([
+                event_id,
+                upload['original_name'],
+                upload['filename'],
+                os.path.join(app.config['UPLOAD_FOLDER'], upload['filename']),
+                upload['file_size'],
+                uploaded_at,
+                upload['sha256']
+            ])
+        # Save to database; a trigger bumps each blob's ref_count
+        image_rows = conn.execute(f'''
+            INSERT INTO images (event_id, original_name, filename, file_path, file_size, uploaded_at, blob_sha256)
+            VALUES {placeholders}
+            RETURNING *
+        ''', params).fetchall()
+        return [image_row_to_dict(row) for row in sorted(image_rows, key=lambda row: row['id'])]
+    
+    try:
+        uploaded_images = run_write(insert_images)
+    except BaseException:
+        for path in placed_files:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        raise
+    finally:
+        # Temp files not moved into place (event missing, or an error before placing)
+        remove_temp_files(spooled)
+    
+    if uploaded_images is None:
+        return []
+    
+    bump_write_generation()
+    for upload in spooled:
+        metrics.inc('upload_bytes_total', upload['file_size'])
+        metrics.inc('uploaded_images_total')
+        if upload['deduplicated']:
+            metrics.inc('upload_deduplicated_total')
+        logger.info(f"✅ Image uploaded: {upload['original_name']} -> {upload['filename']}"
+                    f"{' (deduplicated)' if upload['deduplicated'] else ''}")
+    
+    # Thumbnails are generated once the rows are committed
+    for filename in dict.fromkeys(image['filename'] for image in uploaded_images):
+        variant_pipeline.submit(filename)
+    
+    logger.info(f"✅ Total images uploaded: {len(uploaded_images)}")
+    return uploaded_images
+
+def upload_session_path(session_id: str) -> str:
+    return os.path.join(UPLOAD_SESSION_FOLDER, f"{session_id}.part")
+
+def upload_session_to_dict(row) -> Dict[str, Any]:
+    return {
+        "session_id": row['id'],
+        "event_id": row['event_id'],
+        "original_name": row['original_name'],
+        "total_size": row['total_size'],
+        "offset": row['received_size'],
+        "created_at": row['created_at'],
+        "expires_at": datetime.fromtimestamp(row['updated_at'] + UPLOAD_SESSION_TTL).isoformat()
+    }
+
+def create_upload_session(event_id: int, original_name: str, total_size: Optional[int]) -> Optional[Dict[str, Any]]:
+    """Open a resumable upload for an event; None if the event does not exist"""
+    collect_upload_sessions()
+    session_id = uuid.uuid4().hex
+    
+    def insert(conn):
+        row = conn.execute('''
+            INSERT INTO upload_sessions (id, event_id, original_name, total_size, received_size, created_at, updated_at)
+            SELECT ?, id, ?, ?, 0, ?, ? FROM events WHERE id = ?
+            RETURNING *
+        ''', (session_id, original_name, total_size, datetime.now().isoformat(), time.time(), event_id)).fetchone()
+        if row:
+            # Create the empty partial file while the row is uncommitted, so it always exists for a live session
+            open(upload_session_path(session_id), 'wb').close()
+        return row
+    
+    row = run_write(insert)
+    if not row:
+        return None
+    logger.info(f"📤 Upload session {session_id} opened for event {event_id}: {original_name} ({total_size} bytes)")
+    return upload_session_to_dict(row)
+
+def get_upload_session(session_id: str) -> Optional[Dict[str, Any]]:
+    with get_read_db(snapshot=False) as conn:
+        row = conn.execute("SELECT * FROM upload_sessions WHERE id = ?", (session_id,)).fetchone()
+    return upload_session_to_dict(row) if row else None
+
+class UploadSessionConflict(Exception):
+    """The chunk or finalize request doesn't match the session's state"""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+class UploadSessionTooLarge(UploadSessionConflict):
+    """The chunk would take the upload past its declared size or UPLOAD_SESSION_MAX_BYTES"""
+
+def claim_upload_session(session_id: str, offset: Optional[int] = None):
+    """Take the session for one writer, checking its offset in the same statement.
+
+    Returns the session row, None if it doesn't exist, or raises
+    UploadSessionConflict if another request holds it or `offset` is stale.
+    """
+    now = time.time()
+    
+    def claim(conn):
+        row = conn.execute('''
+            UPDATE upload_sessions SET claimed_until = ?
+            WHERE id = ? AND (claimed_until IS NULL OR claimed_until < ?)
+              AND (? IS NULL OR received_size = ?)
+            RETURNING *
+        ''', (now + UPLOAD_SESSION_CLAIM_TIMEOUT, session_id, now, offset, offset)).fetchone()
+        if row:
+            return row, None
+        return None, conn.execute("SELECT * FROM upload_sessions WHERE id = ?", (session_id,)).fetchone()
+    
+    row, current = run_write(claim)
+    if row:
+        return row
+    if not current:
+        return None
+    if offset is not None and current['received_size'] != offset:
+        raise UploadSessionConflict(f"offset {offset} does not match", current['received_size'])
+    raise UploadSessionConflict("session is busy", current['received_size'])
 
-def delete_event(event_id: int) -> bool:
-    """Delete an event and its images"""
-    logger.info(f"🗑️ Deleting event ID: {event_id}")
-    with get_db() as conn:
-        cursor = conn.execute("SELECT id FROM events WHERE id = ?", (event_id,))
-        if not cursor.fetchone():
-            logger.warning(f"⚠️ Event not found for deletion: {event_id}")
-            return False
-        
-        # Delete event (images will be deleted automatically due to CASCADE)
-        conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
-        logger.info(f"✅ Event deleted successfully: {event_id}")
-        return True
+def release_upload_session(session_id: str, received_size: int) -> Optional[Dict[str, Any]]:
+    def release(conn):
+        return conn.execute(
+            "UPDATE upload_sessions SET received_size = ?, claimed_until = NULL, updated_at = ? WHERE id = ? RETURNING *",
+            (received_size, time.time(), session_id)
+        ).fetchone()
+    
+    row = run_write(release)
+    return upload_session_to_dict(row) if row else None
 
-def get_event_images(event_id: int) -> List[Dict[str, Any]]:
-    """Get all images for an event"""
-    logger.debug(f"🔍 Getting images for event ID: {event_id}")
-    with get_db() as conn:
-        cursor = conn.execute(
-            "SELECT * FROM images WHERE event_id = ? ORDER BY uploaded_at DESC",
-            (event_id,)
-        )
-        images = [dict(img) for img in cursor.fetchall()]
-        logger.debug(f"✅ Found {len(images)} images for event {event_id}")
-        return images
+def append_upload_chunk(session_id: str, offset: int, stream) -> Optional[Dict[str, Any]]:
+    """Append a request body at `offset` of the session's partial file.
 
-def add_event_images(event_id: int, image_files) -> List[Dict[str, Any]]:
-    """Add images to an event"""
-    logger.info(f"📁 Adding images to event ID: {event_id}")
-    with get_db() as conn:
-        # Check if event exists with more detailed logging
-        cursor = conn.execute("SELECT id, title FROM events WHERE id = ?", (event_id,))
-        event_result = cursor.fetchone()
-        if not event_result:
-            logger.error(f"❌ Event not found for image upload: {event_id}")
-            logger.error(f"🔍 Checking all events in database...")
-            all_events_cursor = conn.execute("SELECT id, title FROM events ORDER BY id DESC LIMIT 10")
-            all_events = all_events_cursor.fetchall()
-            logger.error(f"📋 Recent events in database: {[dict(e) for e in all_events]}")
-            return []
+    The body is copied to disk in UPLOAD_CHUNK_SIZE pieces. If the client
+    disconnects midway, the bytes that did arrive are kept and the new
+    offset tells it where to resume. Returns the updated session, or None
+    if it doesn't exist.
+    """
+    row = claim_upload_session(session_id, offset)
+    if row is None:
+        return None
+    
+    limit = row['total_size'] if row['total_size'] is not None else UPLOAD_SESSION_MAX_BYTES
+    received = offset
+    try:
+        with open(upload_session_path(session_id), 'r+b') as out:
+            # Drop bytes past the committed offset left by a writer that died before recording them
+            out.truncate(offset)
+            out.seek(offset)
+            while True:
+                try:
+                    chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                except (ClientDisconnected, OSError) as e:
+                    # Only the client side; disk errors below propagate as a 500
+                    logger.warning(f"⚠️ Upload session {session_id} chunk interrupted at {received} bytes: {e!r}")
+                    break
+                if not chunk:
+                    break
+                if received + len(chunk) > limit:
+                    raise UploadSessionTooLarge(f"upload exceeds {limit} bytes", received)
+                out.write(chunk)
+                received += len(chunk)
+    finally:
+        session = release_upload_session(session_id, received)
+    
+    logger.debug(f"📤 Upload session {session_id}: {offset} -> {received} bytes")
+    return session
+
+def finalize_upload_session(session_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Attach a completed upload to its event and close the session.
+
+    Returns the created image (as a one-element list, like add_event_images),
+    None if the session doesn't exist, or raises UploadSessionConflict if
+    the upload is incomplete.
+    """
+    row = claim_upload_session(session_id)
+    if row is None:
+        return None
+    try:
+        if row['total_size'] is not None and row['received_size'] != row['total_size']:
+            raise UploadSessionConflict(
+                f"received {row['received_size']} of {row['total_size']} bytes", row['received_size']
+            )
+        if row['received_size'] == 0:
+            raise UploadSessionConflict("upload is empty", 0)
         
-        logger.info(f"✅ Found event: ID {event_result[0]}, Title: {event_result[1]}")
+        # Hard-link the partial file so a failed attach leaves the session resumable
+        fd, temp_path = tempfile.mkstemp(prefix='upload-', dir=UPLOAD_TEMP_FOLDER)
+        os.close(fd)
+        os.unlink(temp_path)
+        try:
+            os.link(upload_session_path(session_id), temp_path)
+        except OSError:
+            shutil.copyfile(upload_session_path(session_id), temp_path)
         
-        uploaded_images = []
-        
-        for file in image_files:
-            if file and file.filename != '' and allowed_file(file.filename):
-                logger.info(f"📸 Processing image: {file.filename}")
-                # Generate unique filename
-                file_extension = file.filename.rsplit('.', 1)[1].lower()
-                unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-                
-                # Save file
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                file.save(file_path)
-                
-                # Save to database
-                cursor = conn.execute('''
-                    INSERT INTO images (event_id, original_name, filename, file_path, file_size, uploaded_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    event_id,
-                    file.filename,
-                    unique_filename,
-                    file_path,
-                    os.path.getsize(file_path),
-                    datetime.now().isoformat()
-                ))
-                
-                image_id = cursor.lastrowid
-                
-                # Get the inserted image
-                img_cursor = conn.execute("SELECT * FROM images WHERE id = ?", (image_id,))
-                image_data = dict(img_cursor.fetchone())
-                
-                # Return snake_case response for consistency
-                mapped_image = {
-                    'id': image_data['id'],
-                    'event_id': image_data['event_id'],
-                    'original_name': image_data['original_name'],
-                    'filename': image_data['filename'],
-                    'file_path': image_data['file_path'],
-                    'file_size': image_data['file_size'],
-                    'uploaded_at': image_data['uploaded_at']
-                }
-                uploaded_images.append(mapped_image)
-                
-                logger.info(f"✅ Image uploaded: {file.filename} -> {unique_filename}")
+        digest = hashlib.sha256()
+        with open(temp_path, 'rb') as uploaded:
+            for chunk in iter(lambda: uploaded.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
         
-        logger.info(f"✅ Total images uploaded: {len(uploaded_images)}")
-        return uploaded_images
+        images = attach_spooled_images(row['event_id'], [{
+            "original_name": row['original_name'],
+            "extension": row['original_name'].rsplit('.', 1)[1].lower(),
+            "temp_path": temp_path,
+            "sha256": digest.hexdigest(),
+            "file_size": row['received_size']
+        }])
+    except BaseException:
+        release_upload_session(session_id, row['received_size'])
+        raise
+    
+    delete_upload_session(session_id)
+    logger.info(f"✅ Upload session {session_id} finalized for event {row['event_id']}")
+    return images
+
+def delete_upload_session(session_id: str) -> bool:
+    def delete(conn):
+        return conn.execute("DELETE FROM upload_sessions WHERE id = ? RETURNING id", (session_id,)).fetchone()
+    
+    deleted = run_write(delete)
+    try:
+        os.unlink(upload_session_path(session_id))
+    except FileNotFoundError:
+        pass
+    return deleted is not None
+
+_last_upload_session_gc = 0.0
+
+def collect_upload_sessions(force: bool = False) -> int:
+    """Delete sessions idle for UPLOAD_SESSION_TTL and partial files without a session.
+
+    Runs at most once per UPLOAD_SESSION_GC_INTERVAL unless forced.
+    Returns the number of partial files removed.
+    """
+    global _last_upload_session_gc
+    now = time.time()
+    if not force and now - _last_upload_session_gc < UPLOAD_SESSION_GC_INTERVAL:
+        return 0
+    _last_upload_session_gc = now
+    
+    def expire(conn):
+        conn.execute(
+            "DELETE FROM upload_sessions WHERE updated_at < ? AND (claimed_until IS NULL OR claimed_until < ?)",
+            (now - UPLOAD_SESSION_TTL, now)
+        )
+        return {row['id'] for row in conn.execute("SELECT id FROM upload_sessions")}
+    
+    live = run_write(expire)
+    
+    # Also catches files of sessions removed by an event delete (ON DELETE CASCADE).
+    # Recent files are skipped: their session may have been created after the query above.
+    removed = 0
+    for name in os.listdir(UPLOAD_SESSION_FOLDER):
+        path = os.path.join(UPLOAD_SESSION_FOLDER, name)
+        if name.endswith('.part') and name[:-len('.part')] not in live:
+            try:
+                if os.path.getmtime(path) < now - UPLOAD_SESSION_CLAIM_TIMEOUT:
+                    os.unlink(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    if removed:
+        logger.info(f"🧹 Removed {removed} abandoned upload sessions")
+    return removed
 
 def get_all_event_types() -> List[Dict[str, Any]]:
     """Get all event types"""
     logger.debug("🔍 Getting all event types")
-    with get_db() as conn:
+    with get_read_db(snapshot=False) as conn:
         cursor = conn.execute("SELECT * FROM event_types ORDER BY id")
         types = [dict(row) for row in cursor.fetchall()]
         logger.debug(f"✅ Found {len(types)} event types")
         return types
 
+class EventTypeCache:
+    """In-memory copy of event_types, loaded on first use.
+
+    event_types is only written at startup, so the rows, the id set used by
+    validation and the serialized GET /event-types body are built once and
+    kept until invalidate() is called. Every reload bumps `generation`,
+    which is part of the ETag.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.generation = 0
+    
+    def _load(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._snapshot is None:
+                types = get_all_event_types()
+                self.generation += 1
+                payload = app.json.dumps({
+                    "success": True,
+                    "data": types,
+                    "message": "Lấy danh sách loại sự kiện thành công"
+                }).encode('utf-8')
+                self._snapshot = {
+                    "types": types,
+                    "ids": frozenset(t['id'] for t in types),
+                    "payload": payload,
+                    "etag": f"t{self.generation}-{hashlib.sha1(payload).hexdigest()[:16]}"
+                }
+                logger.info(f"🗂️ Event type cache loaded (generation {self.generation}, {len(types)} types)")
+            return self._snapshot
+    
+    def _get(self) -> Dict[str, Any]:
+        # The snapshot is replaced, never mutated, so reading it needs no lock
+        snapshot = self._snapshot
+        return snapshot if snapshot is not None else self._load()
+    
+    def ids(self) -> frozenset:
+        """Set of valid event type ids"""
+        return self._get()['ids']
+    
+    def types(self) -> List[Dict[str, Any]]:
+        return self._get()['types']
+    
+    def payload(self) -> Tuple[bytes, str]:
+        """(serialized GET /event-types body, ETag)"""
+        snapshot = self._get()
+        return snapshot['payload'], snapshot['etag']
+    
+    def invalidate(self):
+        """Drop the cached copy; call after writing to event_types"""
+        with self._lock:
+            self._snapshot = None
+        logger.info("🗂️ Event type cache invalidated")
+
+event_type_cache = EventTypeCache()
+
+def get_data_version() -> Tuple[int, Optional[datetime]]:
+    """Current (change counter, last change time) of events and images.
+
+    changed_at has whole-second resolution, so a write later in the same
+    second would keep the same Last-Modified and If-Modified-Since would
+    wrongly match it. Until that second is over the time is None and only
+    the ETag validates (RFC 9110 8.8.2.2).
+    """
+    with get_read_db(snapshot=False) as conn:
+        row = conn.execute("SELECT version, changed_at FROM data_version WHERE id = 1").fetchone()
+    if row['changed_at'] >= int(time.time()):
+        return row['version'], None
+    return row['version'], datetime.fromtimestamp(row['changed_at'], timezone.utc)
+
+def make_etag(version: int, *parts) -> str:
+    """Strong ETag value for a representation derived from data version `version`"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+    return f"v{version}-{digest}"
+
+def check_not_modified(etag: str, last_modified: datetime = None):
+    """Return a 304 response if the request's validators match, else None.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    Call this before running the query so a match skips all database work.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        matched = last_modified <= request.if_modified_since
+    else:
+        matched = False
+    
+    if not matched:
+        return None
+    
+    response = app.response_class(status=304)
+    return set_cache_validators(response, etag, last_modified)
+
+def set_cache_validators(response, etag: str, last_modified: datetime = None):
+    """Attach ETag/Last-Modified and require revalidation on every use"""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 def create_response(success=True, data=None, message="", status_code=200):
     response = {
         "success": success,
@@ -508,8 +2634,49 @@ def create_response(success=True, data=None, message="", status_code=200):
     }
     return jsonify(response), status_code
 
-# Initialize database on startup
-init_database()
+# Process lifecycle. init_database() runs once per deployment: in the prefork
+# master (prefork.py) or before app.run(), not at import time in every worker.
+# Other hosts of `app` (flask run, gunicorn) get it on their first request.
+
+def _before_fork():
+    # Threads don't survive fork(): stop the log listener so the child can't inherit
+    # its locks held, and close pooled connections, which SQLite can't share across fork()
+    _stop_log_listener()
+    db_pool.close_all()
+    read_pool.close_all()
+
+def _after_fork_in_child():
+    log_listener.start()
+    variant_pipeline.reset_after_fork()
+    write_queue.reset_after_fork()
+
+def _start_process():
+    """Side effects of importing the server: logging, upload folders and fork hooks.
+
+    Skipped when multiprocessing re-runs the main script as __mp_main__ in
+    an image variant worker (spawned, see VariantPipeline): the worker only
+    runs image_variants.generate_variants and needs none of this.
+    """
+    logging.basicConfig(level=logging.INFO, handlers=[log_queue_handler])
+    log_listener.start()
+    atexit.register(_stop_log_listener)
+    
+    for folder in (UPLOAD_FOLDER, VARIANT_FOLDER, UPLOAD_SESSION_FOLDER, UPLOAD_TEMP_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+    
+    os.register_at_fork(before=_before_fork, after_in_parent=log_listener.start, after_in_child=_after_fork_in_child)
+
+if __name__ != '__mp_main__':
+    _start_process()
+
+def shutdown_worker():
+    """Release background resources and flush the log before a worker process exits"""
+    write_queue.shutdown()
+    variant_pipeline.shutdown()
+    upload_spool_executor.shutdown(wait=False)
+    db_pool.close_all()
+    read_pool.close_all()
+    _stop_log_listener()
 
 # API Routes
 
@@ -523,18 +2690,56 @@ def home():
             "database": DATABASE_PATH,
             "endpoints": [
                 "GET /events",
+                "GET /events/changes",
                 "GET /events/<id>",
                 "POST /events",
+                "POST /events/batch",
                 "PUT /events/<id>",
                 "DELETE /events/<id>",
                 "POST /events/<id>/images",
+                "POST /events/<id>/upload-sessions",
+                "GET /upload-sessions/<id>",
+                "PUT /upload-sessions/<id>",
+                "POST /upload-sessions/<id>/finalize",
+                "DELETE /upload-sessions/<id>",
                 "GET /event-types",
-                "GET /debug/events"
+                "GET /debug/events",
+                "GET /metrics"
             ]
         },
         message="Mock Events API Server is running with SQLite database"
     )
 
+def stream_events_json(filters: Dict[str, Any], limit: int, cursor: Optional[str], sort: str) -> Iterator[str]:
+    """Yield the GET /events envelope incrementally, one batch of events per chunk.
+
+    Produces the same JSON document as the buffered response; keys that are
+    only known at the end (total, next_cursor, message) come after the array.
+    """
+    def dumps(value):
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    
+    yield ('{"success":true,"data":{"filters":' + dumps(filters) +
+           ',"sort":' + dumps(sort) + ',"limit":' + dumps(limit) + ',"events":[')
+    
+    total = 0
+    last_row = None
+    has_more = False
+    # One extra row tells whether another page exists
+    for rows, batch in iter_event_batches(filters['keyword'], filters['event_type_id'], limit + 1, cursor, sort):
+        if total + len(batch) > limit:
+            batch = batch[:limit - total]
+            has_more = True
+        if batch:
+            yield (',' if total else '') + ','.join(dumps(event) for event in batch)
+            total += len(batch)
+            last_row = rows[len(batch) - 1]
+    
+    next_cursor = encode_event_cursor(last_row, sort) if has_more and last_row else None
+    message = f"Lấy danh sách sự kiện thành công. Tìm thấy {total} sự kiện."
+    yield ('],"total":' + dumps(total) + ',"next_cursor":' + dumps(next_cursor) +
+           '},"message":' + dumps(message) + '}')
+
 @app.route('/events', methods=['GET'])
 def get_events():
     """GET /events - Lấy danh sách sự kiện với tìm kiếm"""
@@ -545,22 +2750,77 @@ def get_events():
         if type_id:
             type_id = int(type_id)
         
-        logger.info(f"🔍 Getting events with filters - keyword: '{keyword}', type_id: {type_id}")
+        cursor = request.args.get('cursor') or None
+        requested_sort = request.args.get('sort', 'created_at')
+        stream = request.args.get('stream', str(STREAM_RESPONSES_DEFAULT)).lower() in ('1', 'true', 'yes')
+        max_page_size = STREAM_MAX_PAGE_SIZE if stream else MAX_PAGE_SIZE
+        try:
+            if requested_sort not in EVENT_SORT_ORDERS:
+                raise ValueError(f"sort must be one of {', '.join(EVENT_SORT_ORDERS)}: {requested_sort}")
+            sort = resolve_event_sort(requested_sort, keyword)
+            limit = int(request.args.get('limit', max_page_size))
+            if limit <= 0:
+                raise ValueError(f"limit must be positive: {limit}")
+            if cursor:
+                decode_event_cursor(cursor, sort)
+        except ValueError as e:
+            logger.warning(f"⚠️ Invalid pagination parameters: {e}")
+            return create_response(
+                success=False,
+                message=f"Tham số phân trang không hợp lệ: {str(e)}",
+                status_code=400
+            )
+        limit = min(limit, max_page_size)
+        
+        logger.info(f"🔍 Getting events with filters - keyword: '{keyword}', type_id: {type_id}, "
+                    f"limit: {limit}, cursor: {cursor}, sort: {sort}")
         
-        # Get filtered events
-        filtered_events = get_all_events(keyword, type_id)
+        # Taken before any read, so a page stored under it predates every later write
+        cache_key = None if stream else (current_write_generation(), keyword, type_id, limit, cursor, sort)
+        cached = events_cache.get(cache_key) if cache_key else None
+        if cached:
+            body, etag, last_modified = cached
+            logger.debug(f"⚡ Events cache hit ({len(body)} bytes)")
+            not_modified = check_not_modified(etag, last_modified)
+            if not_modified:
+                return not_modified
+            response = app.response_class(body, mimetype='application/json')
+            return set_cache_validators(response, etag, last_modified)
         
-        return create_response(
+        # Read the version before the data so an ETag can never be newer than its body
+        version, last_modified = get_data_version()
+        etag = make_etag(version, 'events', keyword, type_id, limit, cursor, sort, stream)
+        not_modified = check_not_modified(etag, last_modified)
+        if not_modified:
+            return not_modified
+        
+        filters = {
+            "keyword": keyword if keyword else None,
+            "event_type_id": type_id
+        }
+        if stream:
+            response = app.response_class(
+                stream_with_context(stream_events_json(filters, limit, cursor, sort)),
+                mimetype='application/json'
+            )
+            return set_cache_validators(response, etag, last_modified)
+        
+        filtered_events, next_cursor = get_events_page(keyword, type_id, limit, cursor, sort)
+        
+        response, status_code = create_response(
             data={
                 "events": filtered_events,
                 "total": len(filtered_events),
-                "filters": {
-                    "keyword": keyword if keyword else None,
-                    "event_type_id": type_id
-                }
+                "filters": filters,
+                "sort": sort,
+                "limit": limit,
+                "next_cursor": next_cursor
             },
             message=f"Lấy danh sách sự kiện thành công. Tìm thấy {len(filtered_events)} sự kiện."
         )
+        body = response.get_data()
+        events_cache.put(cache_key, (body, etag, last_modified), len(body))
+        return set_cache_validators(response, etag, last_modified), status_code
     
     except Exception as e:
         logger.error(f"❌ Error getting events: {str(e)}")
@@ -570,11 +2830,61 @@ def get_events():
             status_code=500
         )
 
+@app.route('/events/changes', methods=['GET'])
+def get_events_changes():
+    """GET /events/changes - Các sự kiện đã tạo, sửa, xóa kể từ cursor"""
+    try:
+        since = request.args.get('since') or None
+        try:
+            since_seq = decode_change_cursor(since) if since else 0
+            limit = int(request.args.get('limit', MAX_PAGE_SIZE))
+            if limit <= 0:
+                raise ValueError(f"limit must be positive: {limit}")
+        except ValueError as e:
+            logger.warning(f"⚠️ Invalid change feed parameters: {e}")
+            return create_response(
+                success=False,
+                message=f"Tham số không hợp lệ: {str(e)}",
+                status_code=400
+            )
+        limit = min(limit, MAX_PAGE_SIZE)
+        
+        logger.info(f"🔍 Getting event changes since {since_seq}, limit: {limit}")
+        changes = get_event_changes(since_seq, limit)
+        
+        if changes is None:
+            logger.warning(f"⚠️ Change cursor {since_seq} is older than compacted tombstones")
+            return create_response(
+                success=False,
+                data={"reset_required": True},
+                message="Cursor đã hết hạn, cần đồng bộ lại toàn bộ danh sách sự kiện",
+                status_code=410
+            )
+        
+        return create_response(
+            data=changes,
+            message=f"Có {len(changes['events'])} sự kiện thay đổi và {len(changes['deleted_events'])} sự kiện bị xóa"
+        )
+    
+    except Exception as e:
+        logger.error(f"❌ Error getting event changes: {str(e)}")
+        return create_response(
+            success=False,
+            message=f"Lỗi khi lấy thay đổi sự kiện: {str(e)}",
+            status_code=500
+        )
+
 @app.route('/events/<int:event_id>', methods=['GET'])
 def get_event_detail(event_id):
     """GET /events/<id> - Lấy chi tiết sự kiện"""
     try:
         logger.info(f"🔍 Getting event detail for ID: {event_id}")
+        version, last_modified = get_data_version()
+        etag = make_etag(version, 'event', event_id)
+        not_modified = check_not_modified(etag, last_modified)
+        if not_modified:
+            return not_modified
+        
         event = get_event_by_id(event_id)
         
         if not event:
@@ -585,10 +2895,11 @@ def get_event_detail(event_id):
                 status_code=404
             )
         
-        return create_response(
+        response, status_code = create_response(
             data=event,
             message="Lấy chi tiết sự kiện thành công"
         )
+        return set_cache_validators(response, etag, last_modified), status_code
     
     except Exception as e:
         logger.error(f"❌ Error getting event detail: {str(e)}")
@@ -604,36 +2915,11 @@ def create_event_endpoint():
     try:
         data = request.get_json()
         
-        # Validate required fields - handle both camelCase and snake_case
-        required_fields_camel = ['title', 'description', 'eventTypeId', 'startDate', 'location']
-        required_fields_snake = ['title', 'description', 'event_type_id', 'start_date', 'location']
-        
-        # Check if we have camelCase or snake_case fields
-        has_camel = all(field in data for field in required_fields_camel)
-        has_snake = all(field in data for field in required_fields_snake)
-        
-        if not (has_camel or has_snake):
-            missing_fields = []
-            if not has_camel:
-                missing_fields.extend([f for f in required_fields_camel if f not in data or not data[f]])
-            if not has_snake:
-                missing_fields.extend([f for f in required_fields_snake if f not in data or not data[f]])
-            
-            logger.warning(f"⚠️ Missing required fields: {missing_fields}")
-            return create_response(
-                success=False,
-                message=f"Thiếu trường bắt buộc: {', '.join(missing_fields)}",
-                status_code=400
-            )
-        
-        # Validate event_type_id exists
-        event_types = get_all_event_types()
-        event_type_id = data.get('eventTypeId') or data.get('event_type_id')
-        if not any(et['id'] == event_type_id for et in event_types):
-            logger.warning(f"⚠️ Invalid event_type_id: {event_type_id}")
+        error = validate_event_payload(data, event_type_cache.ids())
+        if error:
             return create_response(
                 success=False,
-                message="event_type_id không hợp lệ",
+                message=error,
                 status_code=400
             )
         
@@ -654,6 +2940,69 @@ def create_event_endpoint():
             status_code=500
         )
 
+@app.route('/events/batch', methods=['POST'])
+def create_events_batch_endpoint():
+    """POST /events/batch - Tạo nhiều sự kiện trong một transaction"""
+    try:
+        data = request.get_json()
+        items = data.get('events') if isinstance(data, dict) else data
+        
+        if not isinstance(items, list) or not items:
+            logger.warning("⚠️ Batch request without events")
+            return create_response(
+                success=False,
+                message="Cần danh sách 'events' không rỗng",
+                status_code=400
+            )
+        
+        if len(items) > MAX_BATCH_SIZE:
+            logger.warning(f"⚠️ Batch too large: {len(items)} > {MAX_BATCH_SIZE}")
+            return create_response(
+                success=False,
+                message=f"Tối đa {MAX_BATCH_SIZE} sự kiện mỗi batch, nhận được {len(items)}",
+                status_code=413
+            )
+        
+        # Validate everything up front, then insert the valid items together
+        valid_type_ids = event_type_cache.ids()
+        results = [None] * len(items)
+        valid_indexes = []
+        for index, item in enumerate(items):
+            error = validate_event_payload(item, valid_type_ids)
+            if error is None:
+                try:
+                    event_fields_from_payload(item)
+                except ValueError as e:
+                    error = str(e)
+            if error:
+                results[index] = {"index": index, "success": False, "error": error}
+            else:
+                valid_indexes.append(index)
+        
+        created_events = create_events_batch([items[index] for index in valid_indexes])
+        for index, event in zip(valid_indexes, created_events):
+            results[index] = {"index": index, "success": True, "event": event}
+        
+        failed = len(items) - len(created_events)
+        return create_response(
+            success=bool(created_events),
+            data={
+                "results": results,
+                "created": len(created_events),
+                "failed": failed
+            },
+            message=f"Tạo thành công {len(created_events)}/{len(items)} sự kiện",
+            status_code=201 if created_events else 400
+        )
+    
+    except Exception as e:
+        logger.error(f"❌ Error creating event batch: {str(e)}")
+        return create_response(
+            success=False,
+            message=f"Lỗi khi tạo nhiều sự kiện: {str(e)}",
+            status_code=500
+        )
+
 @app.route('/events/<int:event_id>', methods=['PUT'])
 def update_event_endpoint(event_id):
     """PUT /events/<id> - Cập nhật sự kiện"""
@@ -661,6 +3010,15 @@ def update_event_endpoint(event_id):
         data = request.get_json()
         logger.info(f"📝 Updating event ID: {event_id}")
         
+        # Checked here: an unknown type would otherwise fail the foreign key as a 500
+        error = validate_event_update(data, event_type_cache.ids())
+        if error:
+            return create_response(
+                success=False,
+                message=error,
+                status_code=400
+            )
+        
         # Update event
         updated_event = update_event(event_id, data)
         
@@ -770,14 +3128,14 @@ def upload_images(event_id):
                 status_code=400
             )
         
-        # Get updated event with all images
-        event = get_event_by_id(event_id)
+        # Count all images of the event via the batched loader
+        total_images = len(get_event_images(event_id))
         
         return create_response(
             data={
                 "event_id": event_id,
                 "uploaded_images": uploaded_images,
-                "total_images": len(event['images']) if event else len(uploaded_images)
+                "total_images": total_images or len(uploaded_images)
             },
             message=f"Upload thành công {len(uploaded_images)} hình ảnh",
             status_code=201
@@ -791,17 +3149,177 @@ def upload_images(event_id):
             status_code=500
         )
 
+UPLOAD_SESSION_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+def upload_session_response(session: Dict[str, Any], message: str, status_code: int = 200):
+    response, status = create_response(
+        data={**session, "upload_url": f"/upload-sessions/{session['session_id']}"},
+        message=message,
+        status_code=status_code
+    )
+    response.headers['Upload-Offset'] = str(session['offset'])
+    return response, status
+
+def upload_session_not_found(session_id: str):
+    return create_response(
+        success=False,
+        message=f"Không tìm thấy phiên upload {session_id}",
+        status_code=404
+    )
+
+def upload_session_conflict(error: UploadSessionConflict, status_code: int = 409):
+    logger.warning(f"⚠️ Upload session conflict: {error}")
+    response, status = create_response(
+        success=False,
+        data={"offset": error.offset},
+        message=f"Phiên upload không ở trạng thái phù hợp: {error}",
+        status_code=status_code
+    )
+    response.headers['Upload-Offset'] = str(error.offset)
+    return response, status
+
+@app.route('/events/<int:event_id>/upload-sessions', methods=['POST'])
+def create_upload_session_endpoint(event_id):
+    """POST /events/<id>/upload-sessions - Mở phiên upload có thể tiếp tục (resumable)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        original_name = data.get('filename') or data.get('original_name') or ''
+        total_size = data.get('size', data.get('total_size'))
+        
+        if not allowed_file(original_name):
+            return create_response(
+                success=False,
+                message=f"Tên file không hợp lệ, chỉ hỗ trợ: {', '.join(sorted(ALLOWED_EXTENSIONS))}",
+                status_code=400
+            )
+        if total_size is not None and (not isinstance(total_size, int) or isinstance(total_size, bool) or total_size <= 0):
+            return create_response(success=False, message="size phải là số nguyên dương", status_code=400)
+        if total_size is not None and total_size > UPLOAD_SESSION_MAX_BYTES:
+            return create_response(
+                success=False,
+                message=f"File vượt quá giới hạn {UPLOAD_SESSION_MAX_BYTES} bytes",
+                status_code=413
+            )
+        
+        session = create_upload_session(event_id, original_name, total_size)
+        if not session:
+            return create_response(
+                success=False,
+                message=f"Không tìm thấy sự kiện với ID {event_id}",
+                status_code=404
+            )
+        return upload_session_response(session, "Tạo phiên upload thành công", status_code=201)
+    
+    except Exception as e:
+        logger.error(f"❌ Error creating upload session: {str(e)}")
+        return create_response(
+            success=False,
+            message=f"Lỗi khi tạo phiên upload: {str(e)}",
+            status_code=500
+        )
+
+@app.route('/upload-sessions/<session_id>', methods=['GET'])
+def get_upload_session_endpoint(session_id):
+    """GET /upload-sessions/<id> - Offset đã nhận của phiên upload"""
+    session = get_upload_session(session_id) if UPLOAD_SESSION_ID_RE.match(session_id) else None
+    if not session:
+        return upload_session_not_found(session_id)
+    response, status = upload_session_response(session, "Lấy trạng thái phiên upload thành công")
+    response.headers['Cache-Control'] = 'no-store'
+    return response, status
+
+@app.route('/upload-sessions/<session_id>', methods=['PUT'])
+def upload_chunk_endpoint(session_id):
+    """PUT /upload-sessions/<id> - Ghi tiếp một đoạn file tại offset (header Upload-Offset)"""
+    try:
+        if not UPLOAD_SESSION_ID_RE.match(session_id):
+            return upload_session_not_found(session_id)
+        try:
+            offset = int(request.headers.get('Upload-Offset', request.args.get('offset', '')))
+            if offset < 0:
+                raise ValueError(offset)
+        except ValueError:
+            return create_response(
+                success=False,
+                message="Thiếu hoặc sai header Upload-Offset",
+                status_code=400
+            )
+        
+        try:
+            session = append_upload_chunk(session_id, offset, request.stream)
+        except UploadSessionTooLarge as e:
+            return upload_session_conflict(e, status_code=413)
+        except UploadSessionConflict as e:
+            return upload_session_conflict(e)
+        if not session:
+            return upload_session_not_found(session_id)
+        return upload_session_response(session, f"Đã nhận {session['offset']} bytes")
+    
+    except Exception as e:
+        logger.error(f"❌ Error uploading chunk: {str(e)}")
+        return create_response(
+            success=False,
+            message=f"Lỗi khi upload dữ liệu: {str(e)}",
+            status_code=500
+        )
+
+@app.route('/upload-sessions/<session_id>/finalize', methods=['POST'])
+def finalize_upload_session_endpoint(session_id):
+    """POST /upload-sessions/<id>/finalize - Hoàn tất upload và gắn ảnh vào sự kiện"""
+    try:
+        if not UPLOAD_SESSION_ID_RE.match(session_id):
+            return upload_session_not_found(session_id)
+        try:
+            uploaded_images = finalize_upload_session(session_id)
+        except UploadSessionConflict as e:
+            return upload_session_conflict(e)
+        if uploaded_images is None:
+            return upload_session_not_found(session_id)
+        if not uploaded_images:
+            return create_response(
+                success=False,
+                message="Sự kiện của phiên upload không còn tồn tại",
+                status_code=404
+            )
+        
+        event_id = uploaded_images[0]['event_id']
+        return create_response(
+            data={
+                "event_id": event_id,
+                "uploaded_images": uploaded_images,
+                "total_images": len(get_event_images(event_id))
+            },
+            message="Upload thành công 1 hình ảnh",
+            status_code=201
+        )
+    
+    except Exception as e:
+        logger.error(f"❌ Error finalizing upload session: {str(e)}")
+        return create_response(
+            success=False,
+            message=f"Lỗi khi hoàn tất upload: {str(e)}",
+            status_code=500
+        )
+
+@app.route('/upload-sessions/<session_id>', methods=['DELETE'])
+def delete_upload_session_endpoint(session_id):
+    """DELETE /upload-sessions/<id> - Hủy phiên upload"""
+    if not UPLOAD_SESSION_ID_RE.match(session_id) or not delete_upload_session(session_id):
+        return upload_session_not_found(session_id)
+    return create_response(data={"session_id": session_id}, message="Đã hủy phiên upload")
+
 @app.route('/event-types', methods=['GET'])
 def get_event_types():
     """GET /event-types - Lấy danh sách loại sự kiện"""
     try:
         logger.info("🔍 Getting event types")
-        event_types = get_all_event_types()
+        payload, etag = event_type_cache.payload()
+        not_modified = check_not_modified(etag)
+        if not_modified:
+            return not_modified
         
-        return create_response(
-            data=event_types,
-            message="Lấy danh sách loại sự kiện thành công"
-        )
+        response = app.response_class(payload, mimetype='application/json')
+        return set_cache_validators(response, etag)
     
     except Exception as e:
         logger.error(f"❌ Error getting event types: {str(e)}")
@@ -816,7 +3334,7 @@ def debug_events():
     """GET /debug/events - Debug endpoint to check database state"""
     try:
         logger.info("🔍 Debug: Checking database state")
-        with get_db() as conn:
+        with get_read_db() as conn:
             # Get total count
             count_cursor = conn.execute("SELECT COUNT(*) FROM events")
             total_count = count_cursor.fetchone()[0]
@@ -839,7 +3357,19 @@ def debug_events():
                 "max_id": max_id,
                 "auto_increment": auto_increment,
                 "recent_events": recent_events,
-                "database_path": DATABASE_PATH
+                "database_path": DATABASE_PATH,
+                "connection_pool": db_pool.stats(),
+                "read_connection_pool": read_pool.stats(),
+                "write_queue": write_queue.stats(),
+                "event_type_cache_generation": event_type_cache.generation,
+                "events_cache": dict(events_cache.stats(), write_generation=current_write_generation()),
+                "compressed_body_cache": compressed_body_cache.stats(),
+                "storage": get_storage_stats(),
+                "image_variants": variant_pipeline.stats(),
+                "logging": {
+                    "queued": log_queue.qsize(),
+                    "dropped": log_queue_handler.dropped
+                }
             }
             
             logger.info(f"🔍 Debug info: {debug_info}")
@@ -857,12 +3387,107 @@ def debug_events():
             status_code=500
         )
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """GET /metrics - Prometheus metrics (text exposition format)"""
+    pools = {'write': db_pool.stats(), 'read': read_pool.stats()}
+    storage = get_storage_stats()
+    body = metrics.render(extra_gauges={
+        'sqlite_pool_connections': (
+            "Pooled SQLite connections by pool and state",
+            [((('pool', pool), ('state', state)), stats[state])
+             for pool, stats in pools.items() for state in ('in_use', 'idle')]
+        ),
+        'upload_storage_bytes': (
+            "Bytes of content-addressed uploads, as referenced by images (logical) and on disk (stored)",
+            [((('kind', 'logical'),), storage['logical_bytes']), ((('kind', 'stored'),), storage['stored_bytes'])]
+        ),
+        'upload_dedup_ratio': (
+            "Logical upload bytes per stored byte",
+            [((), storage['dedup_ratio'])]
+        ),
+        'response_cache_bytes': (
+            "Bytes held by the response body caches",
+            [((('cache', cache.name),), cache.stats()['bytes']) for cache in (events_cache, compressed_body_cache)]
+        ),
+        'sqlite_write_queue_depth': (
+            "Mutations waiting for the writer thread",
+            [((), write_queue.stats()['queued'])]
+        ),
+        'image_variant_queue_depth': (
+            "Variant jobs waiting for a worker",
+            [((), variant_pipeline.stats()['queued'])]
+        ),
+        'log_records_dropped': (
+            "Log records dropped because the log queue was full",
+            [((), log_queue_handler.dropped)]
+        )
+    })
+    return app.response_class(body, mimetype='text/plain', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+BLOB_FILENAME_RE = re.compile(r'^([0-9a-f]{64})(?:-[0-9a-f]{8})?\.')
+
+def send_upload(relative_path: str, immutable: bool = True, etag: Optional[str] = None):
+    """Send a file below UPLOAD_FOLDER with caching, conditional and Range support.
+
+    send_file(conditional=True) answers If-None-Match with 304 and Range with
+    206. Immutable files get a year-long max-age; the rest must revalidate.
+    """
+    upload_root = os.path.abspath(app.config['UPLOAD_FOLDER'])
+    path = safe_join(upload_root, relative_path)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    
+    if UPLOADS_SENDFILE_MODE == 'x-accel-redirect':
+        # nginx serves the body (and handles Range); only headers come from here
+        response = app.response_class(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = UPLOADS_ACCEL_PREFIX.rstrip('/') + '/' + relative_path
+        if etag:
+            response.set_etag(etag)
+    else:
+        response = send_file(path, conditional=True, etag=etag or True, max_age=UPLOADS_MAX_AGE if immutable else 0)
+        # Werkzeug only advertises this on range responses
+        response.accept_ranges = 'bytes'
+    
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = UPLOADS_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
 # Serve uploaded files
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
+    """GET /uploads/<filename>[?variant=thumb] - File upload, hoặc bản thu nhỏ nếu đã tạo xong"""
     logger.debug(f"📁 Serving file: {filename}")
-    from flask import send_from_directory
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # Content-addressed files: the hash in the name is the strongest possible ETag
+    match = BLOB_FILENAME_RE.match(filename)
+    content_etag = match.group(1) if match else None
+    
+    variant = request.args.get('variant')
+    immutable = True
+    if variant in variant_pipeline.sizes and variant_pipeline.enabled:
+        if variant_pipeline.variant_path(filename, variant):
+            response = send_upload(
+                os.path.relpath(os.path.join(VARIANT_FOLDER, variant_filename(filename, variant)), UPLOAD_FOLDER),
+                etag=f"{content_etag}-{variant}" if content_etag else None
+            )
+            response.headers['X-Image-Variant'] = variant
+            return response
+        # A source that isn't a readable image never gets variants: the original is final
+        if not variant_pipeline.has_failed(filename, variant):
+            # Not generated yet (or its job was dropped): queue it and serve the original meanwhile.
+            # This URL will change content once the variant exists, so it can't be cached for long.
+            if os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
+                variant_pipeline.submit(filename)
+            immutable = False
+            content_etag = None
+    
+    response = send_upload(filename, immutable=immutable, etag=content_etag)
+    response.headers['X-Image-Variant'] = 'original'
+    return response
 
 # Error handlers
 @app.errorhandler(404)
@@ -893,23 +3518,48 @@ def internal_error(error):
     )
 
 if __name__ == '__main__':
+    import prefork
+    
+    parser = prefork.build_parser()
+    parser.add_argument('--dev', action='store_true', help="Flask development server with the reloader")
+    args = parser.parse_args()
+    
     print("🚀 Starting Mock Events API Server with SQLite...")
     print(f"📍 Database: {DATABASE_PATH}")
-    print("📍 Server will be available at: http://localhost:5000")
+    print(f"📍 Server will be available at: http://localhost:{args.port}")
     print("📝 API Documentation:")
     print("   GET    /events          - Lấy danh sách sự kiện")
+    print("   GET    /events/changes  - Thay đổi kể từ cursor (sync)")
     print("   GET    /events/<id>     - Chi tiết sự kiện")
     print("   POST   /events          - Tạo sự kiện mới")
+    print("   POST   /events/batch    - Tạo nhiều sự kiện")
     print("   PUT    /events/<id>     - Cập nhật sự kiện")
     print("   DELETE /events/<id>     - Xóa sự kiện")
     print("   POST   /events/<id>/images - Upload hình ảnh")
+    print("   POST   /events/<id>/upload-sessions - Mở phiên upload resumable")
+    print("   PUT    /upload-sessions/<id> - Ghi một đoạn file (Upload-Offset)")
+    print("   POST   /upload-sessions/<id>/finalize - Hoàn tất upload")
     print("   GET    /event-types     - Loại sự kiện")
     print("   GET    /debug/events    - Debug database state")
+    print("   GET    /metrics         - Prometheus metrics")
     print("   📝 Note: API now uses 'event_type_id' instead of 'typeId' for consistency")
     print("✨ CORS enabled - Có thể gọi từ mọi domain")
     print("🗄️  SQLite database với quan hệ một-nhiều events-images")
-    print("📊 Comprehensive request logging enabled")
+    print(f"📊 Request logging: {LOG_FORMAT} format, verbosity {LOG_DEFAULT_VERBOSITY}, background writer")
     print("📄 Log file: server.log")
+    if variant_pipeline.enabled:
+        print(f"🖼️  Image variants: {variant_pipeline.stats()['sizes']} ({VARIANT_WORKERS} worker processes)")
+    else:
+        print("🖼️  Image variants: tắt (cần cài Pillow), /uploads luôn trả về ảnh gốc")
+    if args.dev:
+        print("🛠️  Development server (một process, tự reload khi sửa code)")
+    else:
+        print(f"👷 Prefork: {args.workers} workers x {args.threads} threads, "
+              f"recycle sau {args.max_requests or 'không giới hạn'} requests, SIGHUP để thay workers (không nạp lại code)")
     print("-" * 50)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if args.dev:
+        init_database()
+        app.run(debug=True, host=args.host, port=args.port)
+    else:
+        prefork.serve(app, args, on_starting=init_database, on_worker_exit=shutdown_worker)
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+WSGI/ASGI parity tests
+Each request goes through the Flask test client and through asgi_app.AsgiApp,
+and the two responses must match: status, headers and body bytes.
+"""
+
+import threading
+import time
+
+import pytest
+
+from conftest import image_file
+
+
+def header_list(response):
+    return [(name.lower(), value) for name, value in response.headers.items()]
+
+
+def assert_same_response(wsgi_response, asgi_response):
+    assert asgi_response.status_code == wsgi_response.status_code
+    assert header_list(asgi_response) == header_list(wsgi_response)
+    assert asgi_response.data == wsgi_response.data
+
+
+@pytest.fixture
+def compare(client, asgi_client):
+    """Send the same read-only request through both apps and assert identical responses"""
+    def run(path, method='GET', **kwargs):
+        wsgi_response = client.open(path, method=method, **kwargs)
+        asgi_response = asgi_client.open(path, method=method, **kwargs)
+        assert_same_response(wsgi_response, asgi_response)
+        return asgi_response
+    return run
+
+
+@pytest.fixture
+def seeded_event(make_event, client):
+    event = make_event("Hội thảo song song", eventTypeId=2, location="Đà Nẵng")
+    response = client.post(f"/events/{event['id']}/images", data={
+        'images': [image_file("a.png", b"\x89PNG parity a"), image_file("b.png", b"\x89PNG parity b")]
+    })
+    assert response.status_code == 201
+    return client.get(f"/events/{event['id']}").get_json()['data']
+
+
+@pytest.mark.parametrize('path', [
+    '/',
+    '/event-types',
+    '/events',
+    '/events?limit=1',
+    '/events?q=hội thảo',
+    '/events?typeId=2&sort=start_date',
+    '/events?stream=true',
+    '/events?limit=0',
+    '/events/999999',
+    '/events/changes',
+    '/events/changes?since=not-a-cursor',
+    '/no-such-route',
+])
+def test_read_routes_match(compare, seeded_event, path):
+    compare(path)
+
+
+def test_event_detail_and_images_match(compare, seeded_event):
+    detail = compare(f"/events/{seeded_event['id']}").get_json()['data']
+    # Storage bookkeeping stays out of the response
+    assert 'blob_sha256' not in detail['images'][0]
+    compare(f"/events/{seeded_event['id']}/images")
+    filename = seeded_event['images'][0]['filename']
+    compare(f"/uploads/{filename}")
+    compare(f"/uploads/{filename}", headers={'Range': 'bytes=2-5'})
+
+
+def test_conditional_and_compressed_responses_match(compare, make_event, client):
+    for n in range(20):
+        make_event(f"Sự kiện nén {n}")
+    etag = client.get('/events').headers['ETag']
+
+    assert compare('/events', headers={'If-None-Match': etag}).status_code == 304
+    compressed = compare('/events', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compare('/events?stream=true', headers={'Accept-Encoding': 'gzip'}).status_code == 200
+
+
+def test_writes_through_asgi_match_wsgi_reads(client, asgi_client):
+    created = asgi_client.post('/events', json={
+        "title": "Tạo qua ASGI",
+        "description": "Mô tả",
+        "eventTypeId": 3,
+        "startDate": "2024-12-20T14:00:00",
+        "location": "Huế"
+    })
+    assert created.status_code == 201
+    event_id = created.get_json()['data']['id']
+    assert client.get(f"/events/{event_id}").get_json()['data'] == created.get_json()['data']
+
+    updated = asgi_client.put(f"/events/{event_id}", json={"title": "Đã sửa qua ASGI"})
+    assert updated.status_code == 200
+    assert client.get(f"/events/{event_id}").get_json()['data']['title'] == "Đã sửa qua ASGI"
+
+    assert asgi_client.delete(f"/events/{event_id}").status_code == 200
+    assert client.get(f"/events/{event_id}").status_code == 404
+
+
+def test_chunked_upload_body_is_spooled(server, client, asgi_client, make_event, monkeypatch):
+    import asgi_app
+    # Small enough that the multipart body rolls over to a temp file
+    monkeypatch.setattr(asgi_app, 'ASGI_SPOOL_MEMORY_BYTES', 1024)
+    asgi_client.body_chunk_size = 700
+    spool_dirs = []
+    spooled_file = asgi_app.tempfile.SpooledTemporaryFile
+
+    def record_spool(*args, **kwargs):
+        spool_dirs.append(kwargs.get('dir'))
+        return spooled_file(*args, **kwargs)
+
+    monkeypatch.setattr(asgi_app.tempfile, 'SpooledTemporaryFile', record_spool)
+    event = make_event()
+    content = b"\x89PNG " + bytes(range(256)) * 20
+
+    response = asgi_client.post(f"/events/{event['id']}/images", data={'images': [image_file("big.png", content)]})
+    # Not in the folder /uploads serves
+    assert spool_dirs == [server.UPLOAD_TEMP_FOLDER]
+
+    assert response.status_code == 201
+    image = response.get_json()['data']['uploaded_images'][0]
+    assert image['file_size'] == len(content)
+    assert client.get(f"/uploads/{image['filename']}").data == content
+
+
+def test_streamed_body_is_produced_on_the_request_thread(server, asgi_client, make_event, monkeypatch):
+    make_event()
+    threads = []
+    get_data_version, iter_event_batches = server.get_data_version, server.iter_event_batches
+
+    def record_version():
+        threads.append(('request', threading.current_thread()))
+        return get_data_version()
+
+    def record_batches(*args, **kwargs):
+        threads.append(('stream', threading.current_thread()))
+        yield from iter_event_batches(*args, **kwargs)
+
+    monkeypatch.setattr(server, 'get_data_version', record_version)
+    monkeypatch.setattr(server, 'iter_event_batches', record_batches)
+
+    response = asgi_client.get('/events?stream=true')
+
+    assert response.status_code == 200 and response.get_json()['data']['events']
+    assert [kind for kind, _ in threads] == ['request', 'stream']
+    assert threads[0][1] is threads[1][1]
+
+
+def test_body_over_limit_is_rejected(asgi_client, make_event, monkeypatch):
+    import asgi_app
+    monkeypatch.setattr(asgi_app, 'ASGI_MAX_BODY_BYTES', 100)
+    event = make_event()
+
+    response = asgi_client.post(f"/events/{event['id']}/images", data={'images': [image_file(content=b"x" * 500)]})
+
+    assert response.status_code == 413
+    assert response.get_json()['success'] is False
+
+
+def test_long_poll_returns_when_an_event_changes(client, asgi_client, make_event):
+    cursor = client.get('/events/changes').get_json()['data']['next_cursor']
+    # Without ?wait the Flask app and the ASGI app answer at once
+    assert client.get(f"/events/changes?since={cursor}&wait=5").get_json()['data']['events'] == []
+
+    timer = threading.Timer(0.3, make_event, kwargs={'title': "Thay đổi khi đang chờ"})
+    timer.start()
+    started = time.monotonic()
+    try:
+        response = asgi_client.get(f"/events/changes?since={cursor}&wait=5")
+    finally:
+        timer.join()
+
+    assert response.status_code == 200
+    assert [event['title'] for event in response.get_json()['data']['events']] == ["Thay đổi khi đang chờ"]
+    assert time.monotonic() - started < 4
+
+
+def test_long_poll_times_out_with_an_empty_feed(client, asgi_client):
+    cursor = client.get('/events/changes').get_json()['data']['next_cursor']
+    started = time.monotonic()
+
+    response = asgi_client.get(f"/events/changes?since={cursor}&wait=0.3")
+
+    assert time.monotonic() - started >= 0.3
+    data = response.get_json()['data']
+    assert data['events'] == [] and data['deleted_events'] == []
+    assert data['next_cursor'] == cursor
+
+
+def test_long_poll_is_one_request_in_metrics(server, client, asgi_client, make_event):
+    cursor = client.get('/events/changes').get_json()['data']['next_cursor']
+
+    def changes_requests():
+        values, _ = server.metrics.collect()
+        return sum(value for (name, labels), value in values.items()
+                   if name == 'http_requests_total' and ('route', '/events/changes') in labels)
+
+    before = changes_requests()
+    timer = threading.Timer(0.3, make_event, kwargs={'title': "Chờ một lần"})
+    timer.start()
+    try:
+        response = asgi_client.get(f"/events/changes?since={cursor}&wait=5")
+    finally:
+        timer.join()
+
+    assert response.get_json()['data']['events'][0]['title'] == "Chờ một lần"
+    assert changes_requests() - before == 1
+
+
+def test_long_poll_wakes_on_writes_from_other_processes(server, client, asgi_client):
+    cursor = client.get('/events/changes').get_json()['data']['next_cursor']
+
+    def insert_with_sql():
+        # Like another uvicorn worker or a seed script: nothing in this process is notified
+        with server.get_db(immediate=True) as conn:
+            conn.execute("INSERT INTO events (title, type_id, start_date, created_at) "
+                         "VALUES ('Ghi từ process khác', 1, '2024-12-15', '2024-12-01')")
+
+    timer = threading.Timer(0.3, insert_with_sql)
+    timer.start()
+    started = time.monotonic()
+    try:
+        response = asgi_client.get(f"/events/changes?since={cursor}&wait=5")
+    finally:
+        timer.join()
+
+    assert [event['title'] for event in response.get_json()['data']['events']] == ["Ghi từ process khác"]
+    assert time.monotonic() - started < 4
@@ -0,0 +1,36 @@
+"""
+Blob store tests
+An upload that fails while its files are being moved into the blob store
+leaves neither placed blobs nor spooled temp files behind.
+"""
+
+import os
+
+from conftest import image_file
+
+
+def test_failed_placement_leaves_no_files(server, client, make_event, monkeypatch):
+    event = make_event()
+    uploads_before = set(os.listdir(server.UPLOAD_FOLDER))
+    replace = os.replace
+    calls = []
+
+    def fail_second_replace(source, target):
+        calls.append(target)
+        if len(calls) == 2:
+            raise OSError(28, "No space left on device")
+        return replace(source, target)
+
+    monkeypatch.setattr(server.os, 'replace', fail_second_replace)
+    response = client.post(f"/events/{event['id']}/images", data={'images': [
+        image_file("a.png", b"\x89PNG first blob"),
+        image_file("b.png", b"\x89PNG second blob"),
+        image_file("c.png", b"\x89PNG third blob"),
+    ]})
+    monkeypatch.undo()
+
+    assert response.status_code == 500
+    assert len(calls) == 2
+    assert set(os.listdir(server.UPLOAD_FOLDER)) == uploads_before
+    assert os.listdir(server.UPLOAD_TEMP_FOLDER) == []
+    assert client.get(f"/events/{event['id']}").get_json()['data']['images'] == []
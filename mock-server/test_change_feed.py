@@ -0,0 +1,76 @@
+"""
+Change feed tests
+change_seq and tombstones are kept by triggers, so GET /events/changes
+also reports rows written with plain SQL outside the server (seed scripts,
+the sqlite3 shell).
+"""
+
+import pytest
+
+
+@pytest.fixture
+def changes_since(client):
+    """Return (changed event ids, deleted event ids, next cursor) after `cursor`"""
+    def run(cursor):
+        data = client.get(f"/events/changes?since={cursor}").get_json()['data']
+        return ([event['id'] for event in data['events']],
+                [tombstone['id'] for tombstone in data['deleted_events']],
+                data['next_cursor'])
+    return run
+
+
+@pytest.fixture
+def cursor(client):
+    return client.get('/events/changes').get_json()['data']['next_cursor']
+
+
+def insert_event(conn, title, event_id=None):
+    return conn.execute(
+        "INSERT INTO events (id, title, type_id, start_date, created_at) "
+        "VALUES (?, ?, 1, '2024-12-15', '2024-12-01') RETURNING id", (event_id, title)
+    ).fetchone()['id']
+
+
+def test_rows_written_with_sql_are_in_the_feed(server, changes_since, cursor):
+    with server.get_db(immediate=True) as conn:
+        inserted = insert_event(conn, "Chèn bằng SQL")
+    changed, deleted, cursor = changes_since(cursor)
+    assert changed == [inserted] and deleted == []
+
+    with server.get_db(immediate=True) as conn:
+        conn.execute("UPDATE events SET location = 'Huế' WHERE id = ?", (inserted,))
+    changed, deleted, cursor = changes_since(cursor)
+    assert changed == [inserted] and deleted == []
+
+    with server.get_db(immediate=True) as conn:
+        conn.execute("DELETE FROM events WHERE id = ?", (inserted,))
+    changed, deleted, _ = changes_since(cursor)
+    assert changed == [] and deleted == [inserted]
+
+
+def test_reused_id_replaces_its_tombstone(server, changes_since, cursor):
+    with server.get_db(immediate=True) as conn:
+        event_id = insert_event(conn, "Sẽ bị xóa")
+        conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+        # As after a seed script resets sqlite_sequence
+        insert_event(conn, "Dùng lại id", event_id)
+
+    changed, deleted, _ = changes_since(cursor)
+    assert changed == [event_id] and deleted == []
+
+
+def test_image_writes_bump_their_event(server, client, make_event, changes_since):
+    event = make_event()
+    cursor = client.get('/events/changes').get_json()['data']['next_cursor']
+    with server.get_db(immediate=True) as conn:
+        conn.execute(
+            "INSERT INTO images (event_id, original_name, filename, file_path, file_size, uploaded_at) "
+            "VALUES (?, 'a.png', 'feed-a.png', 'uploads/feed-a.png', 1, '2024-12-01')", (event['id'],)
+        )
+
+    changed, deleted, cursor = changes_since(cursor)
+    assert changed == [event['id']] and deleted == []
+
+    assert client.delete(f"/events/{event['id']}").status_code == 200
+    changed, deleted, _ = changes_since(cursor)
+    assert changed == [] and deleted == [event['id']]
@@ -0,0 +1,45 @@
+"""
+Conditional request tests
+Last-Modified has whole-second resolution, so it is only sent (and
+If-Modified-Since only honored) once the second of the last write is over.
+"""
+
+import time
+from email.utils import formatdate
+
+import pytest
+
+
+@pytest.fixture
+def set_changed_at(server):
+    def run(timestamp):
+        with server.get_db(immediate=True) as conn:
+            conn.execute("UPDATE data_version SET changed_at = ? WHERE id = 1", (timestamp,))
+    return run
+
+
+def test_no_last_modified_in_the_second_of_a_write(client, make_event, set_changed_at):
+    event = make_event()
+    now = int(time.time())
+    set_changed_at(now)
+
+    response = client.get(f"/events/{event['id']}")
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response.headers
+    assert response.headers['ETag']
+
+    # A later write in the same second must not be hidden by If-Modified-Since
+    response = client.get(f"/events/{event['id']}",
+                          headers={'If-Modified-Since': formatdate(now, usegmt=True)})
+    assert response.status_code == 200
+
+
+def test_if_modified_since_matches_an_earlier_second(client, make_event, set_changed_at):
+    event = make_event()
+    set_changed_at(int(time.time()) - 10)
+
+    response = client.get(f"/events/{event['id']}")
+    last_modified = response.headers['Last-Modified']
+
+    response = client.get(f"/events/{event['id']}", headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
@@ -0,0 +1,33 @@
+"""
+Event validation tests
+Payloads the database would reject (unknown event type) are answered with
+a 400 before anything is written, for updates as for creates.
+"""
+
+
+def test_update_with_unknown_type_is_a_client_error(client, make_event):
+    event = make_event()
+
+    response = client.put(f"/events/{event['id']}", json={"eventTypeId": 99, "title": "Không được lưu"})
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == "event_type_id không hợp lệ"
+    assert client.get(f"/events/{event['id']}").get_json()['data']['title'] == event['title']
+
+
+def test_update_with_known_type_is_saved(client, make_event):
+    event = make_event()
+
+    response = client.put(f"/events/{event['id']}", json={"event_type_id": 2})
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['event']['event_type_id'] == 2
+
+
+def test_create_with_unknown_type_is_a_client_error(client):
+    response = client.post('/events', json={
+        "title": "Loại không tồn tại", "description": "Mô tả", "eventTypeId": 99,
+        "startDate": "2024-12-15T09:00:00", "location": "Hà Nội"
+    })
+
+    assert response.status_code == 400
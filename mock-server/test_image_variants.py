@@ -0,0 +1,56 @@
+"""
+Image variant tests
+A source Pillow can't decode is marked as failed once, and later
+?variant= requests serve the original without queueing it again.
+"""
+
+import os
+
+import pytest
+
+from conftest import image_file
+
+
+@pytest.fixture
+def pipeline(server, monkeypatch):
+    """A variant pipeline that queues jobs but never starts worker processes"""
+    pipeline = server.VariantPipeline({'thumb': (120, 120)}, enabled=True)
+    monkeypatch.setattr(pipeline, '_start', lambda: None)
+    monkeypatch.setattr(server, 'variant_pipeline', pipeline)
+    return pipeline
+
+
+def queued_jobs(pipeline):
+    jobs = []
+    while not pipeline._jobs.empty():
+        jobs.append(pipeline._jobs.get_nowait())
+    return jobs
+
+
+def test_undecodable_source_is_not_retried(server, client, make_event, pipeline):
+    event = make_event()
+    response = client.post(f"/events/{event['id']}/images",
+                           data={'images': [image_file("broken.png", b"not an image at all")]})
+    filename = response.get_json()['data']['uploaded_images'][0]['filename']
+    assert queued_jobs(pipeline) == [(filename, 1)]
+
+    pipeline._failed(filename, 1, server.SourceImageError(f"{filename}: cannot identify image file"))
+    assert pipeline.has_failed(filename, 'thumb')
+
+    response = client.get(f"/uploads/{filename}?variant=thumb")
+    assert response.status_code == 200
+    assert response.headers['X-Image-Variant'] == 'original'
+    assert response.cache_control.immutable
+    assert queued_jobs(pipeline) == []
+    assert pipeline.submit(filename) is False
+
+
+def test_generate_variants_reports_undecodable_sources(server, tmp_path):
+    pytest.importorskip('PIL')
+    from image_variants import SourceImageError, generate_variants
+    source = tmp_path / "broken.png"
+    source.write_bytes(b"not an image at all")
+
+    with pytest.raises(SourceImageError):
+        generate_variants(str(source), str(tmp_path), {'thumb': (120, 120)})
+    assert os.listdir(tmp_path) == ["broken.png"]
@@ -0,0 +1,48 @@
+"""
+Process lifecycle tests
+A process that serves `app` without calling init_database() (flask run,
+gunicorn) initializes the database on its first request, and processes
+initializing the same database at once don't trip over each other.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import SERVER_DIR
+
+FIRST_REQUEST = """
+import json, sqlite3, sys
+sys.path.insert(0, {server_dir!r})
+import python_mock_server as server
+response = server.app.test_client().get('/events?q=hoi')
+version = sqlite3.connect('events.db').execute('PRAGMA user_version').fetchone()[0]
+print(json.dumps([response.status_code, server.fts_enabled, version]))
+"""
+
+
+def run_first_request(work_dir):
+    return subprocess.Popen(
+        [sys.executable, '-c', FIRST_REQUEST.format(server_dir=SERVER_DIR)],
+        cwd=work_dir, env=dict(os.environ, IMAGE_VARIANTS='0'),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+
+
+def test_first_request_initializes_the_database(server, tmp_path):
+    process = run_first_request(tmp_path)
+    output, _ = process.communicate(timeout=60)
+
+    status, fts_enabled, version = json.loads(output.splitlines()[-1])
+    assert status == 200
+    assert fts_enabled == server.fts_enabled
+    assert version == server.MIGRATIONS[-1][0]
+
+
+def test_concurrent_processes_migrate_once(server, tmp_path):
+    processes = [run_first_request(tmp_path) for _ in range(4)]
+    results = [json.loads(process.communicate(timeout=60)[0].splitlines()[-1]) for process in processes]
+
+    assert all(status == 200 for status, _, _ in results)
+    assert {version for _, _, version in results} == {server.MIGRATIONS[-1][0]}
@@ -0,0 +1,61 @@
+"""
+Schema migration tests
+The full-text index is a numbered migration: a database from before it
+gets an index covering its existing events, and later startups leave the
+index alone.
+"""
+
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def database(tmp_path):
+    conn = sqlite3.connect(tmp_path / "events.db")
+    yield conn
+    conn.close()
+
+
+SEARCH_INDEX_OBJECTS = ['events_fts', 'events_fts_delete', 'events_fts_insert', 'events_fts_update']
+
+
+def fts_objects(conn):
+    placeholders = ', '.join('?' * len(SEARCH_INDEX_OBJECTS))
+    return [row[0] for row in conn.execute(
+        f"SELECT name FROM sqlite_master WHERE name IN ({placeholders}) ORDER BY name", SEARCH_INDEX_OBJECTS
+    )]
+
+
+def test_new_database_gets_the_search_index(server, database):
+    assert server.run_migrations(database) == server.MIGRATIONS[-1][0]
+
+    assert fts_objects(database) == SEARCH_INDEX_OBJECTS
+
+
+def test_existing_events_are_indexed_on_upgrade(server, database, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(server, 'MIGRATIONS', [m for m in server.MIGRATIONS if m[1] != "full-text search index"])
+        before = server.run_migrations(database)
+    database.execute("INSERT INTO event_types (id, name) VALUES (1, 'Hội thảo')")
+    database.execute(
+        "INSERT INTO events (title, description, type_id, start_date, location, created_at) "
+        "VALUES ('Hội thảo AI', 'Mô tả', 1, '2024-12-15T09:00:00', 'Đà Nẵng', '2024-11-01T10:00:00')"
+    )
+    database.commit()
+    assert fts_objects(database) == []
+
+    assert server.run_migrations(database) == before + 1
+    assert database.execute("SELECT rowid FROM events_fts WHERE events_fts MATCH 'hoi thao'").fetchall() == [(1,)]
+
+
+def test_applied_migration_is_not_run_again(server, database, monkeypatch):
+    server.run_migrations(database)
+    applied = []
+    monkeypatch.setattr(server, 'MIGRATIONS', [
+        (version, description, lambda conn, version=version: applied.append(version))
+        for version, description, _ in server.MIGRATIONS
+    ])
+
+    server.run_migrations(database)
+    assert applied == []
@@ -0,0 +1,110 @@
+"""
+Query-count tests for the write endpoints
+Each request's SQLite statements are counted by InstrumentedConnection
+(the same numbers /metrics reports). BEGIN counts as a statement; COMMIT
+does not, since it goes through conn.commit().
+"""
+
+import pytest
+
+from conftest import image_file
+
+
+@pytest.fixture(autouse=True)
+def direct_writes(server, monkeypatch):
+    """Count each write's own transaction; queued writes are covered in test_write_queue.py"""
+    monkeypatch.setattr(server.write_queue, 'enabled', False)
+
+
+@pytest.fixture
+def count_queries(server, client):
+    """Run a request and return (response, statements it executed)"""
+    # Warm the event type cache so validation doesn't show up in the counts
+    server.event_type_cache.ids()
+
+    def run(method, path, **kwargs):
+        response = client.open(path, method=method, **kwargs)
+        count, _ = server.get_query_stats()
+        return response, count
+    return run
+
+
+def test_create_event_uses_one_insert(count_queries):
+    response, count = count_queries('POST', '/events', json={
+        "title": "Workshop RETURNING",
+        "description": "Một câu lệnh",
+        "eventTypeId": 2,
+        "startDate": "2024-12-20T14:00:00",
+        "location": "Đà Nẵng"
+    })
+
+    assert response.status_code == 201
+    event = response.get_json()['data']
+    assert event['title'] == "Workshop RETURNING"
+    assert event['event_type_id'] == 2
+    assert event['images'] == []
+    # BEGIN, INSERT ... RETURNING; triggers allocate the change sequence
+    assert count == 2
+
+
+def test_update_event_uses_one_update(count_queries, make_event):
+    event = make_event()
+
+    response, count = count_queries('PUT', f"/events/{event['id']}", json={"title": "Đã sửa"})
+
+    assert response.status_code == 200
+    updated = response.get_json()['data']['event']
+    assert updated['title'] == "Đã sửa"
+    assert updated['location'] == event['location']
+    assert updated['updated_at'] is not None
+    assert 'change_seq' not in updated
+    # BEGIN, UPDATE ... RETURNING, images
+    assert count == 3
+
+
+def test_update_missing_event_does_not_allocate_sequence(count_queries, server):
+    with server.get_db() as conn:
+        before = conn.execute("SELECT change_seq FROM sync_state").fetchone()[0]
+
+    response, count = count_queries('PUT', '/events/999999', json={"title": "Không có"})
+
+    assert response.status_code == 404
+    # BEGIN, UPDATE ... RETURNING (no row)
+    assert count == 2
+    with server.get_db() as conn:
+        assert conn.execute("SELECT change_seq FROM sync_state").fetchone()[0] == before
+
+
+def test_delete_event_uses_one_delete(count_queries, make_event, server):
+    event = make_event()
+    server._last_tombstone_compaction = float('inf')  # keep compaction out of the count
+
+    response, count = count_queries('DELETE', f"/events/{event['id']}")
+
+    assert response.status_code == 200
+    # BEGIN, DELETE ... RETURNING (a trigger writes the tombstone), orphan blobs
+    assert count == 3
+
+    response, count = count_queries('DELETE', f"/events/{event['id']}")
+    assert response.status_code == 404
+    assert count == 2
+
+
+def test_upload_images_does_not_reselect(count_queries, make_event):
+    event = make_event()
+
+    response, count = count_queries(
+        'POST', f"/events/{event['id']}/images",
+        data={"images": [image_file("a.png"), image_file("b.jpg")]},
+        content_type='multipart/form-data'
+    )
+
+    assert response.status_code == 201
+    images = response.get_json()['data']['uploaded_images']
+    assert [image['original_name'] for image in images] == ["a.png", "b.jpg"]
+    assert all(image['event_id'] == event['id'] for image in images)
+    assert not any('blob_sha256' in image for image in images)
+    assert response.get_json()['data']['total_images'] == 2
+    # BEGIN, event check, blob lookup, blob insert, one INSERT ... RETURNING for
+    # both rows, then images for total_images (an autocommit read, no BEGIN)
+    assert count == 6
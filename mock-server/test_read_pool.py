@@ -0,0 +1,46 @@
+"""
+Read pool tests
+GET routes read through read-only connections that can't write, and reads
+made inside a write transaction still see that transaction's changes.
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+
+def test_read_connections_cannot_write(server):
+    with server.get_read_db() as conn:
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM events")
+
+
+def test_get_routes_use_the_read_pool(server, client, make_event):
+    event = make_event("Đọc từ pool chỉ đọc")
+    reads_before = server.read_pool.stats()['reused'] + server.read_pool.stats()['created']
+
+    assert client.get(f"/events/{event['id']}").get_json()['data']['title'] == "Đọc từ pool chỉ đọc"
+    assert client.get('/events').status_code == 200
+
+    stats = server.read_pool.stats()
+    assert stats['read_only'] is True
+    assert stats['reused'] + stats['created'] > reads_before
+
+
+def test_reads_inside_a_write_see_its_changes(server):
+    with server.get_db(immediate=True) as conn:
+        event_id = conn.execute(
+            "INSERT INTO events (title, type_id, start_date, created_at) "
+            "VALUES ('Chưa commit', 1, '2024-12-15', '2024-12-01') RETURNING id"
+        ).fetchone()['id']
+        assert server.get_event_by_id(event_id)['title'] == "Chưa commit"
+
+        # Other threads read the last committed state without waiting for the writer
+        seen = []
+        reader = threading.Thread(target=lambda: seen.append(server.get_event_by_id(event_id)))
+        reader.start()
+        reader.join(5)
+        assert seen == [None]
+        conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
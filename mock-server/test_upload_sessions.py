@@ -0,0 +1,77 @@
+"""
+Resumable upload tests
+A client that disconnects keeps the bytes it sent, a disk error is a 500
+rather than a short success, and files that aren't placed yet can't be
+fetched from /uploads.
+"""
+
+import io
+import os
+
+import pytest
+from werkzeug.exceptions import ClientDisconnected
+
+
+@pytest.fixture
+def upload_session(client, make_event):
+    event = make_event()
+    response = client.post(f"/events/{event['id']}/upload-sessions", json={"filename": "photo.png", "size": 8})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['data']['session_id']
+
+
+def put_chunk(client, session_id, offset, body):
+    return client.put(f"/upload-sessions/{session_id}", data=body,
+                      headers={'Upload-Offset': str(offset), 'Content-Type': 'application/octet-stream'})
+
+
+class DisconnectingStream(io.BytesIO):
+    """Request body whose client goes away after the first read"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        if self.reads > 1:
+            raise ClientDisconnected()
+        return super().read(min(size, 4))
+
+
+def test_disconnect_keeps_received_bytes(server, upload_session):
+    session = server.append_upload_chunk(upload_session, 0, DisconnectingStream(b"12345678"))
+
+    assert session['offset'] == 4
+    assert server.get_upload_session(upload_session)['offset'] == 4
+
+
+def test_disk_error_is_not_reported_as_progress(server, client, upload_session):
+    part_path = server.upload_session_path(upload_session)
+    os.remove(part_path)
+
+    response = put_chunk(client, upload_session, 0, b"1234")
+    assert response.status_code == 500
+    assert server.get_upload_session(upload_session)['offset'] == 0
+
+    # The session isn't left claimed, so the client can retry once the disk is back
+    open(part_path, 'wb').close()
+    assert put_chunk(client, upload_session, 0, b"1234").status_code == 200
+
+
+def test_files_being_placed_are_not_served(server, client, upload_session, monkeypatch):
+    assert put_chunk(client, upload_session, 0, b"12345678").status_code == 200
+    temp_files = []
+    attach = server.attach_spooled_images
+
+    def attach_and_look(event_id, uploads):
+        for upload in uploads:
+            temp_files.append(upload['temp_path'])
+            name = os.path.basename(upload['temp_path'])
+            assert client.get(f"/uploads/{name}").status_code == 404
+        return attach(event_id, uploads)
+
+    monkeypatch.setattr(server, 'attach_spooled_images', attach_and_look)
+    assert client.post(f"/upload-sessions/{upload_session}/finalize").status_code == 201
+
+    assert [os.path.dirname(path) for path in temp_files] == [os.path.abspath(server.UPLOAD_TEMP_FOLDER)]
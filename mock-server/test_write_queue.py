@@ -0,0 +1,110 @@
+"""
+Writer queue tests
+Mutations submitted while the writer is busy are committed together, a
+failing mutation is rolled back on its own, and each request is still
+charged for the statements its mutation ran.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def write_queue(server, monkeypatch):
+    queue = server.WriteQueue(enabled=True, max_group_size=16, window=0.05)
+    monkeypatch.setattr(server, 'write_queue', queue)
+    yield queue
+    queue.shutdown()
+
+
+def insert_event(conn, title):
+    return conn.execute(
+        "INSERT INTO events (title, type_id, start_date, created_at) VALUES (?, 1, '2024-12-15', '2024-12-01') "
+        "RETURNING id", (title,)
+    ).fetchone()['id']
+
+
+def test_concurrent_mutations_share_commits(server, write_queue):
+    with ThreadPoolExecutor(8) as pool:
+        ids = list(pool.map(lambda n: server.run_write(insert_event, f"Nhóm {n}"), range(40)))
+
+    assert len(set(ids)) == 40
+    stats = write_queue.stats()
+    assert stats['mutations'] == 40
+    assert stats['groups'] < 40
+    with server.get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM events WHERE title LIKE 'Nhóm %'").fetchone()[0] == 40
+
+
+def test_failed_mutation_rolls_back_alone(server, write_queue):
+    release = threading.Event()
+
+    def wait_then_insert(conn):
+        # Holds the writer so the next three mutations land in one group
+        release.wait(5)
+        return insert_event(conn, "Trước lỗi")
+
+    def insert_then_fail(conn):
+        insert_event(conn, "Bị hủy")
+        raise ValueError("mutation failed")
+
+    first = write_queue.submit(wait_then_insert)
+    futures = [
+        write_queue.submit(insert_event, "Cùng nhóm 1"),
+        write_queue.submit(insert_then_fail),
+        write_queue.submit(insert_event, "Cùng nhóm 2"),
+    ]
+    release.set()
+
+    assert first.result(5)
+    assert futures[0].result(5) and futures[2].result(5)
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    with server.get_db() as conn:
+        titles = {row[0] for row in conn.execute("SELECT title FROM events")}
+    assert {"Trước lỗi", "Cùng nhóm 1", "Cùng nhóm 2"} <= titles
+    assert "Bị hủy" not in titles
+
+
+def test_requests_are_charged_for_their_own_statements(server, client, write_queue):
+    server.event_type_cache.ids()
+
+    response = client.post('/events', json={
+        "title": "Qua hàng đợi",
+        "description": "Mô tả",
+        "eventTypeId": 1,
+        "startDate": "2024-12-15T09:00:00",
+        "location": "Hà Nội"
+    })
+
+    assert response.status_code == 201
+    count, _ = server.get_query_stats()
+    # INSERT ... RETURNING; BEGIN and COMMIT belong to the group
+    assert count == 1
+    assert write_queue.stats()['mutations'] == 1
+
+
+def test_upload_session_writes_use_the_writer(server, write_queue, client, make_event, monkeypatch):
+    event = make_event()
+    get_db = server.get_db
+    direct_writers = []
+
+    def recording_get_db(*args, **kwargs):
+        if kwargs.get('immediate') and threading.current_thread().name != 'sqlite-writer':
+            direct_writers.append(threading.current_thread().name)
+        return get_db(*args, **kwargs)
+
+    monkeypatch.setattr(server, 'get_db', recording_get_db)
+    mutations_before = write_queue.stats()['mutations']
+    server.collect_upload_sessions(force=True)
+    session_id = client.post(f"/events/{event['id']}/upload-sessions",
+                             json={"filename": "photo.png", "size": 4}).get_json()['data']['session_id']
+    assert client.put(f"/upload-sessions/{session_id}", data=b"1234",
+                      headers={'Upload-Offset': '0', 'Content-Type': 'application/octet-stream'}).status_code == 200
+    assert client.post(f"/upload-sessions/{session_id}/finalize").status_code == 201
+
+    assert direct_writers == []
+    # collect, create, claim + release, claim + attach + delete
+    assert write_queue.stats()['mutations'] - mutations_before == 7